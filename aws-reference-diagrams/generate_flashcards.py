@@ -1,32 +1,66 @@
+import filecmp
+import hashlib
 import json
 import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from functools import lru_cache
 import requests
-from jinja2 import Template
+from requests.adapters import HTTPAdapter
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 import re
 import click
 import subprocess
-from pdf2image import convert_from_path
 
 # Directory containing the JSON files
 directory = '.'
 
+# Templates are looked up next to this script; their compiled bytecode is cached
+script_dir = os.path.dirname(os.path.abspath(__file__))
+template_cache_dir = os.path.join(script_dir, '.jinja-cache')
+
 # Template files for org-drill
 remote_template_file = 'org-drill-remote-template.tmpl'
 local_template_file = 'org-drill-local-template.tmpl'
 ai_enhanced_template_file = 'org-drill-ai-enhanced-template.tmpl'
 
-# Output file for org-drill flashcards
+# Output file for org-drill flashcards, and the manifest of the cards it was built from
 output_file = 'aws-reference-architectures-drill.org'
+manifest_file = f"{output_file}.manifest.json"
+manifest_version = 1
+
+# Reference architecture search API, one page of 9 items per request
+api_url = "https://aws.amazon.com/api/dirs/items/search?item.directoryId=whitepapers&sort_by=item.additionalFields.sortDate&sort_order=desc&size=9&item.locale=en_US&tags.id=GLOBAL%23content-type%23reference-arch-diagram&page={page_num}"
+max_pages = 40  # Assuming up to 40 pages
+
+# HTTP client settings: (connect, read) timeout in seconds, retries per request
+# and the base delay of the jittered exponential backoff between them
+request_timeout = (5, 30)
+request_retries = 3
+retry_backoff = 0.5
+fetch_workers = 8
 
-# Load the templates
-# Load the templates
-with open(remote_template_file, 'r') as f:
-    remote_template_content = f.read()
-    remote_template = Template(remote_template_content)
+# Processes rasterizing diagram PDFs; poppler is single-threaded and CPU-bound
+raster_jobs = os.cpu_count() or 1
+
+@lru_cache(maxsize=None)
+def template_environment():
+    """Jinja environment loading templates from the script directory, created on first use."""
+    try:
+        os.makedirs(template_cache_dir, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(template_cache_dir)
+    except OSError:
+        bytecode_cache = FileSystemBytecodeCache()  # fall back to the system temp directory
+    return Environment(loader=FileSystemLoader(script_dir), bytecode_cache=bytecode_cache)
 
-with open(local_template_file, 'r') as f:
-    local_template_content = f.read()
-    local_template = Template(local_template_content)
+@lru_cache(maxsize=None)
+def load_template(name):
+    """Returns the compiled template and its source text, loading them on first use."""
+    environment = template_environment()
+    source = environment.loader.get_source(environment, name)[0]
+    return environment.get_template(name), source
 
 def clean_text(text):
     """
@@ -43,36 +77,165 @@ def clean_text(text):
 def ensure_diagrams_directory():
     """Creates the 'diagrams' directory if it doesn't exist."""
     if not os.path.exists('diagrams'):
-        os.makedirs('diagrams')
+        os.makedirs('diagrams', exist_ok=True)
         print("Created 'diagrams' directory.")
 
-def download_diagram(url, name, filetype="pdf", refresh=False):
-    """Downloads a diagram if it doesn't exist locally or if refresh is True."""
+def read_cache_metadata(path):
+    """Reads the HTTP validators stored next to a downloaded (or partial) file."""
+    try:
+        with open(f"{path}.http.json", 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def write_cache_metadata(path, url, response):
+    """Stores the URL, ETag and Last-Modified of a response next to path."""
+    metadata = {'url': url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified')}
+    with open(f"{path}.http.json", 'w') as f:
+        json.dump(metadata, f)
+
+def remove_cached(path):
+    """Removes a file and its HTTP metadata."""
+    for stale in (path, f"{path}.http.json"):
+        if os.path.exists(stale):
+            os.remove(stale)
+
+def download_diagram(url, name, filetype="pdf", refresh=False, session=None, timeout=request_timeout):
+    """
+    Downloads a diagram if it doesn't exist locally, or revalidates it if refresh is True.
+
+    The ETag and Last-Modified of each download are kept in a ``.http.json``
+    file next to the diagram; a refresh sends them as If-None-Match and
+    If-Modified-Since, so an unchanged diagram costs a 304. The body streams
+    to a ``.part`` file that is renamed into place when complete, and an
+    interrupted download resumes from the partial file with a Range request.
+    If the server refuses the Range request, the partial file is discarded
+    and the diagram is downloaded in full.
+
+    Returns:
+        str: The local file name, or None if the download failed.
+    """
     ensure_diagrams_directory()
     filename = f"diagrams/{name}.{filetype}"
-    
-    if not os.path.exists(filename) or refresh:
-        try:
-            response = requests.get(url)
-            response.raise_for_status()
-            with open(filename, 'wb') as f:
-                f.write(response.content)
-            print(f"Downloaded diagram: {filename}")
-        except requests.exceptions.RequestException as e:
-            print(f"Error downloading diagram for {name}: {e}")
-    else:
+    partial = f"{filename}.part"
+    http = session or requests
+
+    if os.path.exists(filename) and not refresh:
         print(f"Diagram already exists: {filename}")
+        return filename
+
+    headers = {}
+    cached = read_cache_metadata(filename) if os.path.exists(filename) else {}
+    if cached.get('url') == url:
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+
+    offset = 0
+    resumed = read_cache_metadata(partial) if os.path.exists(partial) else {}
+    validator = resumed.get('etag') or resumed.get('last_modified')
+    if resumed.get('url') == url and validator:
+        offset = os.path.getsize(partial)
+        # If-Range makes the server send the whole file if it changed since.
+        headers.update({'Range': f"bytes={offset}-", 'If-Range': validator})
+    else:
+        remove_cached(partial)
 
-def fetch_json_data(page_num):
-    """Fetches JSON data from the AWS API for a specific page."""
-    url = f"https://aws.amazon.com/api/dirs/items/search?item.directoryId=whitepapers&sort_by=item.additionalFields.sortDate&sort_order=desc&size=9&item.locale=en_US&tags.id=GLOBAL%23content-type%23reference-arch-diagram&page={page_num}"
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()
+        response = http.get(url, headers=headers, stream=True, timeout=timeout)
+        if offset and response.status_code >= 400:
+            # The partial can't be resumed (a complete one gets 416): start over.
+            response.close()
+            print(f"Cannot resume {partial} (HTTP {response.status_code}), downloading it again")
+            remove_cached(partial)
+            offset = 0
+            del headers['Range'], headers['If-Range']
+            response = http.get(url, headers=headers, stream=True, timeout=timeout)
+        with response:
+            if response.status_code == 304:
+                print(f"Diagram unchanged: {filename}")
+                return filename
+            response.raise_for_status()
+            if response.status_code != 206:
+                offset = 0
+                write_cache_metadata(partial, url, response)
+            with open(partial, 'ab' if offset else 'wb') as f:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    f.write(chunk)
+        os.replace(partial, filename)
+        os.replace(f"{partial}.http.json", f"{filename}.http.json")
+        print(f"{'Resumed' if offset else 'Downloaded'} diagram: {filename}")
+        return filename
     except requests.exceptions.RequestException as e:
-        print(f"Error fetching data for page {page_num}: {e}")
-        return None
+        print(f"Error downloading diagram for {name}: {e}")
+        return filename if os.path.exists(filename) else None
+
+def make_session(pool_size=fetch_workers):
+    """Creates a keep-alive session whose connection pool fits pool_size concurrent requests."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def fetch_json_data(page_num, session=None, url=api_url, timeout=request_timeout,
+                    retries=request_retries, backoff=retry_backoff):
+    """
+    Fetches JSON data from the AWS API for a specific page.
+
+    Connection errors, timeouts, 429 and 5xx responses are retried with
+    jittered exponential backoff; other errors give up immediately.
+    """
+    http = session or requests
+    for attempt in range(retries + 1):
+        try:
+            response = http.get(url.format(page_num=page_num), timeout=timeout)
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            status = e.response.status_code if e.response is not None else None
+            retryable = status is None or status == 429 or status >= 500
+            if not retryable or attempt == retries:
+                print(f"Error fetching data for page {page_num}: {e}")
+                return None
+            time.sleep(random.uniform(0, backoff * 2 ** attempt))
+
+def fetch_pages(pages=max_pages, workers=fetch_workers, session=None, **kwargs):
+    """
+    Fetches pages 1..pages concurrently, at most workers requests in flight.
+
+    The first empty or failed page marks the end of the listing: later pages
+    are no longer requested, and those already fetched are dropped.
+
+    Returns:
+        list: (page_num, data) for the contiguous run of non-empty pages.
+    """
+    session = session or make_session(workers)
+    results = {}
+    end = pages + 1
+    next_page = 1
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {}
+        while pending or next_page < end:
+            while next_page < end and len(pending) < workers:
+                print(f"Fetching Reference Architecture Diagrams page {next_page}")
+                pending[executor.submit(fetch_json_data, next_page, session, **kwargs)] = next_page
+                next_page += 1
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                page_num = pending.pop(future)
+                data = future.result()
+                if data and data.get('items'):
+                    results[page_num] = data
+                else:
+                    end = min(end, page_num)
+            for future, page_num in list(pending.items()):
+                if page_num > end and future.cancel():
+                    del pending[future]
+    return [(page_num, results[page_num]) for page_num in sorted(results) if page_num < end]
 
 def process_tags(tags):
     """Process tags to extract tech categories and other relevant tags."""
@@ -88,6 +251,7 @@ def process_tags(tags):
 def convert_pdf_to_image(pdf_path, output_path):
     """Convert PDF to image using pdf2image."""
     try:
+        from pdf2image import convert_from_path
         images = convert_from_path(pdf_path, dpi=100, first_page=1, last_page=1)
         if images:
             images[0].save(output_path, 'PNG')
@@ -97,20 +261,50 @@ def convert_pdf_to_image(pdf_path, output_path):
         print(f"Error converting {pdf_path} to image: {e}")
     return False
 
-def process_diagram(url, name, refresh=False):
-    """Process diagram: download if needed, convert to image if possible."""
+def file_sha256(path):
+    """SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def raster_is_stale(pdf_path, image_path):
+    """
+    Whether image_path must be (re)rendered from pdf_path.
+
+    An image newer than its PDF is current. An older one is still current if
+    the PDF's hash matches the one recorded when the image was rendered (the
+    PDF was only touched), in which case the image's mtime is bumped so the
+    hash is not checked again.
+    """
+    if not os.path.exists(image_path):
+        return True
+    if os.path.getmtime(image_path) >= os.path.getmtime(pdf_path):
+        return False
+    try:
+        with open(f"{image_path}.sha256", 'r') as f:
+            recorded = f.read().strip()
+    except OSError:
+        return True
+    if recorded != file_sha256(pdf_path):
+        return True
+    os.utime(image_path)
+    return False
+
+def rasterize_diagram(pdf_path, image_path, rasterize=convert_pdf_to_image):
+    """Renders image_path from pdf_path and records the hash of the PDF it came from."""
+    digest = file_sha256(pdf_path)
+    if not rasterize(pdf_path, image_path):
+        return False
+    with open(f"{image_path}.sha256", 'w') as f:
+        f.write(digest)
+    return True
+
+def diagram_link(name):
+    """Org link to the rendered image of a diagram, else its PDF, else None."""
     pdf_filename = f"diagrams/{name}.pdf"
     image_filename = f"diagrams/{name}.png"
-    
-    # Download PDF if it doesn't exist or refresh is True
-    if not os.path.exists(pdf_filename) or refresh:
-        download_diagram(url, name, refresh=refresh)
-    
-    # Convert PDF to image if PDF exists and image doesn't exist or refresh is True
-    if os.path.exists(pdf_filename) and (not os.path.exists(image_filename) or refresh):
-        convert_pdf_to_image(pdf_filename, image_filename)
-    
-    # Return the appropriate filename to use in the flashcard
     if os.path.exists(image_filename):
         return f"[[file:{image_filename}]]"
     elif os.path.exists(pdf_filename):
@@ -118,6 +312,168 @@ def process_diagram(url, name, refresh=False):
     else:
         return None
 
+def process_diagram(url, name, refresh=False):
+    """Process diagram: download if needed, convert to image if stale."""
+    pdf_filename = download_diagram(url, name, refresh=refresh)
+    image_filename = f"diagrams/{name}.png"
+    if pdf_filename and raster_is_stale(pdf_filename, image_filename):
+        rasterize_diagram(pdf_filename, image_filename)
+    return diagram_link(name)
+
+def process_diagrams(diagrams, refresh=False, workers=fetch_workers, jobs=raster_jobs,
+                     rasterize=convert_pdf_to_image):
+    """
+    Downloads and rasterizes diagrams as a pipeline, yielding their links in input order.
+
+    Downloads run on a thread pool of workers sharing one session; each
+    finished download whose image is stale is handed straight to a pool of
+    jobs processes (rasterized inline when jobs is 1), so rendering overlaps
+    the remaining downloads. Links are yielded as soon as the diagram at the
+    head of the list is ready.
+
+    Args:
+        diagrams (list): (url, name) pairs.
+        rasterize: With jobs above 1, a module-level function the worker
+            processes can import by name.
+    """
+    ensure_diagrams_directory()
+    session = make_session(workers)
+    with ThreadPoolExecutor(max_workers=workers) as downloads, \
+            (ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else nullcontext()) as rasterizers:
+
+        def fetch(url, name):
+            pdf_filename = download_diagram(url, name, refresh=refresh, session=session)
+            image_filename = f"diagrams/{name}.png"
+            if not pdf_filename or not raster_is_stale(pdf_filename, image_filename):
+                return None
+            if rasterizers is None:
+                rasterize_diagram(pdf_filename, image_filename, rasterize)
+                return None
+            return rasterizers.submit(rasterize_diagram, pdf_filename, image_filename, rasterize)
+
+        # Items sharing a name share one diagram, so each is fetched once.
+        futures = {}
+        for url, name in diagrams:
+            if name not in futures:
+                futures[name] = downloads.submit(fetch, url, name)
+        for _, name in diagrams:
+            rendering = futures[name].result()
+            if rendering is not None:
+                rendering.result()
+            yield diagram_link(name)
+
+def load_items(directory):
+    """Flattened template data of every item in the fetched JSON pages, in file order."""
+    for filename in sorted(os.listdir(directory)):
+        if filename.startswith('reference-architecture-diagrams-p') and filename.endswith('.json'):
+            with open(os.path.join(directory, filename), 'r') as f:
+                data = json.load(f)
+
+            # Iterate through items in the JSON data
+            for item in data.get('items', []):
+                item_data = item.get('item', {})
+                additional_fields = item_data.get('additionalFields', {})
+
+                # Remove HTML tags from the description
+                clean_description = clean_text(re.sub('<.*?>', '', additional_fields.get('description', '')))
+
+                # Create a flattened dictionary for the template
+                yield {
+                    'docTitle': clean_text(additional_fields.get('docTitle', '')),
+                    'tags': process_tags(item.get('tags', [])),
+                    'id': item_data.get('id', ''),
+                    'name': item_data.get('name', ''),
+                    'dateCreated': item_data.get('dateCreated', ''),
+                    'primaryURL': additional_fields.get('primaryURL', ''),
+                    'description': clean_description
+                }
+
+def card_digest(flattened_data, template_source):
+    """Hash of everything a card's rendering depends on: its data and its template."""
+    digest = hashlib.sha256(template_source.encode('utf-8'))
+    digest.update(json.dumps(flattened_data, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+def load_manifest(path):
+    """Cached cards by item key, or {} if the manifest is missing or from another version."""
+    try:
+        with open(path, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest.get('cards', {}) if manifest.get('version') == manifest_version else {}
+
+def replace_if_changed(tmp, path):
+    """Moves tmp over path atomically, or discards it if path already has the same content."""
+    if os.path.exists(path) and filecmp.cmp(tmp, path, shallow=False):
+        os.remove(tmp)
+        return False
+    os.replace(tmp, path)
+    return True
+
+def card_entries(items, links=None, ai_generate=False):
+    """
+    Yields (key, flattened_data, template_name) for each item, in order.
+
+    With links (one per item, from process_diagrams) cards use the local
+    template; each entry waits only for its own diagram, so cards are
+    rendered while later diagrams are still downloading and rasterizing.
+    With ai_generate, items carrying AI-generated fields use the
+    AI-enhanced template instead.
+    """
+    seen = {}
+    for flattened_data in items:
+        url = flattened_data['primaryURL']
+        if links is not None:
+            link = next(links)
+            flattened_data['link'] = link or url  # Use URL as fallback if link is None
+            template_name = local_template_file
+        else:
+            flattened_data['link'] = url
+            template_name = remote_template_file
+        if ai_generate and flattened_data.get('ai_generated_summary'):
+            # Only cards whose ai_generated_* fields a provider filled in use the
+            # AI-enhanced template; it adds the link brackets itself.
+            flattened_data['url'] = url
+            flattened_data['local_diagram_path'] = flattened_data['link'].removeprefix('[[').removesuffix(']]')
+            template_name = ai_enhanced_template_file
+        # Cards are keyed by item id; repeated ids get an occurrence suffix.
+        key = flattened_data['id'] or flattened_data['name']
+        seen[key] = seen.get(key, 0) + 1
+        if seen[key] > 1:
+            key = f"{key}#{seen[key]}"
+        yield key, flattened_data, template_name
+
+def write_cards(outfile, entries, manifest):
+    """
+    Streams the cards of (key, flattened_data, template_name) entries to outfile, reusing cached ones.
+
+    New or changed cards are rendered chunk by chunk with Template.generate()
+    and written as they are produced. Each card's text is also kept for the
+    returned manifest, so memory still grows with the size of the deck.
+
+    Returns:
+        tuple: The new manifest, the number of cards rendered and the number reused.
+    """
+    cards_manifest, rendered, reused = {}, 0, 0
+    for key, flattened_data, template_name in entries:
+        template, template_source = load_template(template_name)
+        digest = card_digest(flattened_data, template_source)
+        cached = manifest.get(key)
+        if cached and cached.get('hash') == digest:
+            card = cached['card']
+            outfile.write(card)
+            reused += 1
+        else:
+            chunks = []
+            for chunk in template.generate(flattened_data):
+                outfile.write(chunk)
+                chunks.append(chunk)
+            card = ''.join(chunks)
+            rendered += 1
+        outfile.write('\n')
+        cards_manifest[key] = {'hash': digest, 'card': card}
+    return cards_manifest, rendered, reused
 
 @click.command()
 @click.option('--refresh-data', is_flag=True, help='Force re-fetching of JSON data from AWS')
@@ -126,69 +482,41 @@ def process_diagram(url, name, refresh=False):
 @click.option('--ai-generate', is_flag=True, help='Generate AI-enhanced content for flashcards')
 @click.option('--ai-provider', type=click.Choice(['ollama', 'claude', 'openai', 'gemini']), 
               default='ollama', help='AI provider for generating enhanced content (if --ai-generate is used)')
-def generate_flashcards(refresh_data, refresh_diagrams, local_pdf, ai_generate, ai_provider):
+@click.option('--workers', default=fetch_workers, type=click.IntRange(min=1),
+              help='Concurrent HTTP requests when fetching JSON data and diagrams')
+@click.option('--jobs', default=raster_jobs, type=click.IntRange(min=1),
+              help='Processes rasterizing diagram PDFs (with --local-pdf)')
+@click.option('--rebuild', is_flag=True, help='Re-render every card instead of reusing unchanged ones')
+def generate_flashcards(refresh_data, refresh_diagrams, local_pdf, ai_generate, ai_provider, workers, jobs, rebuild):
     """Generates org-drill flashcards from AWS reference architecture JSON files."""
 
     # Fetch JSON data if --refresh-data is used or no JSON files exist
     if refresh_data or not any(f.startswith('reference-architecture-diagrams-p') and f.endswith('.json') for f in os.listdir(directory)):
-        for page_num in range(1, 41):  # Assuming up to 40 pages
+        for page_num, data in fetch_pages(max_pages, workers):
             filename = f"reference-architecture-diagrams-p{page_num}.json"
-            print(f"Fetching Reference Architecture Diagrams page {page_num}")
-            data = fetch_json_data(page_num)
-            if data:
-                with open(filename, 'w') as f:
-                    json.dump(data, f, indent=4)
-            else:
-                break  # Stop if we get no data (likely reached the end of pages)
-
-    # Open the output file for writing
-    with open(output_file, 'w') as outfile:
-        # Iterate through all JSON files in the directory
-        for filename in sorted(os.listdir(directory)):
-            if filename.startswith('reference-architecture-diagrams-p') and filename.endswith('.json'):
-                with open(os.path.join(directory, filename), 'r') as f:
-                    data = json.load(f)
-
-                    # Iterate through items in the JSON data
-                    for item in data.get('items', []):
-                        item_data = item.get('item', {})
-                        additional_fields = item_data.get('additionalFields', {})
-
-                        # Remove HTML tags from the description
-                        clean_description = clean_text(re.sub('<.*?>', '', additional_fields.get('description', '')))
-
-                        # Process tags
-                        tags = process_tags(item.get('tags', []))
-
-                        # Determine the URL or local file link
-                        name = item_data.get('name', '')
-                        url = additional_fields.get('primaryURL', '')
-
-                        # Create a flattened dictionary for the template
-                        flattened_data = {
-                            'docTitle': clean_text(additional_fields.get('docTitle', '')),
-                            'tags': tags,
-                            'id': item_data.get('id', ''),
-                            'name': name,
-                            'dateCreated': item_data.get('dateCreated', ''),
-                            'primaryURL': url,
-                            'description': clean_description
-                        }
-
-                        if local_pdf:
-                            download_diagram(url, name, refresh=refresh_diagrams)
-                            link = process_diagram(url, name, refresh=refresh_diagrams)
-                            flattened_data['link'] = link or url  # Use URL as fallback if link is None
-                            rendered_content = local_template.render(flattened_data)
-                        else:
-                            flattened_data['link'] = url
-                            rendered_content = remote_template.render(flattened_data)
-
-                        # Write the rendered content to the output file
-                        outfile.write(rendered_content)
-                        outfile.write('\n')
-
-    print(f"Flashcards generated in {output_file}")
+            with open(filename, 'w') as f:
+                json.dump(data, f, indent=4)
+
+    if ai_generate:
+        click.echo(f"No {ai_provider} integration is available yet; --ai-generate keeps the standard templates.",
+                   err=True)
+
+    items = list(load_items(directory))
+    links = None
+    if local_pdf:
+        links = process_diagrams([(item['primaryURL'], item['name']) for item in items],
+                                 refresh=refresh_diagrams, workers=workers, jobs=jobs)
+
+    manifest = {} if rebuild else load_manifest(manifest_file)
+    with open(f"{output_file}.tmp", 'w') as outfile:
+        cards_manifest, rendered, reused = write_cards(outfile, card_entries(items, links, ai_generate), manifest)
+    changed = replace_if_changed(f"{output_file}.tmp", output_file)
+    with open(f"{manifest_file}.tmp", 'w') as f:
+        json.dump({'version': manifest_version, 'cards': cards_manifest}, f)
+    os.replace(f"{manifest_file}.tmp", manifest_file)
+
+    print(f"Rendered {rendered} new or changed card(s), reused {reused}")
+    print(f"Flashcards {'generated in' if changed else 'unchanged in'} {output_file}")
 
 if __name__ == '__main__':
     generate_flashcards()
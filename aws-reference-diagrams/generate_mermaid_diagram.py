@@ -1,40 +1,14 @@
-import json
-import re
-from typing import Dict, List, Tuple
+from typing import List, Tuple
 import click
-import boto3
-from botocore.exceptions import ClientError
 
-def load_icons_mapping(file_path: str) -> Dict[str, str]:
-    """Load the AWS icons mapping from a JSON file."""
-    with open(file_path, 'r') as f:
-        return json.load(f)
-
-def add_icons_to_mermaid(mermaid_diagram: str, icons_mapping: Dict[str, str]) -> str:
-    """Add AWS service icons to a Mermaid diagram."""
-    lines = mermaid_diagram.split('\n')
-    modified_lines = []
-    for line in lines:
-        match = re.match(r'^\s*(\w+(?:[:_]\w+)?)\s*\[(.*?)\]', line)
-        if match:
-            full_node_name = match.group(1)
-            node_label = match.group(2)
-            
-            node_parts = re.split(r'[:_]', full_node_name)
-            service_name = node_parts[0].lower()
-            
-            if service_name in icons_mapping:
-                icon_url = icons_mapping[service_name]
-                modified_line = f"{full_node_name}[<img src='{icon_url}' width='48' height='48' /><br>{node_label}]"
-                modified_lines.append(modified_line)
-            else:
-                modified_lines.append(line)
-        else:
-            modified_lines.append(line)
-    return '\n'.join(modified_lines)
+from aws_architecture_decomposition_lab.icons import add_icons_to_mermaid, load_icons_mapping, run_batch
 
 def mine_aws_data() -> Tuple[List[str], List[Tuple[str, str]]]:
     """Mine data from AWS to get resources and their connections."""
+    # boto3 is slow to import and only needed for --mine-aws.
+    import boto3
+    from botocore.exceptions import ClientError
+
     resources = []
     connections = []
     
@@ -87,13 +61,30 @@ def generate_mermaid_diagram(resources: List[str], connections: List[Tuple[str,
 
 @click.command()
 @click.option('--input-file', type=click.File('r'), help='Input Mermaid diagram file')
-@click.option('--output-file', type=click.File('w'), required=True, help='Output Mermaid diagram file')
+@click.option('--output-file', type=click.File('w'), help='Output Mermaid diagram file')
+@click.option('--input-dir', multiple=True, help='Directory or glob of Mermaid diagrams to process in batch')
+@click.option('--output-dir', type=click.Path(file_okay=False), help='Output directory for --input-dir')
+@click.option('--jobs', '-j', default=0, type=click.IntRange(min=0), help='Worker processes for --input-dir (0 uses every core)')
 @click.option('--icons', default='aws_icons_mapping.json', help='AWS icons mapping file', type=click.Path(exists=True))
 @click.option('--mine-aws', is_flag=True, help='Mine AWS data to generate diagram')
-def main(input_file, output_file, icons, mine_aws):
+@click.option('--all-nodes', is_flag=True, help='Decorate every node definition in place, not just a leading one per line')
+def main(input_file, output_file, input_dir, output_dir, jobs, icons, mine_aws, all_nodes):
     """Process a Mermaid diagram file and add AWS service icons, or generate a new diagram from AWS data."""
     icons_mapping = load_icons_mapping(icons)
-    
+
+    if input_dir:
+        if not output_dir:
+            click.echo("Error: --output-dir is required with --input-dir", err=True)
+            return
+        try:
+            run_batch(list(input_dir), output_dir, icons_mapping, jobs, echo=click.echo, all_nodes=all_nodes)
+        except ValueError as error:
+            raise click.UsageError(str(error))
+        return
+    if not output_file:
+        click.echo("Error: --output-file is required unless --input-dir is used", err=True)
+        return
+
     if mine_aws:
         click.echo("Mining AWS data...")
         resources, connections = mine_aws_data()
@@ -105,7 +96,7 @@ def main(input_file, output_file, icons, mine_aws):
         click.echo("Error: Either --input-file or --mine-aws must be specified", err=True)
         return
     
-    output_diagram = add_icons_to_mermaid(input_diagram, icons_mapping)
+    output_diagram = add_icons_to_mermaid(input_diagram, icons_mapping, all_nodes)
     
     output_file.write(output_diagram)
     click.echo(f"Processed diagram written to {output_file.name}")
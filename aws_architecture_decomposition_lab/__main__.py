@@ -0,0 +1,28 @@
+"""
+Command-line entry point: ``python -m aws_architecture_decomposition_lab <command>``.
+"""
+
+import click
+
+from aws_architecture_decomposition_lab.analytics import analytics
+from aws_architecture_decomposition_lab.corpus import corpus
+from aws_architecture_decomposition_lab.graph import graph
+from aws_architecture_decomposition_lab.lint import lint
+from aws_architecture_decomposition_lab.similarity import similar, similar_index
+
+
+@click.group()
+def cli():
+    """AWS architecture decomposition lab tools."""
+
+
+cli.add_command(analytics)
+cli.add_command(corpus)
+cli.add_command(graph)
+cli.add_command(lint)
+cli.add_command(similar)
+cli.add_command(similar_index)
+
+
+if __name__ == '__main__':
+    cli()
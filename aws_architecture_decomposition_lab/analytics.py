@@ -0,0 +1,156 @@
+"""
+Analytics over the frequency database.
+
+Reads come from summary structures that ``frequency`` keeps current inside
+each ingest transaction, so every query costs O(result) index lookups rather
+than a scan or join over the whole table:
+
+- top-N arcs walk ``idx_frequencies_count``;
+- in/out degree and weight per service come from ``service_degree``;
+- co-occurrence reads the sparse ``service_cooccurrence`` upper triangle,
+  whose diagonal is the number of diagrams containing each service.
+"""
+
+import sqlite3
+from typing import List, NamedTuple, Optional
+
+import click
+
+from aws_architecture_decomposition_lab import frequency
+
+
+class Arc(NamedTuple):
+    source: str
+    source_icon: Optional[str]
+    sink: str
+    sink_icon: Optional[str]
+    count: int
+
+
+class Degree(NamedTuple):
+    service: str
+    out_degree: int
+    in_degree: int
+    out_weight: int
+    in_weight: int
+
+
+class Cooccurrence(NamedTuple):
+    service: str
+    other: str
+    count: int
+    # count / diagrams containing either service
+    jaccard: float
+
+
+DEGREE_ORDERS = ('out_degree', 'in_degree', 'out_weight', 'in_weight')
+
+
+def top_arcs(conn: sqlite3.Connection, n: int = 10) -> List[Arc]:
+    """The n most frequent arcs with their icons (aws_architecture_arc_frequency.sql)."""
+    rows = conn.execute('''SELECT f.source_service, ss.icon_url, f.sink_service, sk.icon_url, f.count
+                           FROM frequencies f
+                           LEFT JOIN services ss ON f.source_service = ss.name
+                           LEFT JOIN services sk ON f.sink_service = sk.name
+                           ORDER BY f.count DESC
+                           LIMIT ?''', (n,))
+    return [Arc(*row) for row in rows]
+
+
+def degree(conn: sqlite3.Connection, service: str) -> Degree:
+    """In/out degree and weight of one service (all zero if it has no arcs)."""
+    row = conn.execute('SELECT * FROM service_degree WHERE service = ?', (service,)).fetchone()
+    return Degree(*row) if row else Degree(service, 0, 0, 0, 0)
+
+
+def top_degrees(conn: sqlite3.Connection, n: int = 10, order: str = 'out_degree') -> List[Degree]:
+    """The n services with the highest value of order (one of DEGREE_ORDERS)."""
+    if order not in DEGREE_ORDERS:
+        raise ValueError(f"order must be one of {DEGREE_ORDERS}, not {order!r}")
+    # service_degree has one row per service, so sorting it is bounded by the vocabulary.
+    rows = conn.execute(f'SELECT * FROM service_degree ORDER BY {order} DESC, service LIMIT ?', (n,))
+    return [Degree(*row) for row in rows]
+
+
+def diagram_count(conn: sqlite3.Connection, service: str) -> int:
+    """Number of ingested diagrams that contain service."""
+    row = conn.execute('SELECT count FROM service_cooccurrence WHERE service_a = ? AND service_b = ?',
+                       (service, service)).fetchone()
+    return row[0] if row else 0
+
+
+def _jaccard(conn: sqlite3.Connection, a: str, b: str, count: int) -> float:
+    union = diagram_count(conn, a) + diagram_count(conn, b) - count
+    return count / union if union else 0.0
+
+
+def cooccurring(conn: sqlite3.Connection, service: str, n: int = 10) -> List[Cooccurrence]:
+    """The n services that most often appear in the same diagram as service."""
+    rows = conn.execute('''SELECT service_b, count FROM service_cooccurrence
+                           WHERE service_a = ? AND service_b != ?
+                           UNION ALL
+                           SELECT service_a, count FROM service_cooccurrence
+                           WHERE service_b = ? AND service_a != ?
+                           ORDER BY count DESC, 1
+                           LIMIT ?''', (service, service, service, service, n))
+    return [Cooccurrence(service, other, count, _jaccard(conn, service, other, count)) for other, count in rows]
+
+
+def top_pairs(conn: sqlite3.Connection, n: int = 10) -> List[Cooccurrence]:
+    """The n most frequent pairs of distinct services appearing in the same diagram."""
+    rows = conn.execute('''SELECT service_a, service_b, count FROM service_cooccurrence
+                           WHERE service_a != service_b
+                           ORDER BY count DESC
+                           LIMIT ?''', (n,))
+    return [Cooccurrence(a, b, count, _jaccard(conn, a, b, count)) for a, b, count in rows]
+
+
+@click.group('analytics')
+@click.option('--db', default=frequency.DEFAULT_DB_PATH, help='Frequency database file.')
+@click.pass_context
+def analytics(ctx, db):
+    """Query arc, degree and co-occurrence summaries of the frequency database."""
+    ctx.obj = frequency.connect(db)
+    ctx.call_on_close(ctx.obj.close)
+
+
+@analytics.command('top-arcs')
+@click.option('-n', default=10, type=click.IntRange(min=1), help='Number of arcs.')
+@click.pass_obj
+def top_arcs_command(conn, n):
+    """Most frequent service-to-service arcs."""
+    for arc in top_arcs(conn, n):
+        click.echo(f"{arc.count:>8}  {arc.source} -> {arc.sink}")
+
+
+@analytics.command('degree')
+@click.argument('services', nargs=-1)
+@click.option('-n', default=10, type=click.IntRange(min=1), help='Number of services when none are named.')
+@click.option('--order', type=click.Choice(DEGREE_ORDERS), default='out_degree', help='Ranking column.')
+@click.pass_obj
+def degree_command(conn, services, n, order):
+    """In/out degree and weight of SERVICES, or the top services by --order."""
+    rows = [degree(conn, service) for service in services] if services else top_degrees(conn, n, order)
+    click.echo(f"{'service':<20} {'out':>5} {'in':>5} {'out_w':>8} {'in_w':>8}")
+    for row in rows:
+        click.echo(f"{row.service:<20} {row.out_degree:>5} {row.in_degree:>5} {row.out_weight:>8} {row.in_weight:>8}")
+
+
+@analytics.command('cooccur')
+@click.argument('service', required=False)
+@click.option('-n', default=10, type=click.IntRange(min=1), help='Number of pairs.')
+@click.pass_obj
+def cooccur_command(conn, service, n):
+    """Services most often in the same diagram as SERVICE, or the top pairs overall."""
+    rows = cooccurring(conn, service, n) if service else top_pairs(conn, n)
+    for row in rows:
+        click.echo(f"{row.count:>8}  {row.service} + {row.other}  (jaccard {row.jaccard:.2f})")
+
+
+@analytics.command('rebuild')
+@click.pass_obj
+def rebuild_command(conn):
+    """Recompute service_degree from the arc counts."""
+    with conn:
+        frequency.rebuild_degrees(conn)
+    click.echo('Rebuilt service_degree.', err=True)
@@ -0,0 +1,205 @@
+"""
+Synthetic Mermaid corpus generator.
+
+Emits flowcharts in the ``prefix:service[label]`` node convention, with
+edges, edge labels and subgraphs, for load-testing the auditors, the icon
+processor and the frequency ingest. Services are drawn from the icon mapping
+(uniformly) or from learned frequencies, in which case each edge's sink is
+drawn from the Markov chain's transitions out of its source. Every diagram
+gets its own generator seeded with ``(seed, index)``, so a corpus is
+reproducible and any single file can be regenerated on its own.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Mapping, NamedTuple, Optional, Tuple
+
+import click
+import numpy as np
+
+from aws_architecture_decomposition_lab import frequency
+from aws_architecture_decomposition_lab.files import write_if_changed
+from aws_architecture_decomposition_lab.frequency import DEFAULT_DB_PATH
+from aws_architecture_decomposition_lab.markov import MarkovChain, chain_cache_dir, load_cached_chain
+from aws_architecture_decomposition_lab.mermaid import format_node
+from aws_architecture_decomposition_lab.services import SERVICE_NAMES, VALID_PREFIXES
+
+ACTIONS = ('Ingest', 'Process', 'Store', 'Serve', 'Query', 'Publish', 'Route', 'Cache', 'Analyze', 'Notify')
+EDGE_LABELS = ('events', 'requests', 'records', 'writes', 'reads', 'metrics', 'triggers', 'streams')
+# Plausible mistakes: generic or vendor prefixes that are not in the icon mapping.
+INVALID_PREFIXES = tuple(prefix for prefix in ('aws', 'amazon', 'svc', 'api', 'db', 'queue', 'storage', 'compute')
+                         if prefix not in VALID_PREFIXES)
+
+
+class CorpusConfig(NamedTuple):
+    nodes: int = 12
+    fan_out: int = 2
+    subgraphs: int = 2
+    invalid_share: float = 0.05
+    edge_label_share: float = 0.3
+
+
+DEFAULT_CONFIG = CorpusConfig()
+
+
+def _sample_service(rng: np.random.Generator, services: List[str], chain: Optional[MarkovChain],
+                    source: Optional[str]) -> str:
+    if chain is None:
+        return services[int(rng.integers(len(services)))]
+    if source is None or source not in chain.index:
+        return chain.states[chain.sample_initial(rng)]
+    row = chain.step(chain.index[source], rng)
+    return chain.states[row] if row >= 0 else chain.states[chain.sample_initial(rng)]
+
+
+def generate_diagram(seed: int, index: int, config: CorpusConfig = DEFAULT_CONFIG,
+                     chain: Optional[MarkovChain] = None, names: Mapping[str, str] = SERVICE_NAMES) -> str:
+    """
+    Generate one synthetic diagram.
+
+    Node ``i`` hangs off a random earlier node, so the graph is connected, and
+    up to ``fan_out - 1`` extra edges per node point to later nodes.
+
+    Args:
+        seed (int): Corpus seed.
+        index (int): Diagram index within the corpus.
+        config (CorpusConfig): Size, fan-out, subgraph and invalid-prefix settings.
+        chain (Optional[MarkovChain]): Learned chain; services come uniformly from ``names`` when omitted.
+        names (Mapping[str, str]): Prefix to display-name mapping used for labels.
+
+    Returns:
+        str: The diagram source, newline-terminated.
+    """
+    rng = np.random.default_rng([seed, index])
+    services = sorted(names)
+    parents = [-1] + [int(rng.integers(i)) for i in range(1, config.nodes)]
+    chosen: List[str] = []
+    for parent in parents:
+        chosen.append(_sample_service(rng, services, chain, chosen[parent] if parent >= 0 else None))
+
+    ids, definitions = [], []
+    for i, service in enumerate(chosen):
+        prefix = service
+        if INVALID_PREFIXES and rng.random() < config.invalid_share:
+            prefix = INVALID_PREFIXES[int(rng.integers(len(INVALID_PREFIXES)))]
+        node_id = f"{prefix}:{service}{i}"
+        label = f"{ACTIONS[int(rng.integers(len(ACTIONS)))]} {names.get(service, service)}"
+        ids.append(node_id)
+        definitions.append(format_node(node_id, label, 'rect'))
+
+    edges: List[Tuple[int, int]] = [(parent, i) for i, parent in enumerate(parents) if parent >= 0]
+    for i in range(config.nodes - 1):
+        for _ in range(int(rng.integers(max(config.fan_out, 1)))):
+            edges.append((i, int(rng.integers(i + 1, config.nodes))))
+
+    groups = rng.integers(config.subgraphs + 1, size=config.nodes) if config.subgraphs else np.zeros(config.nodes)
+    lines = [f"graph {'TD' if rng.random() < 0.5 else 'LR'}"]
+    lines.extend(f"    {definitions[i]}" for i in range(config.nodes) if groups[i] == 0)
+    for group in range(1, config.subgraphs + 1):
+        members = [definitions[i] for i in range(config.nodes) if groups[i] == group]
+        if members:
+            lines.append(f"    subgraph Group{group}[Tier {group}]")
+            lines.extend(f"        {definition}" for definition in members)
+            lines.append('    end')
+    for source, sink in sorted(set(edges)):
+        if rng.random() < config.edge_label_share:
+            arrow = f"-->|{EDGE_LABELS[int(rng.integers(len(EDGE_LABELS)))]}|"
+        else:
+            arrow = '-->'
+        lines.append(f"    {ids[source]} {arrow} {ids[sink]}")
+    return '\n'.join(lines) + '\n'
+
+
+def corpus_path(output_dir: str, index: int, shard_size: int = 1000) -> str:
+    """File name of diagram index, in shard subdirectories of shard_size files (0 for none)."""
+    name = f"synthetic-{index:07d}.mmd"
+    if shard_size:
+        return os.path.join(output_dir, f"{index // shard_size:04d}", name)
+    return os.path.join(output_dir, name)
+
+
+class CorpusStats(NamedTuple):
+    files: int
+    changed: int
+    bytes: int
+
+
+def write_corpus(output_dir: str, count: int, seed: int = 0, config: CorpusConfig = DEFAULT_CONFIG,
+                 chain: Optional[MarkovChain] = None, shard_size: int = 1000, start: int = 0) -> CorpusStats:
+    """
+    Write diagrams ``start .. start + count - 1`` under output_dir.
+
+    Unchanged files are left untouched, so regenerating a corpus with the same
+    seed is cheap.
+
+    Returns:
+        CorpusStats: Files generated, files actually rewritten and total bytes.
+    """
+    changed = size = 0
+    made = set()
+    for index in range(start, start + count):
+        path = corpus_path(output_dir, index, shard_size)
+        directory = os.path.dirname(path)
+        if directory not in made:
+            os.makedirs(directory, exist_ok=True)
+            made.add(directory)
+        data = generate_diagram(seed, index, config, chain).encode('utf-8')
+        changed += write_if_changed(path, data)
+        size += len(data)
+    return CorpusStats(count, changed, size)
+
+
+def _write_chunk(args: Tuple[str, int, int, int, CorpusConfig, Optional[MarkovChain], int]) -> CorpusStats:
+    output_dir, start, count, seed, config, chain, shard_size = args
+    return write_corpus(output_dir, count, seed, config, chain, shard_size, start)
+
+
+def write_corpus_parallel(output_dir: str, count: int, seed: int = 0, config: CorpusConfig = DEFAULT_CONFIG,
+                          chain: Optional[MarkovChain] = None, shard_size: int = 1000, jobs: int = 0) -> CorpusStats:
+    """``write_corpus`` split into shard-aligned chunks on a process pool; the files are identical."""
+    jobs = jobs or os.cpu_count() or 1
+    chunk = shard_size or 1000
+    tasks = [(output_dir, start, min(chunk, count - start), seed, config, chain, shard_size)
+             for start in range(0, count, chunk)]
+    if jobs == 1 or len(tasks) == 1:
+        results = map(_write_chunk, tasks)
+        return CorpusStats(*(sum(column) for column in zip(*results)))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return CorpusStats(*(sum(column) for column in zip(*executor.map(_write_chunk, tasks))))
+
+
+@click.command('corpus')
+@click.argument('output_dir')
+@click.option('--count', '-n', default=1000, type=click.IntRange(min=1), help='Number of diagrams.')
+@click.option('--seed', default=0, help='Corpus seed; the same seed yields the same files.')
+@click.option('--nodes', default=DEFAULT_CONFIG.nodes, type=click.IntRange(min=1), help='Nodes per diagram.')
+@click.option('--fan-out', default=DEFAULT_CONFIG.fan_out, type=click.IntRange(min=1),
+              help='Maximum outgoing edges per node.')
+@click.option('--subgraphs', default=DEFAULT_CONFIG.subgraphs, type=click.IntRange(min=0),
+              help='Subgraphs per diagram.')
+@click.option('--invalid-share', default=DEFAULT_CONFIG.invalid_share, type=click.FloatRange(0, 1),
+              help='Share of nodes given an invalid prefix.')
+@click.option('--weights', type=click.Choice(['mapping', 'learned']), default='mapping',
+              help='Draw services uniformly from the icon mapping, or from the learned frequencies.')
+@click.option('--db', default=DEFAULT_DB_PATH, help='Frequency database for --weights learned.')
+@click.option('--shard-size', default=1000, type=click.IntRange(min=0),
+              help='Files per subdirectory (0 writes a flat directory).')
+@click.option('--jobs', '-j', default=0, type=click.IntRange(min=0), help='Worker processes (0 = all cores).')
+def corpus(output_dir, count, seed, nodes, fan_out, subgraphs, invalid_share, weights, db, shard_size, jobs):
+    """Generate a reproducible synthetic Mermaid corpus in OUTPUT_DIR."""
+    chain = None
+    if weights == 'learned':
+        conn = frequency.connect(db)
+        try:
+            chain = load_cached_chain(conn, chain_cache_dir(db))[0]
+        except ValueError:
+            raise click.UsageError(f"no arcs in {db}; run ingest first or use --weights mapping")
+        finally:
+            conn.close()
+    config = CorpusConfig(nodes, fan_out, subgraphs, invalid_share)
+    start = time.perf_counter()
+    stats = write_corpus_parallel(output_dir, count, seed, config, chain, shard_size, jobs)
+    elapsed = time.perf_counter() - start
+    click.echo(f"Generated {stats.files:,} diagram(s) ({stats.changed:,} written, {stats.bytes / 1e6:.1f} MB) "
+               f"in {elapsed:.2f} s ({stats.files / elapsed:,.0f} files/s).", err=True)
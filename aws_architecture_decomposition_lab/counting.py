@@ -0,0 +1,62 @@
+"""
+Service counting engines behind the simulator's ``--method`` option.
+
+Every engine takes a sequence of service names and returns the frequency of
+each known AWS service; unknown names are dropped. The results are identical
+across engines, only the cost differs:
+
+- ``itertools``: ``collections.Counter`` over a filter, C-speed counting.
+- ``map_reduce``: ``(service, 1)`` pairs folded into one accumulator, linear.
+- ``pure_python``: an explicit dictionary loop.
+- ``numpy``: ``np.unique(return_counts=True)``; cheapest when the input is
+  already an array, since the known-service filter runs on distinct names only.
+"""
+
+from collections import Counter
+from functools import reduce
+from typing import Callable, Dict, Mapping, Sequence, Tuple
+
+import numpy as np
+
+from aws_architecture_decomposition_lab.services import SERVICE_NAMES
+
+
+def count_itertools(services: Sequence[str], known: Mapping[str, str] = SERVICE_NAMES) -> Dict[str, int]:
+    """Count known services with Counter."""
+    return dict(Counter(filter(known.__contains__, services)))
+
+
+def _accumulate(acc: Dict[str, int], pair: Tuple[str, int]) -> Dict[str, int]:
+    acc[pair[0]] = acc.get(pair[0], 0) + pair[1]
+    return acc
+
+
+def count_map_reduce(services: Sequence[str], known: Mapping[str, str] = SERVICE_NAMES) -> Dict[str, int]:
+    """Count known services by mapping to (service, 1) and reducing into one mutable accumulator."""
+    mapped = ((service, 1) for service in services if service in known)
+    return reduce(_accumulate, mapped, {})
+
+
+def count_pure_python(services: Sequence[str], known: Mapping[str, str] = SERVICE_NAMES) -> Dict[str, int]:
+    """Count known services with a dictionary loop."""
+    frequency = {}
+    for service in services:
+        if service in known:
+            frequency[service] = frequency.get(service, 0) + 1
+    return frequency
+
+
+def count_numpy(services: Sequence[str], known: Mapping[str, str] = SERVICE_NAMES) -> Dict[str, int]:
+    """Count known services with np.unique; accepts a list or a NumPy string array."""
+    if len(services) == 0:
+        return {}
+    names, counts = np.unique(np.asarray(services), return_counts=True)
+    return {name: int(count) for name, count in zip(names.tolist(), counts.tolist()) if name in known}
+
+
+ENGINES: Dict[str, Callable[[Sequence[str]], Dict[str, int]]] = {
+    'itertools': count_itertools,
+    'map_reduce': count_map_reduce,
+    'pure_python': count_pure_python,
+    'numpy': count_numpy,
+}
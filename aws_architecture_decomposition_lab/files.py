@@ -0,0 +1,88 @@
+"""
+File helpers shared by the corpus tools: content hashing, atomic writes and
+input expansion.
+"""
+
+import glob
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import IO, Iterable, Iterator, List
+
+
+def sha256_bytes(data: bytes) -> str:
+    """Hex SHA-256 digest of a byte string."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def sha256_file(path: str, chunk_size: int = 1 << 20) -> str:
+    """Hex SHA-256 digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@contextmanager
+def atomic_open(path: str, mode: str = 'w') -> Iterator[IO]:
+    """
+    Open a temporary file in path's directory for writing; on success it is renamed over path.
+
+    Readers see either the old file or the complete new one, never a partial
+    write, and path keeps its contents until then, so it may also be the file
+    being read. On an exception the temporary file is removed and path is untouched.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        file_mode = os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        file_mode = 0o644
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+        os.chmod(tmp_path, file_mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def atomic_write(path: str, data: bytes) -> None:
+    """Write data to path via a temporary file in the same directory and a rename."""
+    with atomic_open(path, 'wb') as f:
+        f.write(data)
+
+
+def write_if_changed(path: str, data: bytes) -> bool:
+    """Atomically write data unless path already holds exactly these bytes; return True if written."""
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    except FileNotFoundError:
+        pass
+    atomic_write(path, data)
+    return True
+
+
+def expand_paths(inputs: Iterable[str], suffix: str = '.mmd') -> List[str]:
+    """
+    Expand files, directories and glob patterns into a sorted list of files.
+
+    Directories are walked recursively for files ending in ``suffix``; glob
+    patterns may use ``**``. Duplicates are removed.
+    """
+    paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                paths.update(os.path.join(root, file) for file in files if file.endswith(suffix))
+        elif glob.has_magic(item):
+            paths.update(path for path in glob.glob(item, recursive=True) if os.path.isfile(path))
+        else:
+            paths.add(item)
+    return sorted(paths)
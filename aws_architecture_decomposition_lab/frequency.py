@@ -0,0 +1,394 @@
+"""
+Service frequency database.
+
+Schema, connection setup and bulk upserts for ``aws_service_frequency.db``:
+service counts in ``service_frequency`` and service-to-service arc counts in
+``frequencies``. Corpus ingest parses diagrams in batches, aggregates counts
+in memory and applies them with one ``executemany`` per table inside a
+single transaction per batch. Ingested files are recorded by content hash,
+claimed in the same transaction that adds their counts, so re-running over
+the same corpus, or two ingests running at once, does not double-count.
+
+``ingest_paths_parallel`` is the map-reduce variant for large corpora:
+worker processes read, hash and parse shards of files into ``Counter``s;
+the counts of newly claimed files are merged pairwise (a tree reduce) and
+applied by the calling process in one transaction, with results identical
+to the sequential path.
+
+Every write through the upsert helpers bumps ``frequency_version`` in the
+``metadata`` table, so derived artefacts such as the compiled Markov chain
+can tell whether they are stale without rescanning the counts.
+
+Summary tables for ``analytics`` are maintained in the same transactions:
+``service_degree`` (in/out degree and weight per service) by triggers on
+``frequencies``, and the sparse ``service_cooccurrence`` matrix (pairs of
+services appearing in the same diagram, document frequency on the diagonal)
+by ``upsert_cooccurrence_counts`` alongside each ingest batch.
+"""
+
+import json
+import os
+import sqlite3
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from typing import Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Set, Tuple
+
+from aws_architecture_decomposition_lab import mermaid
+from aws_architecture_decomposition_lab.files import sha256_bytes
+from aws_architecture_decomposition_lab.services import ICONS_MAPPING_PATH, SERVICE_NAMES
+
+DEFAULT_DB_PATH = 'aws_service_frequency.db'
+# How long a connection waits for another process's write lock before failing.
+DEFAULT_BUSY_TIMEOUT = 30.0
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS service_frequency
+    (service TEXT PRIMARY KEY, frequency INTEGER);
+CREATE TABLE IF NOT EXISTS ingested_files
+    (sha256 TEXT PRIMARY KEY, path TEXT NOT NULL,
+     ingested_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP);
+CREATE TABLE IF NOT EXISTS services
+    (id INTEGER PRIMARY KEY AUTOINCREMENT,
+     name TEXT UNIQUE NOT NULL,
+     icon_url TEXT);
+CREATE TABLE IF NOT EXISTS frequencies
+    (id INTEGER PRIMARY KEY AUTOINCREMENT,
+     source_service TEXT NOT NULL,
+     sink_service TEXT NOT NULL,
+     count INTEGER DEFAULT 1,
+     FOREIGN KEY (source_service) REFERENCES services (name),
+     FOREIGN KEY (sink_service) REFERENCES services (name),
+     UNIQUE (source_service, sink_service));
+CREATE TABLE IF NOT EXISTS metadata
+    (key TEXT PRIMARY KEY, value NOT NULL);
+INSERT OR IGNORE INTO metadata (key, value) VALUES ('frequency_version', 0);
+INSERT OR IGNORE INTO metadata (key, value) VALUES ('db_id', lower(hex(randomblob(8))));
+-- Top-N arcs (aws_architecture_arc_frequency.sql) walk this index instead of sorting the table.
+CREATE INDEX IF NOT EXISTS idx_frequencies_count
+    ON frequencies (count DESC, source_service, sink_service);
+-- In-degree lookups; out-degree uses the UNIQUE (source_service, sink_service) index.
+CREATE INDEX IF NOT EXISTS idx_frequencies_sink
+    ON frequencies (sink_service, source_service, count);
+CREATE TABLE IF NOT EXISTS service_degree
+    (service TEXT PRIMARY KEY,
+     out_degree INTEGER NOT NULL DEFAULT 0,
+     in_degree INTEGER NOT NULL DEFAULT 0,
+     out_weight INTEGER NOT NULL DEFAULT 0,
+     in_weight INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS trg_frequencies_degree_insert AFTER INSERT ON frequencies BEGIN
+    INSERT INTO service_degree (service, out_degree, out_weight) VALUES (NEW.source_service, 1, NEW.count)
+        ON CONFLICT (service) DO UPDATE SET out_degree = out_degree + 1, out_weight = out_weight + NEW.count;
+    INSERT INTO service_degree (service, in_degree, in_weight) VALUES (NEW.sink_service, 1, NEW.count)
+        ON CONFLICT (service) DO UPDATE SET in_degree = in_degree + 1, in_weight = in_weight + NEW.count;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_frequencies_degree_update AFTER UPDATE OF count ON frequencies BEGIN
+    UPDATE service_degree SET out_weight = out_weight + NEW.count - OLD.count WHERE service = NEW.source_service;
+    UPDATE service_degree SET in_weight = in_weight + NEW.count - OLD.count WHERE service = NEW.sink_service;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_frequencies_degree_delete AFTER DELETE ON frequencies BEGIN
+    UPDATE service_degree SET out_degree = out_degree - 1, out_weight = out_weight - OLD.count
+        WHERE service = OLD.source_service;
+    UPDATE service_degree SET in_degree = in_degree - 1, in_weight = in_weight - OLD.count
+        WHERE service = OLD.sink_service;
+END;
+-- Upper triangle (service_a <= service_b) of the diagram co-occurrence matrix.
+CREATE TABLE IF NOT EXISTS service_cooccurrence
+    (service_a TEXT NOT NULL,
+     service_b TEXT NOT NULL,
+     count INTEGER NOT NULL,
+     PRIMARY KEY (service_a, service_b)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_cooccurrence_b
+    ON service_cooccurrence (service_b, service_a, count);
+CREATE INDEX IF NOT EXISTS idx_cooccurrence_count
+    ON service_cooccurrence (count DESC, service_a, service_b);
+'''
+
+REBUILD_DEGREES = '''
+DELETE FROM service_degree;
+INSERT INTO service_degree (service, out_degree, out_weight)
+    SELECT source_service, COUNT(*), SUM(count) FROM frequencies GROUP BY source_service;
+INSERT INTO service_degree (service, in_degree, in_weight)
+    SELECT sink_service, COUNT(*), SUM(count) FROM frequencies WHERE true GROUP BY sink_service
+    ON CONFLICT (service) DO UPDATE SET in_degree = excluded.in_degree, in_weight = excluded.in_weight;
+'''
+
+
+def connect(path: str = DEFAULT_DB_PATH, busy_timeout: float = DEFAULT_BUSY_TIMEOUT) -> sqlite3.Connection:
+    """
+    Open the frequency database in WAL mode and create the schema.
+
+    WAL lets readers proceed while a writer holds the lock; ``busy_timeout``
+    makes concurrent writers queue for it instead of failing with
+    ``database is locked``.
+
+    Args:
+        path (str): SQLite database file.
+        busy_timeout (float): Seconds to wait for the write lock.
+
+    Returns:
+        sqlite3.Connection: The open connection.
+    """
+    conn = sqlite3.connect(path, timeout=busy_timeout)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript(SCHEMA)
+    with open(ICONS_MAPPING_PATH, 'r') as f:
+        conn.executemany('INSERT OR IGNORE INTO services (name, icon_url) VALUES (?, ?)', json.load(f).items())
+    # Backfill degrees for databases filled before the triggers existed (or re-seeded by SQL).
+    if (conn.execute('SELECT 1 FROM frequencies LIMIT 1').fetchone()
+            and not conn.execute('SELECT 1 FROM service_degree LIMIT 1').fetchone()):
+        rebuild_degrees(conn)
+    conn.commit()
+    return conn
+
+
+def rebuild_degrees(conn: sqlite3.Connection) -> None:
+    """Recompute service_degree from frequencies; the caller commits."""
+    for statement in REBUILD_DEGREES.strip().split(';\n'):
+        conn.execute(statement)
+
+
+def bump_version(conn: sqlite3.Connection) -> None:
+    """Mark the frequency counts as changed; the caller commits."""
+    conn.execute("UPDATE metadata SET value = value + 1 WHERE key = 'frequency_version'")
+
+
+def frequency_version(conn: sqlite3.Connection) -> str:
+    """
+    Identify the current state of the frequency counts.
+
+    Returns:
+        str: ``<db_id>-<version>``; the random ``db_id`` keeps a recreated database
+        from matching artefacts built from an older one.
+    """
+    meta = dict(conn.execute("SELECT key, value FROM metadata WHERE key IN ('db_id', 'frequency_version')"))
+    return f"{meta['db_id']}-{meta['frequency_version']}"
+
+
+def count_services(services: Iterable[str], known: Mapping[str, str] = SERVICE_NAMES) -> Counter:
+    """Count the known AWS services in an iterable of service names."""
+    return Counter(service for service in services if service in known)
+
+
+def upsert_service_counts(conn: sqlite3.Connection, counts: Mapping[str, int]) -> None:
+    """Add counts to service_frequency with one statement per distinct service; the caller commits."""
+    if not counts:
+        return
+    bump_version(conn)
+    conn.executemany('''INSERT INTO service_frequency (service, frequency)
+                        VALUES (?, ?)
+                        ON CONFLICT(service) DO UPDATE SET
+                        frequency = frequency + excluded.frequency''', counts.items())
+
+
+def count_arcs(arcs: Iterable[Tuple[str, str]], known: Mapping[str, str] = SERVICE_NAMES) -> Counter:
+    """Count the arcs whose source and sink are both known AWS services."""
+    return Counter(arc for arc in arcs if arc[0] in known and arc[1] in known)
+
+
+def upsert_arc_counts(conn: sqlite3.Connection, counts: Mapping[Tuple[str, str], int]) -> None:
+    """Add arc counts to frequencies with one statement per distinct arc; the caller commits."""
+    if not counts:
+        return
+    bump_version(conn)
+    conn.executemany('''INSERT INTO frequencies (source_service, sink_service, count)
+                        VALUES (?, ?, ?)
+                        ON CONFLICT(source_service, sink_service) DO UPDATE SET
+                        count = count + excluded.count''',
+                     ((source, sink, count) for (source, sink), count in counts.items()))
+
+
+def load_service_counts(conn: sqlite3.Connection) -> Dict[str, int]:
+    """Every service with its accumulated frequency."""
+    return dict(conn.execute('SELECT service, frequency FROM service_frequency'))
+
+
+def load_arc_counts(conn: sqlite3.Connection) -> Dict[Tuple[str, str], int]:
+    """Every (source, sink) arc with its accumulated count."""
+    return {(source, sink): count for source, sink, count in
+            conn.execute('SELECT source_service, sink_service, count FROM frequencies')}
+
+
+def count_cooccurrence(services: Iterable[str], known: Mapping[str, str] = SERVICE_NAMES) -> Counter:
+    """
+    Co-occurrence counts contributed by one diagram.
+
+    Every unordered pair of distinct known services counts once, as
+    ``(a, b)`` with ``a < b``; each service also counts once as ``(a, a)``.
+    """
+    present = sorted({service for service in services if service in known})
+    counts = Counter((a, a) for a in present)
+    counts.update(combinations(present, 2))
+    return counts
+
+
+def upsert_cooccurrence_counts(conn: sqlite3.Connection, counts: Mapping[Tuple[str, str], int]) -> None:
+    """Add pair counts to service_cooccurrence; the caller commits."""
+    conn.executemany('''INSERT INTO service_cooccurrence (service_a, service_b, count)
+                        VALUES (?, ?, ?)
+                        ON CONFLICT(service_a, service_b) DO UPDATE SET
+                        count = count + excluded.count''',
+                     ((a, b, count) for (a, b), count in counts.items()))
+
+
+class IngestStats(NamedTuple):
+    files: int
+    skipped: int
+    services: int
+    arcs: int
+
+
+def ingested_hashes(conn: sqlite3.Connection) -> Set[str]:
+    """Content hashes of every file already ingested."""
+    return {row[0] for row in conn.execute('SELECT sha256 FROM ingested_files')}
+
+
+def claim_files(conn: sqlite3.Connection, records: List[Tuple[str, str]]) -> List[int]:
+    """
+    Record ``(sha256, path)`` pairs as ingested; the caller commits.
+
+    Call this inside the transaction that writes the files' counts: the
+    claim, not an earlier read of ``ingested_hashes``, decides whether a file
+    is new, so concurrent ingests of the same content count it exactly once.
+
+    Returns:
+        List[int]: Indexes into records of the files this transaction claimed.
+    """
+    claimed = []
+    for index, record in enumerate(records):
+        if conn.execute('INSERT OR IGNORE INTO ingested_files (sha256, path) VALUES (?, ?)', record).rowcount:
+            claimed.append(index)
+    return claimed
+
+
+def _batches(paths: List[str], size: int) -> Iterator[List[str]]:
+    for start in range(0, len(paths), size):
+        yield paths[start:start + size]
+
+
+def count_source(data: bytes) -> Tuple[Counter, Counter, Counter]:
+    """Service, arc and co-occurrence counts of one diagram's source."""
+    diagram = mermaid.parse(data.decode('utf-8'))
+    services = diagram.services()
+    return count_services(services), count_arcs(diagram.arcs()), count_cooccurrence(services)
+
+
+def count_file(path: str) -> Tuple[Counter, Counter, Counter]:
+    """Service, arc and co-occurrence counts of one diagram file."""
+    with open(path, 'rb') as f:
+        return count_source(f.read())
+
+
+def _write_claimed(conn: sqlite3.Connection, entries: List[Tuple[str, str, Tuple[Counter, Counter, Counter]]]
+                   ) -> Tuple[int, int, int]:
+    """Claim ``(sha256, path, counts)`` entries and add the counts of the claimed ones, in one transaction."""
+    with conn:
+        claimed = [entries[i][2] for i in claim_files(conn, [(digest, path) for digest, path, _ in entries])]
+        counts = tree_merge([services for services, _, _ in claimed])
+        arc_counts = tree_merge([arcs for _, arcs, _ in claimed])
+        pair_counts = tree_merge([pairs for _, _, pairs in claimed])
+        upsert_service_counts(conn, counts)
+        upsert_arc_counts(conn, arc_counts)
+        upsert_cooccurrence_counts(conn, pair_counts)
+    return len(claimed), sum(counts.values()), sum(arc_counts.values())
+
+
+def ingest_paths(conn: sqlite3.Connection, paths: List[str], batch_size: int = 1000) -> IngestStats:
+    """
+    Ingest diagrams into the frequency database.
+
+    Files whose hash was already ingested when the run started are skipped
+    without being parsed; the rest are claimed in the transaction that adds
+    their counts (see ``claim_files``), so a file ingested meanwhile by
+    another process is skipped too.
+
+    Args:
+        conn (sqlite3.Connection): Connection from ``connect``.
+        paths (List[str]): Diagram files to ingest.
+        batch_size (int): Files aggregated per transaction.
+
+    Returns:
+        IngestStats: Files ingested, files skipped as already seen, services and arcs counted.
+    """
+    seen = ingested_hashes(conn)
+    files = total = total_arcs = 0
+    for batch in _batches(paths, batch_size):
+        entries = []
+        for path in batch:
+            with open(path, 'rb') as f:
+                data = f.read()
+            digest = sha256_bytes(data)
+            if digest in seen:
+                continue
+            seen.add(digest)
+            entries.append((digest, path, count_source(data)))
+        claimed, services, arcs = _write_claimed(conn, entries)
+        files += claimed
+        total += services
+        total_arcs += arcs
+    return IngestStats(files, len(paths) - files, total, total_arcs)
+
+
+def tree_merge(partials: List[Counter]) -> Counter:
+    """Merge partial counts pairwise, level by level, into one Counter."""
+    if not partials:
+        return Counter()
+    while len(partials) > 1:
+        merged = []
+        for left, right in zip(partials[::2], partials[1::2]):
+            left.update(right)
+            merged.append(left)
+        if len(partials) % 2:
+            merged.append(partials[-1])
+        partials = merged
+    return partials[0]
+
+
+_worker_seen: Set[str] = set()
+
+
+def _init_ingest_worker(seen: Set[str]) -> None:
+    global _worker_seen
+    _worker_seen = seen
+
+
+def _hash_and_count_shard(paths: List[str]) -> List[Tuple[str, str, Optional[Tuple[Counter, Counter, Counter]]]]:
+    """Read each file once, hashing it and counting it unless its hash is already ingested."""
+    results = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = sha256_bytes(data)
+        results.append((digest, path, None if digest in _worker_seen else count_source(data)))
+    return results
+
+
+def ingest_paths_parallel(conn: sqlite3.Connection, paths: List[str], jobs: int = 0,
+                          shard_size: int = 256) -> IngestStats:
+    """
+    Ingest diagrams with a process pool; the result equals ``ingest_paths``.
+
+    Worker processes read each file once, hashing it and, unless it was
+    already ingested when the run started, parsing it into service, arc and
+    co-occurrence ``Counter``s, in shards of ``shard_size`` files. This
+    process then claims the new files in path order and tree-merges the
+    counts of the claimed ones, all in a single transaction, so duplicates
+    within the run and files ingested concurrently elsewhere count once.
+
+    Args:
+        conn (sqlite3.Connection): Connection from ``connect``.
+        paths (List[str]): Diagram files to ingest.
+        jobs (int): Worker processes (0 = all cores).
+        shard_size (int): Files read per worker task.
+
+    Returns:
+        IngestStats: Files ingested, files skipped as already seen, services and arcs counted.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    seen = ingested_hashes(conn)
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_ingest_worker, initargs=(seen,)) as executor:
+        entries = [entry for shard in executor.map(_hash_and_count_shard, _batches(paths, shard_size))
+                   for entry in shard if entry[2] is not None]
+    claimed, services, arcs = _write_claimed(conn, entries)
+    return IngestStats(claimed, len(paths) - claimed, services, arcs)
@@ -0,0 +1,379 @@
+"""
+Compact graph store of a diagram corpus.
+
+Compiles every diagram into one node-level graph: node ids, file names and
+service prefixes are interned to integers, edges are stored as CSR
+adjacency (forward and reverse) in NumPy arrays, and the service-level
+graph (arc counts between services) is kept alongside. A store is a
+directory of ``.npy`` files plus ``strings.json`` and is memory-mapped on
+load, so queries start without re-parsing the corpus.
+
+Queries cover reachability and shortest paths between services, degree and
+betweenness centrality per service, cycles (strongly connected components
+within a diagram) and orphaned nodes.
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from array import array
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import click
+import numpy as np
+
+from aws_architecture_decomposition_lab import mermaid
+from aws_architecture_decomposition_lab.files import expand_paths
+
+DEFAULT_STORE_PATH = 'aws_graph_store'
+ARRAYS = ('node_file', 'node_service', 'indptr', 'indices', 'rindptr', 'rindices',
+          'service_indptr', 'service_indices', 'service_weights')
+
+
+class NodeRef(NamedTuple):
+    path: str
+    node: str
+
+
+def _csr(sources: np.ndarray, targets: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    order = np.lexsort((targets, sources))
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=n), out=indptr[1:])
+    return indptr, targets[order].astype(np.int32)
+
+
+class GraphStore:
+    """
+    CSR graphs of a corpus.
+
+    Attributes:
+        files (List[str]): Diagram paths; ``node_file`` indexes this list.
+        nodes (List[str]): Node id of every node, in global node order.
+        services (List[str]): Interned service prefixes; ``node_service`` indexes this list (-1 for none).
+        indptr, indices: Forward CSR adjacency of the node graph.
+        rindptr, rindices: Reverse CSR adjacency of the node graph.
+        service_indptr, service_indices, service_weights: CSR of service arcs with their counts.
+    """
+
+    def __init__(self, files: List[str], nodes: List[str], services: List[str], **arrays: np.ndarray) -> None:
+        self.files = files
+        self.nodes = nodes
+        self.services = services
+        self.service_index = {service: i for i, service in enumerate(services)}
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+
+    @classmethod
+    def build(cls, paths: List[str]) -> 'GraphStore':
+        """Parse and compile the diagrams at paths."""
+        nodes: List[str] = []
+        node_file, node_service = array('i'), array('i')
+        sources, targets = array('i'), array('i')
+        service_index: Dict[str, int] = {}
+        for file_index, path in enumerate(paths):
+            diagram = mermaid.parse_file(path)
+            local = {}
+            for node_id, node in diagram.nodes.items():
+                local[node_id] = len(nodes)
+                nodes.append(node_id)
+                node_file.append(file_index)
+                prefix = node.prefix.lower()
+                node_service.append(service_index.setdefault(prefix, len(service_index)) if prefix else -1)
+            for edge in diagram.edges:
+                source, target = local.get(edge.source), local.get(edge.target)
+                if source is None or target is None:
+                    continue
+                backward = edge.arrow.startswith('<')
+                if not backward or edge.arrow.endswith('>'):
+                    sources.append(source)
+                    targets.append(target)
+                if backward:
+                    sources.append(target)
+                    targets.append(source)
+
+        n = len(nodes)
+        src = np.frombuffer(sources, dtype=np.int32).astype(np.int64)
+        dst = np.frombuffer(targets, dtype=np.int32).astype(np.int64)
+        indptr, indices = _csr(src, dst, n)
+        rindptr, rindices = _csr(dst, src, n)
+
+        node_service_arr = np.frombuffer(node_service, dtype=np.int32).copy()
+        s_src, s_dst = node_service_arr[src], node_service_arr[dst]
+        keep = (s_src >= 0) & (s_dst >= 0)
+        m = len(service_index)
+        pairs, weights = np.unique(s_src[keep].astype(np.int64) * max(m, 1) + s_dst[keep], return_counts=True)
+        service_indptr, service_indices = _csr(pairs // max(m, 1), pairs % max(m, 1), m)
+        return cls(list(paths), nodes, list(service_index),
+                   node_file=np.frombuffer(node_file, dtype=np.int32).copy(), node_service=node_service_arr,
+                   indptr=indptr, indices=indices, rindptr=rindptr, rindices=rindices,
+                   service_indptr=service_indptr, service_indices=service_indices,
+                   service_weights=weights.astype(np.int64))
+
+    def save(self, directory: str) -> None:
+        """Write the store to directory, replacing any previous store there."""
+        parent = os.path.dirname(os.path.abspath(directory))
+        tmp = tempfile.mkdtemp(prefix='.graph-', dir=parent)
+        for name in ARRAYS:
+            np.save(os.path.join(tmp, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(tmp, 'strings.json'), 'w') as f:
+            json.dump({'files': self.files, 'nodes': self.nodes, 'services': self.services}, f)
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+        os.rename(tmp, directory)
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: Optional[str] = 'r') -> 'GraphStore':
+        """Load a store written by ``save``, memory-mapping its arrays."""
+        with open(os.path.join(directory, 'strings.json'), 'r') as f:
+            strings = json.load(f)
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode) for name in ARRAYS}
+        return cls(strings['files'], strings['nodes'], strings['services'], **arrays)
+
+    def node_ref(self, node: int) -> NodeRef:
+        return NodeRef(self.files[self.node_file[node]], self.nodes[node])
+
+    # Service-level queries
+
+    def _service_neighbors(self, service: int) -> np.ndarray:
+        return self.service_indices[self.service_indptr[service]:self.service_indptr[service + 1]]
+
+    def shortest_path(self, source: str, target: str) -> Optional[List[str]]:
+        """
+        Fewest-hop path between two services over observed arcs.
+
+        Returns:
+            Optional[List[str]]: The services on the path, or None if target is unreachable.
+        """
+        start, goal = self.service_index[source], self.service_index[target]
+        parents = {start: -1}
+        queue = deque([start])
+        while queue:
+            current = queue.popleft()
+            if current == goal:
+                path = []
+                while current != -1:
+                    path.append(self.services[current])
+                    current = parents[current]
+                return path[::-1]
+            for nxt in self._service_neighbors(current).tolist():
+                if nxt not in parents:
+                    parents[nxt] = current
+                    queue.append(nxt)
+        return None
+
+    def reachable(self, source: str, target: str) -> bool:
+        """Whether target can be reached from source over observed arcs."""
+        return self.shortest_path(source, target) is not None
+
+    def service_degrees(self) -> Dict[str, Tuple[int, int]]:
+        """``service -> (out_degree, in_degree)`` over distinct service arcs."""
+        out_degree = np.diff(self.service_indptr)
+        in_degree = np.bincount(self.service_indices, minlength=len(self.services))
+        return {service: (int(out_degree[i]), int(in_degree[i])) for i, service in enumerate(self.services)}
+
+    def betweenness(self, normalized: bool = True) -> Dict[str, float]:
+        """Betweenness centrality of every service in the directed service graph (Brandes)."""
+        n = len(self.services)
+        neighbors = [self._service_neighbors(i).tolist() for i in range(n)]
+        centrality = [0.0] * n
+        for source in range(n):
+            stack, predecessors = [], [[] for _ in range(n)]
+            sigma, distance = [0] * n, [-1] * n
+            sigma[source], distance[source] = 1, 0
+            queue = deque([source])
+            while queue:
+                current = queue.popleft()
+                stack.append(current)
+                for nxt in neighbors[current]:
+                    if distance[nxt] < 0:
+                        distance[nxt] = distance[current] + 1
+                        queue.append(nxt)
+                    if distance[nxt] == distance[current] + 1:
+                        sigma[nxt] += sigma[current]
+                        predecessors[nxt].append(current)
+            delta = [0.0] * n
+            while stack:
+                current = stack.pop()
+                for previous in predecessors[current]:
+                    delta[previous] += sigma[previous] / sigma[current] * (1 + delta[current])
+                if current != source:
+                    centrality[current] += delta[current]
+        scale = 1 / ((n - 1) * (n - 2)) if normalized and n > 2 else 1.0
+        return {service: centrality[i] * scale for i, service in enumerate(self.services)}
+
+    # Node-level structural checks
+
+    def cycles(self) -> List[List[NodeRef]]:
+        """Directed cycles: every strongly connected component with more than one node, or a self-loop."""
+        n = len(self.nodes)
+        indptr, indices = np.asarray(self.indptr), np.asarray(self.indices)
+        index, low = [-1] * n, [0] * n
+        on_stack = [False] * n
+        stack: List[int] = []
+        components = []
+        counter = 0
+        for root in range(n):
+            if index[root] >= 0:
+                continue
+            # Iterative Tarjan: each frame is (node, position of the next edge to visit).
+            frames = [(root, int(indptr[root]))]
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            while frames:
+                node, position = frames[-1]
+                if position < indptr[node + 1]:
+                    frames[-1] = (node, position + 1)
+                    nxt = int(indices[position])
+                    if index[nxt] < 0:
+                        index[nxt] = low[nxt] = counter
+                        counter += 1
+                        stack.append(nxt)
+                        on_stack[nxt] = True
+                        frames.append((nxt, int(indptr[nxt])))
+                    elif on_stack[nxt]:
+                        low[node] = min(low[node], index[nxt])
+                    continue
+                frames.pop()
+                if frames:
+                    parent = frames[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == node:
+                            break
+                    neighbors = indices[indptr[node]:indptr[node + 1]]
+                    if len(component) > 1 or node in neighbors:
+                        components.append([self.node_ref(member) for member in sorted(component)])
+        return sorted(components)
+
+    def sources(self) -> List[NodeRef]:
+        """Nodes with no inbound edges."""
+        in_degree = np.diff(self.rindptr)
+        return [self.node_ref(node) for node in np.flatnonzero(in_degree == 0).tolist()]
+
+    def orphans(self) -> List[NodeRef]:
+        """
+        Nodes with no inbound edges that are cut off from their diagram.
+
+        A source node is orphaned when it has no edges at all, or when it lies
+        outside the largest weakly connected component of its diagram; entry
+        points of the main flow (users, clients) are therefore not reported.
+        """
+        n = len(self.nodes)
+        parent = list(range(n))
+
+        def find(node: int) -> int:
+            while parent[node] != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+
+        indptr, indices = np.asarray(self.indptr), np.asarray(self.indices)
+        sources = np.repeat(np.arange(n), np.diff(indptr))
+        for source, target in zip(sources.tolist(), indices.tolist()):
+            a, b = find(source), find(target)
+            if a != b:
+                parent[max(a, b)] = min(a, b)
+        roots = np.array([find(node) for node in range(n)], dtype=np.int64)
+        sizes = np.bincount(roots, minlength=n)
+        node_file = np.asarray(self.node_file)
+        # Largest component per file; ties go to the component of the earliest node.
+        main: Dict[int, int] = {}
+        for node in range(n):
+            file_index, root = int(node_file[node]), int(roots[node])
+            best = main.get(file_index)
+            if best is None or sizes[root] > sizes[best]:
+                main[file_index] = root
+        in_degree, out_degree = np.diff(self.rindptr), np.diff(indptr)
+        return [self.node_ref(node) for node in range(n)
+                if in_degree[node] == 0 and (out_degree[node] == 0 or roots[node] != main[int(node_file[node])])]
+
+
+@click.group('graph')
+@click.option('--store', default=DEFAULT_STORE_PATH, help='Graph store directory.')
+@click.pass_context
+def graph(ctx, store):
+    """Build and query the compiled corpus graph."""
+    ctx.obj = store
+
+
+def _load(store: str) -> GraphStore:
+    if not os.path.isdir(store):
+        raise click.UsageError(f"no graph store at {store}; build it with 'graph build'")
+    return GraphStore.load(store)
+
+
+@graph.command('build')
+@click.argument('inputs', nargs=-1, required=True)
+@click.pass_obj
+def build_command(store, inputs):
+    """Compile diagrams (files, directories or globs) into the graph store."""
+    start = time.perf_counter()
+    compiled = GraphStore.build(expand_paths(inputs))
+    compiled.save(store)
+    elapsed = time.perf_counter() - start
+    click.echo(f"Compiled {len(compiled.files)} file(s), {len(compiled.nodes)} node(s), {len(compiled.indices)} "
+               f"edge(s) and {len(compiled.service_indices)} service arc(s) in {elapsed:.2f} s.", err=True)
+
+
+@graph.command('path')
+@click.argument('source')
+@click.argument('target')
+@click.pass_obj
+def path_command(store, source, target):
+    """Shortest path from service SOURCE to service TARGET."""
+    compiled = _load(store)
+    for service in (source, target):
+        if service not in compiled.service_index:
+            raise click.BadParameter(f"unknown service {service!r}")
+    path = compiled.shortest_path(source, target)
+    if path is None:
+        click.echo(f"{target} is not reachable from {source}.")
+        sys.exit(1)
+    click.echo(' -> '.join(path))
+
+
+@graph.command('centrality')
+@click.option('-n', default=10, type=click.IntRange(min=1), help='Number of services.')
+@click.pass_obj
+def centrality_command(store, n):
+    """Degree and betweenness centrality per service."""
+    compiled = _load(store)
+    degrees = compiled.service_degrees()
+    ranked = sorted(compiled.betweenness().items(), key=lambda item: (-item[1], item[0]))[:n]
+    click.echo(f"{'service':<20} {'out':>5} {'in':>5} {'betweenness':>12}")
+    for service, score in ranked:
+        out_degree, in_degree = degrees[service]
+        click.echo(f"{service:<20} {out_degree:>5} {in_degree:>5} {score:>12.4f}")
+
+
+@graph.command('cycles')
+@click.pass_obj
+def cycles_command(store):
+    """Cycles between nodes within each diagram."""
+    cycles = _load(store).cycles()
+    for cycle in cycles:
+        click.echo(f"{cycle[0].path}: {' <-> '.join(ref.node for ref in cycle)}")
+    click.echo(f"{len(cycles)} cycle(s).", err=True)
+
+
+@graph.command('orphans')
+@click.pass_obj
+def orphans_command(store):
+    """Nodes with no inbound edges that are cut off from their diagram's main flow."""
+    orphans = _load(store).orphans()
+    for ref in orphans:
+        click.echo(f"{ref.path}: error: orphaned node '{ref.node}' has no inbound edges")
+    click.echo(f"{len(orphans)} orphaned node(s).", err=True)
+    if orphans:
+        sys.exit(1)
@@ -0,0 +1,219 @@
+"""
+AWS service icon injection for Mermaid diagrams.
+
+By default a line is rewritten exactly as the original icon processor did:
+a line starting with ``service[:_]name[label]`` becomes that node definition
+with the icon prepended to its label, and anything else on the line is
+dropped. With ``all_nodes`` the shared Mermaid parser decorates every node
+definition on a line in place instead, keeping indentation and edges.
+"""
+
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Tuple
+
+from aws_architecture_decomposition_lab import mermaid
+from aws_architecture_decomposition_lab.files import atomic_open, expand_paths
+
+
+def load_icons_mapping(file_path: str) -> Dict[str, str]:
+    """Load the AWS icons mapping from a JSON file."""
+    with open(file_path, 'r') as f:
+        return json.load(f)
+
+
+# The original processor's node pattern; kept so default output stays byte-identical.
+_LEADING_NODE = re.compile(r'^\s*(\w+(?:[:_]\w+)?)\s*\[(.*?)\]')
+_NAME_SEPARATOR = re.compile(r'[:_]')
+
+
+def service_key(node: mermaid.Node) -> str:
+    """The icon mapping key for a node: its prefix, or the id up to the first underscore."""
+    if node.prefix:
+        return node.prefix.lower()
+    return node.id.split('_', 1)[0].lower()
+
+
+def add_icons_to_line(line: str, icons_mapping: Dict[str, str]) -> str:
+    """Replace a line starting with a known service node by its icon-decorated definition (newline preserved)."""
+    newline = '\n' if line.endswith('\n') else ''
+    match = _LEADING_NODE.match(line[:len(line) - len(newline)])
+    if not match:
+        return line
+    icon_url = icons_mapping.get(_NAME_SEPARATOR.split(match.group(1))[0].lower())
+    if icon_url is None:
+        return line
+    return f"{match.group(1)}[<img src='{icon_url}' width='48' height='48' /><br>{match.group(2)}]{newline}"
+
+
+def add_icons_to_nodes(line: str, icons_mapping: Dict[str, str]) -> str:
+    """Add AWS service icons to every node definition on a single line (newline preserved)."""
+    statement = mermaid.parse_statement(line)
+    if statement.kind != 'chain':
+        return line
+    parts = []
+    pos = 0
+    for node in statement.nodes:
+        if not node.shape:
+            continue
+        icon_url = icons_mapping.get(service_key(node))
+        if icon_url is None:
+            continue
+        label = f"<img src='{icon_url}' width='48' height='48' /><br>{node.label}"
+        parts.append(line[pos:node.col])
+        parts.append(mermaid.format_node(node.id, label, node.shape))
+        pos = node.end
+    if not parts:
+        return line
+    parts.append(line[pos:])
+    return ''.join(parts)
+
+
+def iter_icons(lines: Iterable[str], icons_mapping: Dict[str, str], all_nodes: bool = False) -> Iterator[str]:
+    """
+    Add AWS service icons to a stream of diagram lines.
+
+    Lines are processed one at a time, so memory use does not depend on the
+    size of the diagram.
+
+    Args:
+        lines (Iterable[str]): Source lines, e.g. an open file; line endings are kept.
+        icons_mapping (Dict[str, str]): Icon URLs keyed by service prefix.
+        all_nodes (bool): Decorate every node definition in place (add_icons_to_nodes)
+            instead of the original leading-node rewrite (add_icons_to_line).
+
+    Yields:
+        str: Each line, decorated.
+    """
+    decorate = add_icons_to_nodes if all_nodes else add_icons_to_line
+    for line in lines:
+        yield decorate(line, icons_mapping)
+
+
+def add_icons_to_mermaid(mermaid_diagram: str, icons_mapping: Dict[str, str], all_nodes: bool = False) -> str:
+    """Add AWS service icons to a Mermaid diagram."""
+    lines = mermaid_diagram.split('\n')
+    last = lines.pop()
+    return ''.join(iter_icons([line + '\n' for line in lines] + [last], icons_mapping, all_nodes))
+
+
+def decorate_file(input_path: str, output_path: str, icons_mapping: Dict[str, str], all_nodes: bool = False) -> int:
+    """
+    Stream one diagram file through iter_icons; return the number of bytes read.
+
+    The output goes through a temporary file renamed over output_path when
+    complete, so output_path may be input_path.
+    """
+    with open(input_path, 'r') as src, atomic_open(output_path, 'w') as dst:
+        dst.writelines(iter_icons(src, icons_mapping, all_nodes))
+    return os.path.getsize(input_path)
+
+
+class BatchResult(NamedTuple):
+    input_path: str
+    output_path: str
+    size: int
+    seconds: float
+
+
+_worker_mapping: Dict[str, str] = {}
+_worker_all_nodes = False
+
+
+def _init_worker(icons_mapping: Dict[str, str], all_nodes: bool = False) -> None:
+    global _worker_mapping, _worker_all_nodes
+    _worker_mapping = icons_mapping
+    _worker_all_nodes = all_nodes
+
+
+def _decorate_task(paths: Tuple[str, str]) -> BatchResult:
+    start = time.perf_counter()
+    size = decorate_file(paths[0], paths[1], _worker_mapping, _worker_all_nodes)
+    return BatchResult(paths[0], paths[1], size, time.perf_counter() - start)
+
+
+def batch_outputs(input_paths: List[str], output_dir: str) -> List[Tuple[str, str]]:
+    """
+    Pair each input with its output path in output_dir.
+
+    Raises:
+        ValueError: If output_dir contains any of the inputs, or two inputs share a base name
+            and would overwrite each other's output.
+    """
+    out = os.path.realpath(output_dir)
+    owners: Dict[str, str] = {}
+    tasks = []
+    for path in input_paths:
+        if os.path.commonpath([out, os.path.realpath(path)]) == out:
+            raise ValueError(f"output directory {output_dir} contains the input {path}; use a separate directory")
+        name = os.path.basename(path)
+        if name in owners:
+            raise ValueError(f"{owners[name]} and {path} would both be written to {os.path.join(output_dir, name)}")
+        owners[name] = path
+        tasks.append((path, os.path.join(output_dir, name)))
+    return tasks
+
+
+def decorate_files(input_paths: List[str], output_dir: str, icons_mapping: Dict[str, str],
+                   jobs: int = 1, all_nodes: bool = False) -> Iterator[BatchResult]:
+    """
+    Decorate many diagrams, loading the icon mapping into each worker once.
+
+    Args:
+        input_paths (List[str]): Diagram files; outputs keep their base names.
+        output_dir (str): Directory for the decorated diagrams (created if missing).
+        icons_mapping (Dict[str, str]): Icon URLs keyed by service prefix.
+        jobs (int): Worker processes; 1 processes files in this process.
+        all_nodes (bool): Decorate every node definition (see iter_icons).
+
+    Yields:
+        BatchResult: Per-file timing, in input order.
+
+    Raises:
+        ValueError: See ``batch_outputs``; raised before any file is written.
+    """
+    tasks = batch_outputs(input_paths, output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    if jobs <= 1 or len(tasks) < 2:
+        _init_worker(icons_mapping, all_nodes)
+        yield from map(_decorate_task, tasks)
+        return
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(icons_mapping, all_nodes)) as executor:
+        yield from executor.map(_decorate_task, tasks, chunksize=max(1, len(tasks) // (jobs * 4)))
+
+
+def run_batch(inputs: List[str], output_dir: str, icons_mapping: Dict[str, str], jobs: int = 0,
+              echo: Callable[[str], None] = print, all_nodes: bool = False) -> List[BatchResult]:
+    """
+    Decorate every diagram matched by inputs and report per-file and aggregate throughput.
+
+    Args:
+        inputs (List[str]): Files, directories or glob patterns.
+        output_dir (str): Directory for the decorated diagrams.
+        icons_mapping (Dict[str, str]): Icon URLs keyed by service prefix.
+        jobs (int): Worker processes; 0 uses every core.
+        echo (Callable[[str], None]): Where report lines are written.
+        all_nodes (bool): Decorate every node definition (see iter_icons).
+
+    Returns:
+        List[BatchResult]: One result per processed file.
+
+    Raises:
+        ValueError: If output_dir overlaps the inputs or two inputs share a base name.
+    """
+    paths = expand_paths(inputs)
+    start = time.perf_counter()
+    results = []
+    for result in decorate_files(paths, output_dir, icons_mapping, jobs or os.cpu_count() or 1, all_nodes):
+        echo(f"{result.input_path} -> {result.output_path} ({result.seconds * 1000:.1f} ms)")
+        results.append(result)
+    elapsed = time.perf_counter() - start
+    total = sum(result.size for result in results)
+    seconds = max(elapsed, 1e-9)
+    echo(f"Processed {len(results)} file(s), {total / 1e6:.2f} MB in {elapsed:.2f} s "
+         f"({len(results) / seconds:.1f} files/s, {total / 1e6 / seconds:.2f} MB/s)")
+    return results
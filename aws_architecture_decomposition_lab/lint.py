@@ -0,0 +1,82 @@
+"""
+Mermaid syntax linter.
+
+Checks diagrams against the flowchart grammar in ``mermaid`` without
+launching a browser; ``mmdc`` is only needed for rendering.
+"""
+
+import sys
+import time
+from typing import Iterable, List, NamedTuple
+
+import click
+
+from aws_architecture_decomposition_lab import mermaid
+from aws_architecture_decomposition_lab.files import expand_paths
+
+
+class Diagnostic(NamedTuple):
+    path: str
+    line: int
+    col: int
+    message: str
+
+    def __str__(self) -> str:
+        return f"{self.path}:{self.line}:{self.col}: error: {self.message}"
+
+
+def lint_lines(lines: Iterable[str], path: str = '<stdin>') -> List[Diagnostic]:
+    """
+    Lint the lines of one diagram.
+
+    Args:
+        lines (Iterable[str]): Diagram source lines.
+        path (str): Name used in the diagnostics.
+
+    Returns:
+        List[Diagnostic]: Problems found, ordered by position.
+    """
+    parser = mermaid.Parser()
+    diagnostics = []
+    header_line = 0
+    for line in lines:
+        statement = parser.feed(line)
+        if statement.kind in ('blank', 'comment', 'conflict'):
+            continue
+        if statement.kind == 'header':
+            if header_line:
+                diagnostics.append(Diagnostic(path, parser.lineno, len(line) - len(line.lstrip()) + 1,
+                                              f"duplicate diagram header (first on line {header_line})"))
+            else:
+                header_line = parser.lineno
+        elif not header_line:
+            diagnostics.append(Diagnostic(path, parser.lineno, 1, "expected 'graph' or 'flowchart' header"))
+            header_line = -1
+    diagram = parser.close()
+    if parser.lineno == 0 or header_line == 0:
+        diagnostics.append(Diagnostic(path, 1, 1, 'empty diagram'))
+    diagnostics.extend(Diagnostic(path, line, col, message) for line, col, message in diagram.errors)
+    return sorted(diagnostics, key=lambda d: (d.line, d.col))
+
+
+def lint_file(path: str) -> List[Diagnostic]:
+    """Lint the diagram stored at path."""
+    with open(path, 'r') as f:
+        return lint_lines(f, path)
+
+
+@click.command('lint')
+@click.argument('paths', nargs=-1, required=True)
+def lint(paths):
+    """Check Mermaid diagrams (files, directories or globs) for syntax errors."""
+    start = time.perf_counter()
+    files = expand_paths(paths)
+    errors = 0
+    for path in files:
+        for diagnostic in lint_file(path):
+            click.echo(str(diagnostic))
+            errors += 1
+    elapsed = (time.perf_counter() - start) * 1000
+    click.echo(f"Linted {len(files)} file(s) in {elapsed:.1f} ms: {errors} error(s).", err=True)
+    if errors:
+        sys.exit(1)
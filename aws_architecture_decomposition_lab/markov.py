@@ -0,0 +1,414 @@
+"""
+First-order Markov chain over AWS services.
+
+Transition probabilities are estimated from observed service arcs and stored
+as a sparse CSR matrix of NumPy arrays. Every row carries a Walker/Vose alias
+table, so drawing the next state is O(1) regardless of the row's out-degree.
+States with no outgoing arcs restart from the initial distribution (derived
+from service frequencies), or end the walk when ``dead_end='stop'``.
+
+Bulk simulation advances a whole batch of walks in lockstep with one
+vectorized draw per step and streams the result in bounded chunks.
+
+Compiled chains are cached on disk as one ``.npy`` file per array, keyed on
+the frequency database version, and memory-mapped on load; they are only
+rebuilt after the counts change.
+"""
+
+import csv
+import json
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+from typing import IO, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from aws_architecture_decomposition_lab import frequency
+
+DEAD_END_POLICIES = ('restart', 'stop')
+OUTPUT_FORMATS = ('csv', 'jsonl', 'npy')
+# Marks the tail of a walk that stopped at a dead end.
+STOPPED = -1
+# Bump when the compiled layout changes so old caches are ignored.
+CACHE_FORMAT = 1
+_CACHE_KEY_RE = re.compile(r'v(\d+)-(\w+)-(\d+)$')
+COMPILED_ARRAYS = ('indptr', 'indices', 'probs', 'alias_prob', 'alias_col',
+                   'initial', 'initial_prob', 'initial_alias')
+
+
+def build_alias_table(weights: Sequence[float]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Build a Vose alias table for a discrete distribution.
+
+    Args:
+        weights (Sequence[float]): Non-negative weights with a positive sum.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: ``(prob, alias)``: pick slot ``i`` uniformly,
+        keep it with probability ``prob[i]``, otherwise take ``alias[i]``.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    size = len(weights)
+    scaled = weights * (size / weights.sum())
+    prob = np.ones(size, dtype=np.float64)
+    alias = np.arange(size, dtype=np.int64)
+    small = [i for i in range(size) if scaled[i] < 1.0]
+    large = [i for i in range(size) if scaled[i] >= 1.0]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        prob[less] = scaled[less]
+        alias[less] = more
+        scaled[more] -= 1.0 - scaled[less]
+        (small if scaled[more] < 1.0 else large).append(more)
+    return prob, alias
+
+
+class MarkovChain:
+    """
+    Sparse first-order chain with per-row alias tables.
+
+    Attributes:
+        states (List[str]): Service names; row/column ``i`` is ``states[i]``.
+        indptr (np.ndarray): CSR row pointers, length ``n + 1``.
+        indices (np.ndarray): Column (next state) of each stored transition.
+        probs (np.ndarray): Transition probability of each stored transition.
+        alias_prob (np.ndarray): Alias-table keep probability per stored transition.
+        alias_col (np.ndarray): Alias-table fallback column per stored transition.
+        initial (np.ndarray): Initial/restart distribution over states.
+    """
+
+    def __init__(self, states: List[str], indptr: np.ndarray, indices: np.ndarray, probs: np.ndarray,
+                 initial: np.ndarray, dead_end: str = 'restart') -> None:
+        if dead_end not in DEAD_END_POLICIES:
+            raise ValueError(f"dead_end must be one of {DEAD_END_POLICIES}, not {dead_end!r}")
+        self.states = states
+        self.index = {state: i for i, state in enumerate(states)}
+        self.indptr = indptr
+        self.indices = indices
+        self.probs = probs
+        self.initial = initial
+        self.dead_end = dead_end
+        self.alias_prob = np.ones(len(indices), dtype=np.float64)
+        self.alias_col = indices.copy()
+        for row in range(len(states)):
+            start, end = indptr[row], indptr[row + 1]
+            if end > start:
+                prob, alias = build_alias_table(probs[start:end])
+                self.alias_prob[start:end] = prob
+                self.alias_col[start:end] = indices[start + alias]
+        self.initial_prob, self.initial_alias = build_alias_table(initial)
+
+    @classmethod
+    def from_arcs(cls, arcs: Mapping[Tuple[str, str], int], weights: Optional[Mapping[str, int]] = None,
+                  dead_end: str = 'restart') -> 'MarkovChain':
+        """
+        Estimate a chain from arc counts.
+
+        Args:
+            arcs (Mapping[Tuple[str, str], int]): ``(source, sink) -> count``.
+            weights (Optional[Mapping[str, int]]): Service frequencies for the initial
+                distribution; out-degree totals are used when omitted.
+            dead_end (str): ``'restart'`` or ``'stop'`` for states without outgoing arcs.
+
+        Returns:
+            MarkovChain: The estimated chain.
+
+        Raises:
+            ValueError: If no service or arc has a positive count (e.g. an empty database).
+        """
+        weights = {service: count for service, count in dict(weights or {}).items() if count > 0}
+        arcs = {arc: count for arc, count in dict(arcs).items() if count > 0}
+        states = sorted(set(weights) | {s for arc in arcs for s in arc})
+        if not states:
+            raise ValueError('cannot build a Markov chain without services or arcs')
+        index = {state: i for i, state in enumerate(states)}
+        n = len(states)
+
+        rows = np.fromiter((index[source] for source, _ in arcs), dtype=np.int64, count=len(arcs))
+        cols = np.fromiter((index[sink] for _, sink in arcs), dtype=np.int64, count=len(arcs))
+        counts = np.fromiter(arcs.values(), dtype=np.float64, count=len(arcs))
+        order = np.lexsort((cols, rows))
+        rows, cols, counts = rows[order], cols[order], counts[order]
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+        row_totals = np.bincount(rows, weights=counts, minlength=n)
+        probs = counts / row_totals[rows] if len(counts) else counts
+
+        if weights:
+            initial = np.array([weights.get(state, 0) for state in states], dtype=np.float64)
+        else:
+            initial = row_totals.copy()
+        if initial.sum() <= 0:
+            initial = np.ones(n, dtype=np.float64)
+        return cls(states, indptr, cols, probs, initial / initial.sum(), dead_end)
+
+    def save(self, directory: str) -> None:
+        """Write the compiled arrays and state names to directory."""
+        os.makedirs(directory, exist_ok=True)
+        for name in COMPILED_ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(directory, 'states.json'), 'w') as f:
+            json.dump(self.states, f)
+
+    @classmethod
+    def load(cls, directory: str, dead_end: str = 'restart', mmap_mode: Optional[str] = 'r') -> 'MarkovChain':
+        """
+        Load a chain written by ``save`` without recompiling it.
+
+        Args:
+            directory (str): Directory passed to ``save``.
+            dead_end (str): ``'restart'`` or ``'stop'`` for states without outgoing arcs.
+            mmap_mode (Optional[str]): ``np.load`` mmap mode; ``None`` reads the arrays into memory.
+
+        Returns:
+            MarkovChain: The loaded chain.
+        """
+        if dead_end not in DEAD_END_POLICIES:
+            raise ValueError(f"dead_end must be one of {DEAD_END_POLICIES}, not {dead_end!r}")
+        chain = cls.__new__(cls)
+        with open(os.path.join(directory, 'states.json'), 'r') as f:
+            chain.states = json.load(f)
+        chain.index = {state: i for i, state in enumerate(chain.states)}
+        chain.dead_end = dead_end
+        for name in COMPILED_ARRAYS:
+            setattr(chain, name, np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode))
+        return chain
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    @property
+    def dead_ends(self) -> List[str]:
+        """States with no outgoing transitions."""
+        return [self.states[i] for i in np.flatnonzero(np.diff(self.indptr) == 0)]
+
+    def transitions(self, state: str) -> Dict[str, float]:
+        """The outgoing transition probabilities of a state."""
+        row = self.index[state]
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return {self.states[col]: float(p) for col, p in zip(self.indices[start:end], self.probs[start:end])}
+
+    def sample_initial(self, rng: np.random.Generator) -> int:
+        """Draw a state index from the initial distribution in O(1)."""
+        slot = int(rng.integers(len(self.states)))
+        return slot if rng.random() < self.initial_prob[slot] else int(self.initial_alias[slot])
+
+    def step(self, row: int, rng: np.random.Generator) -> int:
+        """
+        Draw the next state index in O(1).
+
+        Returns:
+            int: The next state, or -1 if ``row`` is a dead end under the ``'stop'`` policy.
+        """
+        start, end = self.indptr[row], self.indptr[row + 1]
+        if start == end:
+            return self.sample_initial(rng) if self.dead_end == 'restart' else -1
+        slot = start + int(rng.integers(end - start))
+        return int(self.indices[slot]) if rng.random() < self.alias_prob[slot] else int(self.alias_col[slot])
+
+    def sample_initial_many(self, count: int, rng: np.random.Generator) -> np.ndarray:
+        """Draw ``count`` state indices from the initial distribution."""
+        slots = rng.integers(len(self.states), size=count)
+        return np.where(rng.random(count) < self.initial_prob[slots], slots, self.initial_alias[slots])
+
+    def step_many(self, rows: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """
+        Advance a batch of walks by one step with a single vectorized draw.
+
+        Args:
+            rows (np.ndarray): Current state index of every walk; ``STOPPED`` for finished walks.
+            rng (np.random.Generator): Random generator.
+
+        Returns:
+            np.ndarray: The next state index of every walk.
+        """
+        active = rows != STOPPED
+        current = np.where(active, rows, 0)
+        start = self.indptr[current]
+        degree = self.indptr[current + 1] - start
+        dead = active & (degree == 0)
+        nxt = np.full(len(rows), STOPPED, dtype=np.int64)
+        if len(self.indices):
+            slots = np.minimum(start + (rng.random(len(rows)) * degree).astype(np.int64), len(self.indices) - 1)
+            keep = rng.random(len(rows)) < self.alias_prob[slots]
+            moving = active & ~dead
+            nxt[moving] = np.where(keep, self.indices[slots], self.alias_col[slots])[moving]
+        if self.dead_end == 'restart' and dead.any():
+            nxt[dead] = self.sample_initial_many(int(dead.sum()), rng)
+        return nxt
+
+    def simulate(self, count: int, length: int, rng: Optional[np.random.Generator] = None,
+                 start: Optional[str] = None) -> np.ndarray:
+        """
+        Generate ``count`` walks of ``length`` states in lockstep.
+
+        Args:
+            count (int): Number of walks.
+            length (int): States per walk.
+            rng (Optional[np.random.Generator]): Random generator; a fresh one if omitted.
+            start (Optional[str]): Fixed starting service; drawn from the initial distribution if omitted.
+
+        Returns:
+            np.ndarray: ``(count, length)`` state indices, ``STOPPED`` after a walk ends early.
+        """
+        rng = rng or np.random.default_rng()
+        dtype = np.int16 if len(self.states) < np.iinfo(np.int16).max else np.int32
+        walks = np.empty((count, length), dtype=dtype)
+        if start is None:
+            rows = self.sample_initial_many(count, rng)
+        else:
+            rows = np.full(count, self.index[start], dtype=np.int64)
+        for position in range(length):
+            if position:
+                rows = self.step_many(rows, rng)
+            walks[:, position] = rows
+        return walks
+
+    def iter_simulations(self, count: int, length: int, rng: Optional[np.random.Generator] = None,
+                         chunk_size: int = 100_000, start: Optional[str] = None) -> Iterator[np.ndarray]:
+        """Yield ``simulate`` results in chunks of at most ``chunk_size`` walks."""
+        rng = rng or np.random.default_rng()
+        for offset in range(0, count, chunk_size):
+            yield self.simulate(min(chunk_size, count - offset), length, rng, start)
+
+    def walk(self, start: str, length: int, rng: Optional[np.random.Generator] = None) -> List[str]:
+        """
+        Generate a walk of up to ``length`` states beginning at ``start``.
+
+        Args:
+            start (str): Starting service.
+            length (int): Number of states in the walk.
+            rng (Optional[np.random.Generator]): Random generator; a fresh one if omitted.
+
+        Returns:
+            List[str]: The visited services; shorter than ``length`` only under ``'stop'``.
+        """
+        rng = rng or np.random.default_rng()
+        row = self.index[start]
+        walk = [start]
+        for _ in range(length - 1):
+            row = self.step(row, rng)
+            if row < 0:
+                break
+            walk.append(self.states[row])
+        return walk
+
+
+def chain_cache_dir(db_path: str) -> str:
+    """Default cache directory for chains compiled from db_path."""
+    return f"{db_path}.chain"
+
+
+def load_cached_chain(conn: sqlite3.Connection, cache_dir: str,
+                      dead_end: str = 'restart') -> Tuple[MarkovChain, bool]:
+    """
+    Load the compiled chain for the current frequencies, building it on a miss.
+
+    The cache entry is named after ``frequency.frequency_version``, so a hit
+    costs one metadata lookup plus memory-mapping the arrays. On a miss the
+    counts are read in one snapshot, compiled, written to a temporary
+    directory and renamed into place.
+
+    Entries for older versions (or cache formats) of the same database are
+    then removed; newer ones, which a concurrent process may have just
+    written, and entries of other databases are left alone. A process that
+    still has a removed entry memory-mapped keeps its mapping, and an entry
+    that disappears while being loaded is rebuilt instead.
+
+    Args:
+        conn (sqlite3.Connection): Frequency database connection.
+        cache_dir (str): Cache directory, usually ``chain_cache_dir(db_path)``.
+        dead_end (str): ``'restart'`` or ``'stop'`` for states without outgoing arcs.
+
+    Returns:
+        Tuple[MarkovChain, bool]: The chain and whether it came from the cache.
+    """
+    conn.commit()
+    conn.execute('BEGIN')
+    try:
+        key = f"v{CACHE_FORMAT}-{frequency.frequency_version(conn)}"
+        path = os.path.join(cache_dir, key)
+        if os.path.isdir(path):
+            try:
+                return MarkovChain.load(path, dead_end), True
+            except FileNotFoundError:
+                pass  # removed by another process mid-load; rebuild below
+        chain = MarkovChain.from_arcs(frequency.load_arc_counts(conn), frequency.load_service_counts(conn), dead_end)
+    finally:
+        conn.rollback()
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix='.tmp-', dir=cache_dir)
+    chain.save(tmp)
+    try:
+        os.rename(tmp, path)
+    except OSError:
+        # Another process published the same version first.
+        shutil.rmtree(tmp, ignore_errors=True)
+    _prune_cache(cache_dir, key)
+    return chain, False
+
+
+def _prune_cache(cache_dir: str, key: str) -> None:
+    """Remove the cache entries of the same database that are older than key."""
+    current = _CACHE_KEY_RE.match(key)
+    for entry in os.listdir(cache_dir):
+        match = _CACHE_KEY_RE.match(entry)
+        if not match or match.group(2) != current.group(2):
+            continue
+        if (int(match.group(1)), int(match.group(3))) < (int(current.group(1)), int(current.group(3))):
+            shutil.rmtree(os.path.join(cache_dir, entry), ignore_errors=True)
+
+
+def write_walks(chain: MarkovChain, chunks: Iterator[np.ndarray], out: IO, fmt: str = 'csv',
+                count: Optional[int] = None, length: Optional[int] = None) -> int:
+    """
+    Stream simulated walks to a file.
+
+    ``csv`` writes one walk per row and ``jsonl`` one JSON list per line, both
+    as service names. ``npy`` writes the raw state indices as a single NumPy
+    array; it needs ``count`` and ``length`` up front for the header, and the
+    caller stores ``chain.states`` alongside to map indices back to names.
+
+    Args:
+        chain (MarkovChain): Chain that produced the walks.
+        chunks (Iterator[np.ndarray]): Output of ``iter_simulations``.
+        out (IO): Text stream for csv/jsonl, binary stream for npy.
+        fmt (str): One of ``OUTPUT_FORMATS``.
+        count (Optional[int]): Total walks (npy only).
+        length (Optional[int]): States per walk (npy only).
+
+    Returns:
+        int: Number of walks written.
+    """
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"fmt must be one of {OUTPUT_FORMATS}, not {fmt!r}")
+    names = np.array(chain.states + [''], dtype=object)
+    written = 0
+    if fmt == 'npy':
+        header_written = False
+        for chunk in chunks:
+            if not header_written:
+                np.lib.format.write_array_header_1_0(
+                    out, {'descr': np.lib.format.dtype_to_descr(chunk.dtype),
+                          'fortran_order': False, 'shape': (count, length)})
+                header_written = True
+            out.write(np.ascontiguousarray(chunk).tobytes())
+            written += len(chunk)
+        if written != count:
+            raise ValueError(f"expected {count} walks, wrote {written}")
+        return written
+    writer = csv.writer(out) if fmt == 'csv' else None
+    for chunk in chunks:
+        # STOPPED (-1) indexes the trailing '' name, which is dropped below.
+        for walk in names[chunk]:
+            walk = [name for name in walk if name]
+            if writer:
+                writer.writerow(walk)
+            else:
+                out.write(json.dumps(walk) + '\n')
+        written += len(chunk)
+    return written
@@ -0,0 +1,359 @@
+"""
+Mermaid flowchart tokenizer and AST.
+
+A single-pass, line-oriented parser for the ``graph``/``flowchart`` subset
+used by the diagrams in this repository, including the ``prefix:service[label]``
+node convention. Every script that needs nodes, edges, subgraphs or labels
+parses a diagram through this module instead of running its own regexes.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Node identifiers: ``name`` or ``prefix:service``.
+_ID_RE = re.compile(r'\w+(?::\w+)?')
+
+# Node shapes, longest opening delimiter first. The group name is the shape.
+_SHAPE_RE = re.compile(r'''
+      \[\((?P<cylinder>"[^"]*"|.*?)\)\]
+    | \(\[(?P<stadium>"[^"]*"|.*?)\]\)
+    | \(\((?P<circle>"[^"]*"|.*?)\)\)
+    | \[\[(?P<subroutine>"[^"]*"|.*?)\]\]
+    | \{\{(?P<hexagon>"[^"]*"|.*?)\}\}
+    | \[(?P<rect>"[^"]*"|[^\]]*)\]
+    | \((?P<round>"[^"]*"|[^)]*)\)
+    | \{(?P<rhombus>"[^"]*"|[^}]*)\}
+    | >(?P<asymmetric>"[^"]*"|[^\]]*)\]
+''', re.VERBOSE)
+
+# Links: ``-- text -->``, ``-. text .->``, an arrow with an optional ``|label|``,
+# or the invisible ``~~~``.
+_LINK_RE = re.compile(r'''
+    \s*
+    (?:
+        (?P<open><?(?:--|==|-\.))\s+(?P<text>[^|]+?)\s+(?P<close>-{2,}[>ox]|={2,}>|\.-+[>ox]?|-{3,}|={3,})
+      | (?P<arrow><?(?:-{2,}|={2,}|-\.+-)[>ox]?|~{3,})(?:\s*\|(?P<label>[^|]*)\|)?
+    )
+    \s*
+''', re.VERBOSE)
+
+# Class shorthand after a node: ``A[Label]:::name``.
+_CLASS_RE = re.compile(r':::[\w-]+')
+
+_AMP_RE = re.compile(r'\s*&\s*')
+_HEADER_RE = re.compile(r'(?:graph|flowchart)(?:\s+(TB|TD|BT|RL|LR))?\s*;?$')
+_SUBGRAPH_RE = re.compile(r'subgraph\s+(?:"(?P<quoted>[^"]*)"|(?P<id>\w+)\s*\[(?P<title>"[^"]*"|[^\]]*)\]|(?P<bare>.+?))\s*$')
+_CONFLICT_RE = re.compile(r'(?:<{7}|={7}|>{7}|\|{7})(?:\s|$)')
+
+# Statements that carry styling or interaction only.
+DIRECTIVES = frozenset(['classDef', 'class', 'style', 'linkStyle', 'click', 'direction'])
+
+_SHAPE_DELIMITERS = {
+    'cylinder': ('[(', ')]'),
+    'stadium': ('([', '])'),
+    'circle': ('((', '))'),
+    'subroutine': ('[[', ']]'),
+    'hexagon': ('{{', '}}'),
+    'rect': ('[', ']'),
+    'round': ('(', ')'),
+    'rhombus': ('{', '}'),
+    'asymmetric': ('>', ']'),
+}
+
+_NEEDS_QUOTES_RE = re.compile(r'[\[\](){}|]')
+
+
+class Node(NamedTuple):
+    """One occurrence of a node in the source; ``shape`` is empty for bare references."""
+    id: str
+    label: str
+    shape: str
+    line: int
+    col: int
+    end: int
+
+    @property
+    def prefix(self) -> str:
+        """The service prefix of a ``prefix:service`` id, or an empty string."""
+        prefix, sep, _ = self.id.partition(':')
+        return prefix if sep else ''
+
+    @property
+    def service(self) -> str:
+        """The part of the id after the prefix (the whole id when there is none)."""
+        return self.id.partition(':')[2] or self.id
+
+
+class Edge(NamedTuple):
+    source: str
+    target: str
+    label: str
+    arrow: str
+    line: int
+
+
+class Subgraph(NamedTuple):
+    id: str
+    title: str
+    line: int
+    parent: Optional[str]
+    nodes: List[str]
+
+
+class Statement(NamedTuple):
+    """The tokens of a single source line."""
+    kind: str
+    nodes: List[Node]
+    edges: List[Edge]
+    error: Optional[Tuple[int, str]]
+
+
+@dataclass
+class Diagram:
+    """A parsed Mermaid flowchart."""
+    direction: str = ''
+    nodes: Dict[str, Node] = field(default_factory=dict)
+    refs: List[Node] = field(default_factory=list)
+    edges: List[Edge] = field(default_factory=list)
+    subgraphs: List[Subgraph] = field(default_factory=list)
+    errors: List[Tuple[int, int, str]] = field(default_factory=list)
+
+    @property
+    def labels(self) -> Dict[str, str]:
+        """Node labels keyed by node id."""
+        return {node_id: node.label for node_id, node in self.nodes.items() if node.label}
+
+    def services(self) -> List[str]:
+        """The service prefixes of all distinct nodes, in definition order."""
+        return [node.prefix for node in self.nodes.values() if node.prefix]
+
+    def arcs(self) -> List[Tuple[str, str]]:
+        """
+        Service-level arcs: one ``(source_prefix, sink_prefix)`` per edge between prefixed nodes.
+
+        ``A <-- B`` is read as ``B --> A``, and ``A <--> B`` yields both directions.
+        Invisible ``~~~`` links only affect layout and are skipped.
+        """
+        prefixes = {node_id: node.prefix for node_id, node in self.nodes.items() if node.prefix}
+        arcs = []
+        for edge in self.edges:
+            source = prefixes.get(edge.source)
+            target = prefixes.get(edge.target)
+            if not (source and target) or edge.arrow.startswith('~'):
+                continue
+            backward = edge.arrow.startswith('<')
+            if not backward or edge.arrow.endswith('>'):
+                arcs.append((source, target))
+            if backward:
+                arcs.append((target, source))
+        return arcs
+
+
+def _unquote(label: str) -> str:
+    if len(label) >= 2 and label[0] == '"' and label[-1] == '"':
+        return label[1:-1]
+    return label
+
+
+def _scan_node(line: str, pos: int, lineno: int) -> Optional[Node]:
+    match = _ID_RE.match(line, pos)
+    if not match:
+        return None
+    shape_match = _SHAPE_RE.match(line, match.end())
+    if shape_match:
+        shape = shape_match.lastgroup
+        return Node(match.group(), _unquote(shape_match.group(shape).strip()), shape,
+                    lineno, pos, shape_match.end())
+    return Node(match.group(), '', '', lineno, pos, match.end())
+
+
+def _scan_group(line: str, pos: int, lineno: int, nodes: List[Node]) -> Tuple[List[Node], int]:
+    group = []
+    while True:
+        node = _scan_node(line, pos, lineno)
+        if node is None:
+            return group, pos
+        group.append(node)
+        nodes.append(node)
+        pos = node.end
+        shorthand = _CLASS_RE.match(line, pos)
+        if shorthand:
+            pos = shorthand.end()
+        amp = _AMP_RE.match(line, pos)
+        if not amp:
+            return group, pos
+        pos = amp.end()
+
+
+def _unexpected(line: str, pos: int, default: str) -> str:
+    char = line[pos:pos + 1]
+    if char in ('[', '(', '{', '>'):
+        return f"unterminated node shape starting with {char!r}"
+    if char == '|':
+        return 'unterminated edge label'
+    return default
+
+
+def _scan_chain(line: str, pos: int, lineno: int) -> Statement:
+    nodes: List[Node] = []
+    edges: List[Edge] = []
+    group, pos = _scan_group(line, pos, lineno, nodes)
+    if not group:
+        return Statement('chain', nodes, edges, (pos, 'expected a node id'))
+    while True:
+        link = _LINK_RE.match(line, pos)
+        if not link:
+            break
+        if link.group('arrow'):
+            arrow, label = link.group('arrow'), (link.group('label') or '').strip()
+        else:
+            opening, closing = link.group('open'), link.group('close')
+            # ``-.`` + ``.->`` is the dotted arrow ``-.->``.
+            if opening.endswith('.') and closing.startswith('.'):
+                closing = closing[1:]
+            arrow, label = opening + closing, link.group('text')
+        targets, after = _scan_group(line, link.end(), lineno, nodes)
+        if not targets:
+            at = min(link.end(), len(line.rstrip()))
+            return Statement('chain', nodes, edges, (at, _unexpected(line, at, 'expected a node after link')))
+        for source in group:
+            for target in targets:
+                edges.append(Edge(source.id, target.id, _unquote(label), arrow, lineno))
+        group, pos = targets, after
+    end = len(line.rstrip().rstrip(';').rstrip())
+    if pos < end:
+        pos = end - len(line[pos:end].lstrip())
+        return Statement('chain', nodes, edges, (pos, _unexpected(line, pos, f"unexpected text {line[pos:end].strip()!r}")))
+    return Statement('chain', nodes, edges, None)
+
+
+def parse_statement(line: str, lineno: int = 1) -> Statement:
+    """
+    Tokenize one line of a Mermaid flowchart.
+
+    Args:
+        line (str): The source line, with or without its newline.
+        lineno (int): 1-based line number recorded on the tokens.
+
+    Returns:
+        Statement: The statement kind, node occurrences and edges on the line, and
+        ``(column, message)`` if the line could not be parsed.
+    """
+    stripped = line.strip()
+    if not stripped:
+        return Statement('blank', [], [], None)
+    pos = len(line) - len(line.lstrip())
+    if stripped.startswith('%%'):
+        return Statement('comment', [], [], None)
+    head = stripped.split(None, 1)[0]
+    if head in ('graph', 'flowchart'):
+        if _HEADER_RE.match(stripped):
+            return Statement('header', [], [], None)
+        return Statement('header', [], [], (pos, f"invalid diagram header {stripped!r}"))
+    if head == 'subgraph':
+        if _SUBGRAPH_RE.match(stripped):
+            return Statement('subgraph', [], [], None)
+        return Statement('subgraph', [], [], (pos, 'subgraph requires an id or title'))
+    if head == 'end' and stripped.rstrip(';') == 'end':
+        return Statement('end', [], [], None)
+    if head in DIRECTIVES:
+        return Statement('directive', [], [], None)
+    if _CONFLICT_RE.match(stripped):
+        return Statement('conflict', [], [], (pos, 'merge conflict marker'))
+    return _scan_chain(line, pos, lineno)
+
+
+class Parser:
+    """Incremental parser; feed it lines and read the ``diagram`` attribute."""
+
+    def __init__(self) -> None:
+        self.diagram = Diagram()
+        self.lineno = 0
+        self._stack: List[Subgraph] = []
+
+    def feed(self, line: str) -> Statement:
+        self.lineno += 1
+        statement = parse_statement(line, self.lineno)
+        diagram = self.diagram
+        if statement.error:
+            col, message = statement.error
+            diagram.errors.append((self.lineno, col + 1, message))
+        if statement.kind == 'chain':
+            nodes = diagram.nodes
+            members = self._stack[-1].nodes if self._stack else None
+            for node in statement.nodes:
+                known = nodes.get(node.id)
+                if known is None:
+                    nodes[node.id] = node
+                    if members is not None:
+                        members.append(node.id)
+                elif node.shape and not known.shape:
+                    nodes[node.id] = node
+            diagram.refs.extend(statement.nodes)
+            diagram.edges.extend(statement.edges)
+        elif statement.kind == 'header':
+            match = _HEADER_RE.match(line.strip())
+            if match and not diagram.direction:
+                diagram.direction = match.group(1) or 'TB'
+        elif statement.kind == 'subgraph' and statement.error:
+            # Still open a (nameless) scope so its 'end' is not reported as unmatched.
+            self._stack.append(Subgraph('', '', self.lineno, None, []))
+        elif statement.kind == 'subgraph':
+            match = _SUBGRAPH_RE.match(line.strip())
+            if match.group('id'):
+                subgraph_id, title = match.group('id'), _unquote(match.group('title').strip())
+            else:
+                subgraph_id = title = match.group('quoted') or match.group('bare')
+            parent = self._stack[-1].id if self._stack else None
+            subgraph = Subgraph(subgraph_id, title, self.lineno, parent, [])
+            diagram.subgraphs.append(subgraph)
+            self._stack.append(subgraph)
+        elif statement.kind == 'end':
+            if self._stack:
+                self._stack.pop()
+            else:
+                diagram.errors.append((self.lineno, len(line) - len(line.lstrip()) + 1,
+                                       "'end' without a matching subgraph"))
+        return statement
+
+    def close(self) -> Diagram:
+        for subgraph in self._stack:
+            self.diagram.errors.append((subgraph.line, 1, f"subgraph {subgraph.id!r} is never closed"))
+        self._stack = []
+        return self.diagram
+
+
+def parse_lines(lines: Iterable[str]) -> Diagram:
+    """Parse an iterable of source lines into a Diagram."""
+    parser = Parser()
+    for line in lines:
+        parser.feed(line)
+    return parser.close()
+
+
+def parse(text: str) -> Diagram:
+    """
+    Parse a Mermaid flowchart.
+
+    Args:
+        text (str): The diagram source.
+
+    Returns:
+        Diagram: Nodes, edges, subgraphs and any parse errors.
+    """
+    return parse_lines(text.splitlines())
+
+
+def parse_file(path: str) -> Diagram:
+    """Parse the Mermaid flowchart stored at ``path``."""
+    with open(path, 'r') as f:
+        return parse_lines(f)
+
+
+def format_node(node_id: str, label: str, shape: str = 'rect') -> str:
+    """Render a node definition, quoting the label when the shape delimiters require it."""
+    opening, closing = _SHAPE_DELIMITERS.get(shape or 'rect', _SHAPE_DELIMITERS['rect'])
+    if _NEEDS_QUOTES_RE.search(label):
+        label = f'"{label}"'
+    return f"{node_id}{opening}{label}{closing}"
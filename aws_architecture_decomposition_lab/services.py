@@ -0,0 +1,165 @@
+"""
+AWS service vocabulary and service-mention matching.
+
+The vocabulary is generated from ``aws_icons_mapping.json``: its keys are the
+valid node prefixes, and the icon file names (``Arch_Amazon-API-Gateway_48.png``)
+supply display names and aliases. Mentions of services in free text are found
+with an Aho-Corasick automaton, so every alias is matched in a single pass.
+"""
+
+import json
+import os
+import re
+from collections import deque
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+ICONS_MAPPING_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  'aws_icons_mapping.json')
+
+_ICON_NAME_RE = re.compile(r'Arch_(?:(Amazon|AWS)-)?(.+?)_\d+\.\w+$')
+
+# Common names that cannot be derived from the icon file names.
+EXTRA_ALIASES = {
+    'alb': 'elb',
+    'nlb': 'elb',
+    'load balancer': 'elb',
+    'stepfunctions': 'step_functions',
+    'state machine': 'step_functions',
+    'firehose': 'kinesis',
+    'elasticsearch': 'opensearch',
+    'kafka': 'msk',
+    'dynamo': 'dynamodb',
+    'docdb': 'documentdb',
+}
+
+
+def _display_name(prefix: str, icon_url: str) -> str:
+    match = _ICON_NAME_RE.search(os.path.basename(icon_url))
+    if not match:
+        return prefix
+    vendor, name = match.groups()
+    name = name.replace('-', ' ')
+    return f"{vendor} {name}" if vendor else name
+
+
+def load_service_names(path: str = ICONS_MAPPING_PATH) -> Dict[str, str]:
+    """
+    Load the service vocabulary.
+
+    Args:
+        path (str): Path to the AWS icons mapping JSON file.
+
+    Returns:
+        Dict[str, str]: Display names keyed by node prefix, e.g. ``{"s3": "Amazon Simple Storage Service"}``.
+    """
+    with open(path, 'r') as f:
+        mapping = json.load(f)
+    return {prefix: _display_name(prefix, url) for prefix, url in mapping.items()}
+
+
+def build_aliases(service_names: Dict[str, str]) -> Dict[str, str]:
+    """Map every lower-case alias (prefix, product name, extras) to its prefix."""
+    aliases = {}
+    for prefix, display_name in service_names.items():
+        product = display_name.split(' ', 1)[1] if display_name.startswith(('Amazon ', 'AWS ')) else display_name
+        product = product.lower()
+        for alias in (prefix, prefix.replace('_', ' '), product, product.replace(' ', ''), product.replace(' ', '-')):
+            aliases.setdefault(alias, prefix)
+    for alias, prefix in EXTRA_ALIASES.items():
+        if prefix in service_names:
+            aliases.setdefault(alias, prefix)
+    return aliases
+
+
+class ServiceMatcher:
+    """Aho-Corasick automaton over service aliases."""
+
+    def __init__(self, aliases: Dict[str, str]) -> None:
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, str]]] = [[]]
+        for alias, prefix in aliases.items():
+            state = 0
+            for char in alias:
+                nxt = self._goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append((len(alias), prefix))
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(char, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find_all(self, text: str) -> List[Tuple[int, int, str]]:
+        """
+        Find every whole-word alias occurrence in one pass over the text.
+
+        Args:
+            text (str): Free text, e.g. a node description.
+
+        Returns:
+            List[Tuple[int, int, str]]: ``(start, end, prefix)`` for each match, in end order.
+        """
+        text = text.lower()
+        goto, fail, out = self._goto, self._fail, self._out
+        matches = []
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                end = index + 1
+                after_ok = end == len(text) or not text[end].isalnum()
+                for length, prefix in out[state]:
+                    start = end - length
+                    if after_ok and (start == 0 or not text[start - 1].isalnum()):
+                        matches.append((start, end, prefix))
+        return matches
+
+    def rank(self, text: str) -> List[str]:
+        """
+        Rank the services mentioned in the text by match strength.
+
+        Overlapping mentions are first resolved leftmost-longest. Each service then
+        scores its longest surviving mention, and longer matches rank first, so in
+        ``"ELB in front of elasticache"`` elasticache outranks elb. Ties keep the
+        order of first mention.
+        """
+        strength: Dict[str, Tuple[int, int]] = {}
+        covered = -1
+        for start, end, prefix in sorted(self.find_all(text), key=lambda m: (m[0], m[0] - m[1])):
+            if start < covered:
+                continue
+            covered = end
+            length, first = strength.get(prefix, (0, start))
+            strength[prefix] = (max(length, end - start), first)
+        return sorted(strength, key=lambda prefix: (-strength[prefix][0], strength[prefix][1]))
+
+    def best(self, text: str) -> Optional[str]:
+        """The highest-ranked service mentioned in the text, if any."""
+        ranked = self.rank(text)
+        return ranked[0] if ranked else None
+
+
+SERVICE_NAMES: Dict[str, str] = load_service_names()
+VALID_PREFIXES: FrozenSet[str] = frozenset(SERVICE_NAMES)
+
+
+@lru_cache(maxsize=None)
+def default_matcher() -> ServiceMatcher:
+    """The matcher over the repository's service vocabulary, built on first use."""
+    return ServiceMatcher(build_aliases(SERVICE_NAMES))
@@ -0,0 +1,281 @@
+"""
+MinHash/LSH index for finding similar architectures.
+
+Each diagram is reduced to a set of shingles (``s:<service>`` for every
+service and ``a:<source>><sink>`` for every arc) and summarised by a
+MinHash signature, whose agreement rate estimates the Jaccard similarity of
+two shingle sets. Signatures are split into ``bands`` of ``rows`` values;
+each band is hashed into a bucket key, and diagrams that share any bucket
+with the query are the candidates, which are then ranked by estimated
+Jaccard. A query therefore touches ``bands`` index lookups plus its
+candidates, independent of the corpus size.
+
+The index is a SQLite file (WAL, like the frequency database) holding the
+signatures and the bucket postings. Adding diagrams is incremental: files
+are keyed by path, unchanged files (same SHA-256) are skipped and changed
+ones are re-signed.
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, List, NamedTuple, Set
+
+import click
+import numpy as np
+
+from aws_architecture_decomposition_lab import mermaid
+from aws_architecture_decomposition_lab.files import expand_paths, sha256_bytes
+from aws_architecture_decomposition_lab.services import ServiceMatcher, default_matcher
+
+DEFAULT_INDEX_PATH = 'aws_similarity.db'
+NUM_PERM = 128
+BANDS = 32
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS index_settings
+    (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS signatures
+    (doc INTEGER PRIMARY KEY,
+     path TEXT UNIQUE NOT NULL,
+     sha256 TEXT NOT NULL,
+     shingles INTEGER NOT NULL,
+     signature BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS buckets
+    (key INTEGER NOT NULL,
+     doc INTEGER NOT NULL,
+     PRIMARY KEY (key, doc)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_buckets_doc ON buckets (doc);
+'''
+
+
+def _node_token(node: mermaid.Node, matcher: ServiceMatcher) -> str:
+    if node.prefix:
+        return f"s:{node.prefix.lower()}"
+    service = matcher.best(node.label)
+    return f"s:{service}" if service else f"n:{(node.label or node.id).lower()}"
+
+
+def shingles(diagram: mermaid.Diagram) -> Set[str]:
+    """
+    The service and arc shingles of a parsed diagram.
+
+    Unprefixed nodes are resolved to a service from their label when it
+    mentions one, and otherwise contribute their lowercased label, so
+    free-form reference diagrams are comparable too.
+    """
+    matcher = default_matcher()
+    tokens = {node_id: _node_token(node, matcher) for node_id, node in diagram.nodes.items()}
+    result = set(tokens.values())
+    for edge in diagram.edges:
+        source = tokens.get(edge.source) or f"n:{edge.source.lower()}"
+        target = tokens.get(edge.target) or f"n:{edge.target.lower()}"
+        backward = edge.arrow.startswith('<')
+        if not backward or edge.arrow.endswith('>'):
+            result.add(f"a:{source}>{target}")
+        if backward:
+            result.add(f"a:{target}>{source}")
+    return result
+
+
+def _shingle_hash(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=4).digest(), 'little')
+
+
+class MinHasher:
+    """MinHash over ``num_perm`` universal hash functions, seeded for stable signatures."""
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1) -> None:
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self._a = rng.integers(1, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self._hashes: Dict[str, int] = {}
+
+    def signature(self, shingle_set: Iterable[str]) -> np.ndarray:
+        """The uint32 MinHash signature of a non-empty shingle set."""
+        cache = self._hashes
+        hashes = np.fromiter((cache[s] if s in cache else cache.setdefault(s, _shingle_hash(s))
+                              for s in shingle_set), dtype=np.uint64)
+        if not len(hashes):
+            raise ValueError('cannot sign an empty shingle set')
+        # Wrapping uint64 arithmetic, as in the usual NumPy MinHash formulation.
+        with np.errstate(over='ignore'):
+            permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % _MERSENNE_PRIME
+        return (permuted.min(axis=1) & _MAX_HASH).astype(np.uint32)
+
+
+def band_keys(signature: np.ndarray, bands: int) -> List[int]:
+    """One signed 64-bit bucket key per band; the band number is part of the key."""
+    rows = len(signature) // bands
+    keys = []
+    for band in range(bands):
+        chunk = signature[band * rows:(band + 1) * rows].tobytes()
+        digest = hashlib.blake2b(chunk, digest_size=8, person=band.to_bytes(2, 'little')).digest()
+        keys.append(int.from_bytes(digest, 'little', signed=True))
+    return keys
+
+
+def estimated_jaccard(signature: np.ndarray, others: np.ndarray) -> np.ndarray:
+    """Estimated Jaccard similarity of one signature against each row of others."""
+    return (others == signature[None, :]).mean(axis=1)
+
+
+class Match(NamedTuple):
+    path: str
+    similarity: float
+    shingles: int
+
+
+class IndexStats(NamedTuple):
+    added: int
+    updated: int
+    unchanged: int
+    empty: int
+
+
+class SimilarityIndex:
+    """Persistent MinHash/LSH index in a SQLite file."""
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH, num_perm: int = NUM_PERM, bands: int = BANDS) -> None:
+        self.conn = sqlite3.connect(path, timeout=30.0)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        with self.conn:
+            self.conn.executemany('INSERT OR IGNORE INTO index_settings (key, value) VALUES (?, ?)',
+                                  [('num_perm', num_perm), ('bands', bands)])
+        settings = dict(self.conn.execute('SELECT key, value FROM index_settings'))
+        # An existing index keeps the parameters it was built with.
+        self.num_perm, self.bands = settings['num_perm'], settings['bands']
+        if self.num_perm % self.bands:
+            raise ValueError(f"num_perm ({self.num_perm}) must be a multiple of bands ({self.bands})")
+        self.hasher = MinHasher(self.num_perm)
+
+    def __enter__(self) -> 'SimilarityIndex':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __len__(self) -> int:
+        return self.conn.execute('SELECT COUNT(*) FROM signatures').fetchone()[0]
+
+    def add_paths(self, paths: List[str], batch_size: int = 1000) -> IndexStats:
+        """
+        Add or refresh diagrams, one transaction per batch.
+
+        Args:
+            paths (List[str]): Diagram files.
+            batch_size (int): Files per transaction.
+
+        Returns:
+            IndexStats: Files added, re-signed after a change, unchanged, and skipped for having no shingles.
+        """
+        known = {path: (doc, digest)
+                 for doc, path, digest in self.conn.execute('SELECT doc, path, sha256 FROM signatures')}
+        added = updated = unchanged = empty = 0
+        for start in range(0, len(paths), batch_size):
+            with self.conn:
+                for path in paths[start:start + batch_size]:
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                    digest = sha256_bytes(data)
+                    previous = known.get(path)
+                    if previous and previous[1] == digest:
+                        unchanged += 1
+                        continue
+                    shingle_set = shingles(mermaid.parse(data.decode('utf-8')))
+                    if previous:
+                        self._remove(previous[0])
+                    if not shingle_set:
+                        empty += 1
+                        continue
+                    self._insert(path, digest, shingle_set)
+                    if previous:
+                        updated += 1
+                    else:
+                        added += 1
+        return IndexStats(added, updated, unchanged, empty)
+
+    def _remove(self, doc: int) -> None:
+        self.conn.execute('DELETE FROM buckets WHERE doc = ?', (doc,))
+        self.conn.execute('DELETE FROM signatures WHERE doc = ?', (doc,))
+
+    def _insert(self, path: str, digest: str, shingle_set: Set[str]) -> None:
+        signature = self.hasher.signature(shingle_set)
+        doc = self.conn.execute('INSERT INTO signatures (path, sha256, shingles, signature) VALUES (?, ?, ?, ?)',
+                                (path, digest, len(shingle_set), signature.tobytes())).lastrowid
+        self.conn.executemany('INSERT OR IGNORE INTO buckets (key, doc) VALUES (?, ?)',
+                              ((key, doc) for key in band_keys(signature, self.bands)))
+
+    def query(self, shingle_set: Set[str], top: int = 10) -> List[Match]:
+        """
+        The indexed diagrams most similar to a shingle set.
+
+        Args:
+            shingle_set (Set[str]): Shingles of the query diagram.
+            top (int): Number of matches.
+
+        Returns:
+            List[Match]: Candidates sharing an LSH bucket, by descending estimated Jaccard.
+        """
+        signature = self.hasher.signature(shingle_set)
+        keys = band_keys(signature, self.bands)
+        placeholders = ','.join('?' * len(keys))
+        rows = self.conn.execute(f'''SELECT path, shingles, signature FROM signatures WHERE doc IN
+                                     (SELECT DISTINCT doc FROM buckets WHERE key IN ({placeholders}))''',
+                                 keys).fetchall()
+        if not rows:
+            return []
+        others = np.frombuffer(b''.join(row[2] for row in rows), dtype=np.uint32).reshape(len(rows), -1)
+        scores = estimated_jaccard(signature, others)
+        order = sorted(range(len(rows)), key=lambda i: (-scores[i], rows[i][0]))[:top]
+        return [Match(rows[i][0], float(scores[i]), rows[i][1]) for i in order]
+
+    def query_file(self, path: str, top: int = 10) -> List[Match]:
+        """The indexed diagrams most similar to the diagram stored at path."""
+        with open(path, 'r', encoding='utf-8') as f:
+            return self.query(shingles(mermaid.parse(f.read())), top)
+
+
+@click.command('similar-index')
+@click.argument('inputs', nargs=-1, required=True)
+@click.option('--index', 'index_path', default=DEFAULT_INDEX_PATH, help='Similarity index file.')
+@click.option('--batch-size', default=1000, type=click.IntRange(min=1), help='Files per transaction.')
+def similar_index(inputs, index_path, batch_size):
+    """Add diagrams (files, directories or globs) to the similarity index."""
+    start = time.perf_counter()
+    with SimilarityIndex(index_path) as index:
+        stats = index.add_paths(expand_paths(inputs), batch_size)
+        total = len(index)
+    elapsed = time.perf_counter() - start
+    click.echo(f"Indexed {stats.added} new and {stats.updated} changed diagram(s), {stats.unchanged} unchanged, "
+               f"{stats.empty} empty; {total} in the index ({elapsed:.2f} s).", err=True)
+
+
+@click.command('similar')
+@click.argument('diagram', type=click.Path(exists=True, dir_okay=False))
+@click.option('--top', '-k', default=10, type=click.IntRange(min=1), help='Number of matches.')
+@click.option('--index', 'index_path', default=DEFAULT_INDEX_PATH, help='Similarity index file.')
+def similar(diagram, top, index_path):
+    """List the indexed diagrams most similar to DIAGRAM."""
+    if not os.path.exists(index_path):
+        raise click.UsageError(f"no similarity index at {index_path}; build it with similar-index")
+    with SimilarityIndex(index_path) as index:
+        start = time.perf_counter()
+        try:
+            matches = index.query_file(diagram, top)
+        except ValueError:
+            raise click.UsageError(f"{diagram} has no nodes to compare")
+        elapsed = (time.perf_counter() - start) * 1000
+    for match in matches:
+        click.echo(f"{match.similarity:6.3f}  {match.path}")
+    click.echo(f"{len(matches)} match(es) in {elapsed:.1f} ms.", err=True)
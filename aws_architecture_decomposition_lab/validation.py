@@ -0,0 +1,55 @@
+"""
+Opt-in pydantic validation of parsed Mermaid nodes.
+
+The audit hot path works on ``mermaid.Node`` tuples; this module is only
+imported for ``--strict`` runs, which validate each file's nodes as one batch.
+Both audit scripts validate the same nodes: every distinct ``prefix:service``
+node of the diagram.
+"""
+
+from typing import List
+
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError, field_validator
+
+from aws_architecture_decomposition_lab import mermaid
+from aws_architecture_decomposition_lab.services import VALID_PREFIXES
+
+
+class MermaidNode(BaseModel):
+    prefix: str = Field(min_length=1)
+    service: str = Field(min_length=1)
+    description: str
+
+    @field_validator('prefix')
+    @classmethod
+    def known_prefix(cls, prefix: str) -> str:
+        if prefix.lower() not in VALID_PREFIXES:
+            raise ValueError(f"unknown service prefix {prefix!r}")
+        return prefix
+
+
+_NODE_LIST = TypeAdapter(List[MermaidNode])
+
+
+def validate_nodes(nodes: List[mermaid.Node]) -> List[str]:
+    """
+    Validate parsed nodes against MermaidNode in a single batch.
+
+    Args:
+        nodes (List[mermaid.Node]): Nodes from one diagram.
+
+    Returns:
+        List[str]: One ``line N: message`` entry per validation error.
+    """
+    try:
+        _NODE_LIST.validate_python(
+            [{'prefix': node.prefix, 'service': node.service, 'description': node.label} for node in nodes])
+    except ValidationError as e:
+        return [f"line {nodes[error['loc'][0]].line}: {error['loc'][-1]}: {error['msg']}"
+                for error in e.errors()]
+    return []
+
+
+def validate_diagram(diagram: mermaid.Diagram) -> List[str]:
+    """Validate the prefixed nodes of a parsed diagram; see validate_nodes."""
+    return validate_nodes([node for node in diagram.nodes.values() if node.prefix])
@@ -0,0 +1,169 @@
+"""
+Single-writer queue for the frequency database.
+
+Producers (threads, or callers spread across a long-running process) hand
+service and arc increments to a ``FrequencyWriter``; one background thread
+owns the only SQLite connection, coalesces the increments in ``Counter``s
+and applies them in one transaction whenever ``max_pending`` increments have
+queued up or ``flush_interval`` seconds have passed. Several processes can
+each run a writer against the same database: WAL keeps readers off the write
+lock, the busy timeout queues the writers, and coalescing keeps their
+transactions few and short. ``close`` (or leaving the ``with`` block) drains
+the queue and flushes whatever is left.
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Iterable, Mapping, Optional, Tuple
+
+from aws_architecture_decomposition_lab import frequency
+
+_STOP = object()
+
+
+class FrequencyWriter:
+    """
+    Coalescing single-connection writer.
+
+    Attributes:
+        flushes (int): Transactions committed so far.
+        written (int): Increments committed so far.
+    """
+
+    def __init__(self, path: str = frequency.DEFAULT_DB_PATH, max_pending: int = 10_000,
+                 flush_interval: float = 1.0, busy_timeout: float = frequency.DEFAULT_BUSY_TIMEOUT,
+                 retries: int = 3) -> None:
+        self.path = path
+        self.retries = retries
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self.busy_timeout = busy_timeout
+        self.flushes = 0
+        self.written = 0
+        self._queue: queue.Queue = queue.Queue()
+        self._error: Optional[BaseException] = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='frequency-writer', daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        self._raise_error()
+
+    def __enter__(self) -> 'FrequencyWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def add(self, services: Optional[Mapping[str, int]] = None,
+            arcs: Optional[Mapping[Tuple[str, str], int]] = None,
+            pairs: Optional[Mapping[Tuple[str, str], int]] = None) -> None:
+        """Queue service, arc and co-occurrence increments; safe to call from any thread."""
+        self._raise_error()
+        if not self._thread.is_alive():
+            raise RuntimeError('FrequencyWriter is closed')
+        self._queue.put((dict(services or {}), dict(arcs or {}), dict(pairs or {})))
+
+    def add_diagram(self, services: Iterable[str], arcs: Iterable[Tuple[str, str]]) -> None:
+        """Queue the known services, arcs and co-occurring pairs of one parsed diagram."""
+        services = list(services)
+        self.add(frequency.count_services(services), frequency.count_arcs(arcs),
+                 frequency.count_cooccurrence(services))
+
+    def flush(self) -> None:
+        """Block until everything queued so far is committed."""
+        done = threading.Event()
+        self._queue.put(done)
+        while not done.wait(0.1):
+            if not self._thread.is_alive():
+                break
+        self._raise_error()
+
+    def close(self) -> None:
+        """Flush the remaining increments and stop the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        self._raise_error()
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise RuntimeError(f"frequency writer failed: {self._error}") from self._error
+
+    def _run(self) -> None:
+        try:
+            conn = frequency.connect(self.path, self.busy_timeout)
+        except BaseException as error:  # surfaced to the constructor
+            self._error = error
+            self._ready.set()
+            return
+        self._ready.set()
+        services, arcs, pairs = Counter(), Counter(), Counter()
+        pending = 0
+        deadline = time.monotonic() + self.flush_interval
+        stopping = False
+        try:
+            while not stopping:
+                waiters = []
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    item = None
+                # Drain whatever else is already queued before deciding to flush.
+                while item is not None:
+                    if item is _STOP:
+                        stopping = True
+                    elif isinstance(item, threading.Event):
+                        waiters.append(item)
+                    else:
+                        services.update(item[0])
+                        arcs.update(item[1])
+                        pairs.update(item[2])
+                        pending += sum(item[0].values()) + sum(item[1].values()) + sum(item[2].values())
+                    if pending >= self.max_pending:
+                        break
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        item = None
+                if pending and (stopping or waiters or pending >= self.max_pending
+                                or time.monotonic() >= deadline):
+                    self._commit(conn, services, arcs, pairs, pending)
+                    services, arcs, pairs = Counter(), Counter(), Counter()
+                    pending = 0
+                if time.monotonic() >= deadline or not pending:
+                    deadline = time.monotonic() + self.flush_interval
+                for waiter in waiters:
+                    waiter.set()
+        except BaseException as error:
+            self._error = error
+        finally:
+            conn.close()
+            # Release anyone still waiting on a flush.
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, threading.Event):
+                    item.set()
+
+    def _commit(self, conn: sqlite3.Connection, services: Counter, arcs: Counter, pairs: Counter,
+                pending: int) -> None:
+        # The busy timeout already waits for other writers; a lock that outlasts it
+        # is retried a few times before giving up, so the increments are not dropped.
+        for attempt in range(self.retries + 1):
+            try:
+                with conn:
+                    frequency.upsert_service_counts(conn, services)
+                    frequency.upsert_arc_counts(conn, arcs)
+                    frequency.upsert_cooccurrence_counts(conn, pairs)
+                break
+            except sqlite3.OperationalError as error:
+                if attempt == self.retries or 'locked' not in str(error):
+                    raise
+                time.sleep(0.05 * 2 ** attempt)
+        self.flushes += 1
+        self.written += pending
@@ -1,6 +1,8 @@
 -- Drop tables if they exist (for demo/re-seeding)
 DROP TABLE IF EXISTS frequencies;
 DROP TABLE IF EXISTS services;
+-- Derived from frequencies; rebuilt on the next connect.
+DROP TABLE IF EXISTS service_degree;
 
 -- Create Services Table
 CREATE TABLE services (
@@ -20,6 +22,11 @@ CREATE TABLE frequencies (
     UNIQUE (source_service, sink_service)
 );
 
+-- Covering indexes: top-N arcs walk idx_frequencies_count instead of sorting,
+-- and in-degree lookups use idx_frequencies_sink.
+CREATE INDEX idx_frequencies_count ON frequencies (count DESC, source_service, sink_service);
+CREATE INDEX idx_frequencies_sink ON frequencies (sink_service, source_service, count);
+
 -- Insert Sample Service Data (from aws_icons_mapping)
 INSERT INTO services (name, icon_url)
 VALUES
@@ -43,6 +50,12 @@ VALUES
     ('cloudfront', 's3', 500),
     ('route53', 'cloudfront', 1000),
     ('cognito', 'lambda', 75);
+
+-- Invalidate derived artefacts (the compiled Markov chain cache) built from the old counts.
+CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value NOT NULL);
+INSERT OR IGNORE INTO metadata (key, value) VALUES ('frequency_version', 0);
+INSERT OR IGNORE INTO metadata (key, value) VALUES ('db_id', lower(hex(randomblob(8))));
+UPDATE metadata SET value = value + 1 WHERE key = 'frequency_version';
     
 -- Example Query with Mock Data (Top 5 Frequent Interactions)
 SELECT
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Per-line cost of the audit hot path: pydantic models vs mermaid.Node tuples.
+
+Replicates the diagrams/ corpus SCALE times and times the audit loop with
+each node representation. Run from the repository root:
+
+    python benchmarks/bench_audit_nodes.py --scale 1000
+"""
+
+import glob
+import time
+from typing import List
+
+import click
+from pydantic import ValidationError
+
+from aws_architecture_decomposition_lab import mermaid
+from aws_architecture_decomposition_lab.services import VALID_PREFIXES
+from aws_architecture_decomposition_lab.validation import MermaidNode, validate_nodes
+
+
+def audit(prefix: str, service: str) -> bool:
+    prefix = prefix.lower()
+    return prefix in VALID_PREFIXES and prefix in service.lower()
+
+
+def per_line_model(lines: List[str]) -> int:
+    """Before: one pydantic model per node, built line by line."""
+    passed = 0
+    for lineno, line in enumerate(lines, 1):
+        for parsed in mermaid.parse_statement(line, lineno).nodes:
+            if parsed.prefix:
+                try:
+                    node = MermaidNode(prefix=parsed.prefix, service=parsed.service, description=parsed.label)
+                except ValidationError:
+                    continue  # unknown prefix
+                passed += audit(node.prefix, node.service)
+    return passed
+
+
+def per_line_tuple(lines: List[str]) -> int:
+    """After: the parser's Node tuples are audited directly."""
+    passed = 0
+    for lineno, line in enumerate(lines, 1):
+        for node in mermaid.parse_statement(line, lineno).nodes:
+            if node.prefix:
+                passed += audit(node.prefix, node.service)
+    return passed
+
+
+def per_line_strict(lines: List[str]) -> int:
+    """--strict: tuples on the hot path plus one batched validation call."""
+    nodes = []
+    passed = 0
+    for lineno, line in enumerate(lines, 1):
+        for node in mermaid.parse_statement(line, lineno).nodes:
+            if node.prefix:
+                nodes.append(node)
+                passed += audit(node.prefix, node.service)
+    validate_nodes(nodes)
+    return passed
+
+
+def parse_only(lines: List[str]) -> int:
+    """Baseline: tokenizing without auditing."""
+    return sum(len(mermaid.parse_statement(line, lineno).nodes) for lineno, line in enumerate(lines, 1))
+
+
+@click.command()
+@click.option('--corpus', default='diagrams', help='Directory of .mmd files to replicate.')
+@click.option('--scale', default=1000, help='How many times to replicate the corpus.')
+def main(corpus: str, scale: int):
+    base = []
+    for path in sorted(glob.glob(f"{corpus}/*.mmd")):
+        with open(path, 'r') as f:
+            base.extend(f.readlines())
+    lines = base * scale
+    click.echo(f"{len(lines):,} lines ({len(base):,} x {scale})")
+
+    results = {}
+    for name, func in [('parse only', parse_only), ('pydantic per node', per_line_model),
+                       ('Node tuple', per_line_tuple), ('Node tuple + --strict batch', per_line_strict)]:
+        start = time.perf_counter()
+        results[name] = func(lines)
+        elapsed = time.perf_counter() - start
+        click.echo(f"{name:<30} {elapsed:8.2f} s  {elapsed / len(lines) * 1e9:8.0f} ns/line")
+    assert results['pydantic per node'] == results['Node tuple'] == results['Node tuple + --strict batch']
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Startup cost of aws-reference-diagrams/generate_flashcards.py.
+
+Times ``generate_flashcards.py --help`` in fresh interpreters (templates are
+loaded lazily, so this is import cost only), then the first load of the
+card templates with a cold and with a warm bytecode cache. Run from the
+repository root:
+
+    python benchmarks/bench_flashcards_startup.py --runs 20
+"""
+
+import importlib.util
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import click
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                      'aws-reference-diagrams', 'generate_flashcards.py')
+
+
+def import_script():
+    spec = importlib.util.spec_from_file_location('generate_flashcards', SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def first_load(cache_dir: str) -> float:
+    """Seconds to load every card template in a freshly imported module using cache_dir."""
+    module = import_script()
+    module.template_cache_dir = cache_dir
+    start = time.perf_counter()
+    for name in (module.remote_template_file, module.local_template_file, module.ai_enhanced_template_file):
+        module.load_template(name)
+    return time.perf_counter() - start
+
+
+@click.command()
+@click.option('--runs', default=10, help='Runs per measurement.')
+def main(runs: int):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, SCRIPT, '--help'], check=True, stdout=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - start)
+    click.echo(f"{'--help (new interpreter)':<28} {min(samples) * 1000:8.1f} ms min {sorted(samples)[runs // 2] * 1000:8.1f} ms median")
+
+    cold, warm = [], []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cold.append(first_load(cache_dir))
+            warm.append(first_load(cache_dir))
+    for name, samples in (('templates, cold cache', cold), ('templates, warm cache', warm)):
+        click.echo(f"{name:<28} {min(samples) * 1000:8.1f} ms min {sorted(samples)[runs // 2] * 1000:8.1f} ms median")
+
+
+if __name__ == '__main__':
+    main()
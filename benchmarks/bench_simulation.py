@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Walks per second: per-walk Python loops vs the vectorized bulk simulator.
+
+Builds a chain from the frequency database (or a synthetic one) and times
+the legacy dense ``random.choices`` chain, ``generate_architecture`` over the
+sparse chain, and ``MarkovChain.simulate`` with all walks in lockstep. Run
+from the repository root:
+
+    python benchmarks/bench_simulation.py --count 1000000
+"""
+
+import random
+import time
+from typing import Dict, Tuple
+
+import click
+import numpy as np
+
+from aws_architecture_decomposition_lab import frequency
+from aws_architecture_decomposition_lab.markov import MarkovChain
+
+
+def synthetic_counts(services: int, fan_out: int, seed: int) -> Tuple[Dict[str, int], Dict[Tuple[str, str], int]]:
+    rng = random.Random(seed)
+    names = [f"svc{i}" for i in range(services)]
+    weights = {name: rng.randint(1, 1000) for name in names}
+    arcs = {(name, sink): rng.randint(1, 100) for name in names for sink in rng.sample(names, fan_out)}
+    return weights, arcs
+
+
+def dense_loop(weights: Dict[str, int], count: int, length: int) -> int:
+    """Before: every row is the full weight list, sampled with random.choices."""
+    total = sum(weights.values())
+    transitions = [(service, weight / total) for service, weight in weights.items()]
+    chain = {service: transitions for service in weights}
+    starts = list(weights)
+    states = 0
+    for _ in range(count):
+        architecture = [random.choice(starts)]
+        for _ in range(length - 1):
+            row = chain[architecture[-1]]
+            architecture.append(random.choices([t[0] for t in row], weights=[t[1] for t in row])[0])
+        states += len(architecture)
+    return states
+
+
+def walk_loop(chain: MarkovChain, count: int, length: int) -> int:
+    """generate_architecture: one O(1) alias draw per step, one walk at a time."""
+    rng = np.random.default_rng(0)
+    return sum(len(chain.walk(chain.states[chain.sample_initial(rng)], length, rng)) for _ in range(count))
+
+
+def vectorized(chain: MarkovChain, count: int, length: int) -> int:
+    """--count: all walks advance in lockstep, one vectorized draw per step."""
+    return sum(chunk.size for chunk in chain.iter_simulations(count, length, np.random.default_rng(0)))
+
+
+@click.command()
+@click.option('--db', default=None, help='Frequency database; a synthetic chain is used when omitted.')
+@click.option('--services', default=200, help='Synthetic chain size.')
+@click.option('--fan-out', default=8, help='Synthetic out-degree per service.')
+@click.option('--count', default=1_000_000, help='Walks for the vectorized run.')
+@click.option('--loop-count', default=10_000, help='Walks for the per-walk loops.')
+@click.option('--length', default=10, help='States per walk.')
+def main(db: str, services: int, fan_out: int, count: int, loop_count: int, length: int):
+    if db:
+        conn = frequency.connect(db)
+        weights, arcs = frequency.load_service_counts(conn), frequency.load_arc_counts(conn)
+        conn.close()
+    else:
+        weights, arcs = synthetic_counts(services, fan_out, seed=0)
+    chain = MarkovChain.from_arcs(arcs, weights)
+    click.echo(f"{len(chain)} states, {len(chain.indices)} transitions, length {length}")
+
+    runs = [('dense random.choices', lambda n: dense_loop(weights, n, length), loop_count),
+            ('generate_architecture', lambda n: walk_loop(chain, n, length), loop_count),
+            ('vectorized --count', lambda n: vectorized(chain, n, length), count)]
+    for name, run, walks in runs:
+        start = time.perf_counter()
+        states = run(walks)
+        elapsed = time.perf_counter() - start
+        assert states == walks * length
+        click.echo(f"{name:<24} {walks:>10,} walks {elapsed:8.2f} s  {walks / elapsed:12,.0f} walks/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,89 +1,127 @@
-from typing import List, Tuple
-import re
+from typing import Tuple
+import io
+import json
 import os
 import click
-from pydantic import BaseModel, ValidationError
-
-class MermaidNode(BaseModel):
-    prefix: str
-    service: str
-    description: str
-
-VALID_PREFIXES = [
-    "amplify", "apigateway", "appflow", "appstream", "athena", "aurora", "backup", "batch",
-    "cloudformation", "cloudfront", "cloudsearch", "cloudtrail", "cloudwatch", "codecommit",
-    "codedeploy", "codepipeline", "cognito", "comprehend", "config", "connect", "databrew",
-    "dms", "documentdb", "dynamodb", "ec2", "ecr", "ecs", "efs", "eks", "elasticache",
-    "elasticbeanstalk", "elb", "emr", "eventbridge", "fargate", "fsx", "glacier", "glue",
-    "guardduty", "iam", "inspector", "iot", "kinesis", "kms", "lambda", "lex", "macie", "msk",
-    "neptune", "opensearch", "polly", "qldb", "quicksight", "rds", "redshift", "rekognition",
-    "route53", "s3", "sagemaker", "secretsmanager", "securityhub", "ses", "sns", "sqs",
-    "step_functions", "textract", "timestream", "transcribe", "translate", "vpc", "waf", "xray"
-]
-
-def parse_mermaid_node(line: str) -> Tuple[str, str, str]:
-    match = re.search(r'(\w+):(\w+)\[([^]]+)\]', line)
-    if match:
-        prefix, service, description = match.groups()
-        return prefix, service, description
-    return "", "", ""
-
-def audit_node(node: MermaidNode) -> Tuple[bool, bool]:
+
+from aws_architecture_decomposition_lab import mermaid
+from aws_architecture_decomposition_lab.services import VALID_PREFIXES
+from aws_architecture_decomposition_lab.files import sha256_bytes, sha256_file, write_if_changed
+
+# Bump when fix_line/suggest_fix change what they emit.
+RULES_REVISION = 1
+MANIFEST_FILE = '.fix-manifest.json'
+
+def audit_node(node: mermaid.Node) -> Tuple[bool, bool]:
     valid_prefix = node.prefix.lower() in VALID_PREFIXES
     proper_specificity = node.prefix.lower() in node.service.lower()
     return valid_prefix, proper_specificity
 
-def suggest_fix(node: MermaidNode, counter: int) -> str:
+def suggest_fix(node: mermaid.Node, counter: int) -> str:
     fixed_prefix = node.prefix.lower()
     if fixed_prefix in VALID_PREFIXES:
-        return f"{fixed_prefix}:{fixed_prefix}{counter}[{node.description}]"
+        return f"{fixed_prefix}:{fixed_prefix}{counter}"
     return ""
 
+def fix_line(line: str, node_counter: dict) -> str:
+    """Rewrite every node definition on the line that fails the audit."""
+    statement = mermaid.parse_statement(line)
+    parts = []
+    pos = 0
+    for node in statement.nodes:
+        if not (node.prefix and node.shape):
+            continue
+        valid_prefix, proper_specificity = audit_node(node)
+        if valid_prefix and proper_specificity:
+            continue
+        new_prefix = node.prefix.lower()
+        node_counter[new_prefix] = node_counter.get(new_prefix, 0) + 1
+        fixed_id = suggest_fix(node, node_counter[new_prefix])
+        if not fixed_id:
+            continue
+        parts.append(line[pos:node.col])
+        parts.append(mermaid.format_node(fixed_id, node.label, node.shape))
+        pos = node.end
+    if not parts:
+        return line
+    parts.append(line[pos:])
+    return ''.join(parts)
+
+def rules_version() -> str:
+    """Fingerprint of the fix rules; a change invalidates every manifest entry."""
+    return sha256_bytes(f"{RULES_REVISION}:{','.join(sorted(VALID_PREFIXES))}".encode())[:16]
+
+def load_manifest(path: str) -> dict:
+    try:
+        with open(path, 'r') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    if manifest.get('rules') != rules_version():
+        return {}
+    return manifest.get('files', {})
+
+def output_is_current(path: str, entry: dict, input_hash: str) -> bool:
+    """True if the manifest entry matches the input and the fixed file still holds the recorded output."""
+    if not entry or entry.get('input') != input_hash:
+        return False
+    try:
+        return sha256_file(path) == entry.get('output')
+    except FileNotFoundError:
+        return False
+
+def fix_diagram(data: bytes, file: str, strict: bool = False) -> bytes:
+    """Apply the fix rules to a diagram's raw bytes."""
+    lines = io.StringIO(data.decode('utf-8'), newline=None).readlines()
+    if strict:
+        # pydantic is only imported for --strict runs.
+        from aws_architecture_decomposition_lab.validation import validate_diagram
+        for error in validate_diagram(mermaid.parse_lines(lines)):
+            click.echo(f"Validation error in file {file}: {error}")
+    node_counter = {}
+    return ''.join(fix_line(line, node_counter) for line in lines).encode('utf-8')
+
 @click.command()
 @click.argument('directory', type=click.Path(exists=True))
 @click.option('--output-dir', default='diagrams-fixed', type=click.Path(), help='Directory to save fixed diagrams.')
-def audit_and_fix_mermaid_diagrams(directory: str, output_dir: str):
+@click.option('--force', is_flag=True, help='Ignore the manifest and re-fix every diagram.')
+@click.option('--strict', is_flag=True, help='Validate nodes with pydantic before fixing.')
+def audit_and_fix_mermaid_diagrams(directory: str, output_dir: str, force: bool, strict: bool):
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    manifest = {} if force else load_manifest(manifest_path)
+    entries = {}
+    skipped = 0
+
     for root, _, files in os.walk(directory):
-        for file in files:
+        for file in sorted(files):
             if file.endswith('.mmd'):
                 filepath = os.path.join(root, file)
-                with open(filepath, 'r') as f:
-                    lines = f.readlines()
-
-                fixed_lines = []
-                node_counter = {}
-                
-                for line in lines:
-                    prefix, service, description = parse_mermaid_node(line)
-                    if prefix and service:
-                        try:
-                            node = MermaidNode(prefix=prefix, service=service, description=description)
-                            valid_prefix, proper_specificity = audit_node(node)
-                            if not valid_prefix or not proper_specificity:
-                                new_prefix = prefix.lower()
-                                if new_prefix not in node_counter:
-                                    node_counter[new_prefix] = 1
-                                else:
-                                    node_counter[new_prefix] += 1
-                                fixed_node = suggest_fix(node, node_counter[new_prefix])
-                                fixed_lines.append(line.replace(f"{prefix}:{service}[{description}]", fixed_node))
-                            else:
-                                fixed_lines.append(line)
-                        except ValidationError as e:
-                            click.echo(f"Validation error in file {file}: {e}")
-                            fixed_lines.append(line)
-                    else:
-                        fixed_lines.append(line)
-
-                # Write the fixed diagram to the output directory
                 fixed_filepath = os.path.join(output_dir, file)
-                with open(fixed_filepath, 'w') as f:
-                    f.writelines(fixed_lines)
+                key = os.path.relpath(filepath, directory)
+                with open(filepath, 'rb') as f:
+                    data = f.read()
+                input_hash = sha256_bytes(data)
+
+                entry = manifest.get(key)
+                if output_is_current(fixed_filepath, entry, input_hash):
+                    entries[key] = entry
+                    skipped += 1
+                    continue
+
+                fixed = fix_diagram(data, file, strict)
+                if write_if_changed(fixed_filepath, fixed):
+                    click.echo(f"Fixed diagram saved to {fixed_filepath}")
+                else:
+                    click.echo(f"Fixed diagram unchanged: {fixed_filepath}")
+                entries[key] = {'input': input_hash, 'output': sha256_bytes(fixed)}
 
-                click.echo(f"Fixed diagram saved to {fixed_filepath}")
+    if entries != manifest:
+        write_if_changed(manifest_path, json.dumps(
+            {'rules': rules_version(), 'files': entries}, indent=2, sort_keys=True).encode('utf-8'))
+    click.echo(f"{len(entries) - skipped} diagram(s) processed, {skipped} unchanged since the last run.")
 
 if __name__ == '__main__':
     audit_and_fix_mermaid_diagrams()
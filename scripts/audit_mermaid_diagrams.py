@@ -1,89 +1,104 @@
 from typing import List, Tuple
-import re
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 import click
-from pydantic import BaseModel, ValidationError
 
-class MermaidNode(BaseModel):
-    prefix: str
-    service: str
-    description: str
+from aws_architecture_decomposition_lab import mermaid
+from aws_architecture_decomposition_lab.services import VALID_PREFIXES, default_matcher
 
-VALID_PREFIXES = [
-    "amplify", "apigateway", "appflow", "appstream", "athena", "aurora", "backup", "batch",
-    "cloudformation", "cloudfront", "cloudsearch", "cloudtrail", "cloudwatch", "codecommit",
-    "codedeploy", "codepipeline", "cognito", "comprehend", "config", "connect", "databrew",
-    "dms", "documentdb", "dynamodb", "ec2", "ecr", "ecs", "efs", "eks", "elasticache",
-    "elasticbeanstalk", "elb", "emr", "eventbridge", "fargate", "fsx", "glacier", "glue",
-    "guardduty", "iam", "inspector", "iot", "kinesis", "kms", "lambda", "lex", "macie", "msk",
-    "neptune", "opensearch", "polly", "qldb", "quicksight", "rds", "redshift", "rekognition",
-    "route53", "s3", "sagemaker", "secretsmanager", "securityhub", "ses", "sns", "sqs",
-    "step_functions", "textract", "timestream", "transcribe", "translate", "vpc", "waf", "xray"
-]
-
-def parse_mermaid_node(line: str) -> Tuple[str, str, str]:
-    match = re.search(r'(\w+):(\w+)\[([^]]+)\]', line)
-    if match:
-        prefix, service, description = match.groups()
-        return prefix, service, description
-    return "", "", ""
-
-def audit_node(node: MermaidNode) -> Tuple[bool, bool]:
+def audit_node(node: mermaid.Node) -> Tuple[bool, bool]:
     valid_prefix = node.prefix.lower() in VALID_PREFIXES
     proper_specificity = node.prefix.lower() in node.service.lower()
     return valid_prefix, proper_specificity
 
-def suggest_fix(node: MermaidNode) -> str:
-    if not node.prefix:
-        suggested_prefix = next((prefix for prefix in VALID_PREFIXES if prefix in node.description.lower()), None)
+def suggest_fix(node: mermaid.Node) -> str:
+    if not node.prefix or node.prefix.lower() not in VALID_PREFIXES:
+        suggested_prefix = default_matcher().best(node.label)
         if suggested_prefix:
-            return f"{suggested_prefix}:{node.service.lower()}[{node.description}]"
-    elif node.prefix.lower() not in VALID_PREFIXES:
-        suggested_prefix = next((prefix for prefix in VALID_PREFIXES if prefix in node.description.lower()), None)
-        if suggested_prefix:
-            return f"{suggested_prefix}:{node.service.lower()}[{node.description}]"
+            return f"{suggested_prefix}:{node.service.lower()}[{node.label}]"
     return ""
 
-@click.command()
-@click.argument('directory', type=click.Path(exists=True))
-def audit_mermaid_diagrams(directory: str):
+def find_diagrams(directory: str) -> List[str]:
+    """Return every .mmd file under the directory, in sorted order."""
+    paths = []
     for root, _, files in os.walk(directory):
         for file in files:
             if file.endswith('.mmd'):
-                filepath = os.path.join(root, file)
-                with open(filepath, 'r') as f:
-                    lines = f.readlines()
+                paths.append(os.path.join(root, file))
+    return sorted(paths)
+
+def audit_file(filepath: str, strict: bool = False) -> Tuple[List[str], int, int]:
+    """Audit one diagram and return its report lines, warning count and failure count."""
+    file = os.path.basename(filepath)
+    diagram = mermaid.parse_file(filepath)
+    nodes = [node for node in diagram.nodes.values() if node.prefix]
+
+    messages = []
+    if strict:
+        # pydantic is only imported for --strict runs.
+        from aws_architecture_decomposition_lab.validation import validate_diagram
+        messages.extend(f"Validation error in file {file}: {error}" for error in validate_diagram(diagram))
+
+    warnings = 0
+    failures = 0
+    fixes = []
+    for node in nodes:
+        valid_prefix, proper_specificity = audit_node(node)
+        if not valid_prefix:
+            messages.append(f"Warning: Invalid prefix '{node.prefix}' in file {file}")
+            warnings += 1
+        if not proper_specificity:
+            messages.append(f"Failure: Service '{node.service}' lacks intended specificity in file {file}")
+            failures += 1
+        if not (valid_prefix and proper_specificity):
+            fix = suggest_fix(node)
+            if fix:
+                fixes.append(f"Suggested fix: {fix}")
+
+    if warnings == 0 and failures == 0:
+        messages.append(f"All nodes in {file} are valid and properly specific.")
+    else:
+        messages.append(f"{warnings} warning(s) and {failures} failure(s) found in {file}.")
+        messages.extend(fixes)
+    return messages, warnings, failures
+
+@click.command()
+@click.argument('directory', type=click.Path(exists=True))
+@click.option('--jobs', '-j', default=1, type=click.IntRange(min=0),
+              help='Worker processes to audit files with (0 uses every core).')
+@click.option('--strict', is_flag=True, help='Also validate every node with pydantic, one batch per file.')
+def audit_mermaid_diagrams(directory: str, jobs: int, strict: bool):
+    """Audit every Mermaid diagram under DIRECTORY, exiting non-zero on failures."""
+    paths = find_diagrams(directory)
+    jobs = jobs or os.cpu_count() or 1
+    audit = partial(audit_file, strict=strict)
+
+    if jobs == 1 or len(paths) < 2:
+        results = map(audit, paths)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=jobs)
+        # map() yields in submission order, so output stays in file order.
+        chunksize = max(1, len(paths) // (jobs * 4))
+        results = executor.map(audit, paths, chunksize=chunksize)
 
-                warnings = 0
-                failures = 0
-                fixes = []
-                for line in lines:
-                    prefix, service, description = parse_mermaid_node(line)
-                    if prefix and service:
-                        try:
-                            node = MermaidNode(prefix=prefix, service=service, description=description)
-                            valid_prefix, proper_specificity = audit_node(node)
-                            if not valid_prefix:
-                                click.echo(f"Warning: Invalid prefix '{node.prefix}' in file {file}")
-                                warnings += 1
-                                fix = suggest_fix(node)
-                                if fix:
-                                    fixes.append(f"Suggested fix: {fix}")
-                            if not proper_specificity:
-                                click.echo(f"Failure: Service '{node.service}' lacks intended specificity in file {file}")
-                                failures += 1
-                                fix = suggest_fix(node)
-                                if fix:
-                                    fixes.append(f"Suggested fix: {fix}")
-                        except ValidationError as e:
-                            click.echo(f"Validation error in file {file}: {e}")
+    total_warnings = 0
+    total_failures = 0
+    try:
+        for messages, warnings, failures in results:
+            for message in messages:
+                click.echo(message)
+            total_warnings += warnings
+            total_failures += failures
+    finally:
+        if executor is not None:
+            executor.shutdown()
 
-                if warnings == 0 and failures == 0:
-                    click.echo(f"All nodes in {file} are valid and properly specific.")
-                else:
-                    click.echo(f"{warnings} warning(s) and {failures} failure(s) found in {file}.")
-                    for fix in fixes:
-                        click.echo(fix)
+    click.echo(f"Audited {len(paths)} file(s): {total_warnings} warning(s) and {total_failures} failure(s).")
+    if total_failures:
+        sys.exit(1)
 
 if __name__ == '__main__':
     audit_mermaid_diagrams()
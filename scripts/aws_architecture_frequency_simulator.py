@@ -7,69 +7,84 @@ tracks service usage frequency in a SQLite database, and simulates
 new architectures based on historical weights using a Markov chain.
 """
 
-import re
 import json
 import sqlite3
-from typing import Dict, List, Tuple
+import time
+from typing import Dict, List, Optional, Tuple
 import click
-import itertools
-from functools import reduce
-from collections import Counter
-import random
-
-# Inline data file for AWS service mappings
-AWS_SERVICES = {
-    "ec2": "Amazon EC2",
-    "s3": "Amazon S3",
-    "lambda": "AWS Lambda",
-    "dynamodb": "Amazon DynamoDB",
-    "rds": "Amazon RDS",
-    "cloudfront": "Amazon CloudFront",
-    "apigateway": "Amazon API Gateway",
-    "sns": "Amazon SNS",
-    "sqs": "Amazon SQS",
-    "kinesis": "Amazon Kinesis",
-    # Add more services as needed
-}
+import numpy as np
+
+from aws_architecture_decomposition_lab import counting
+from aws_architecture_decomposition_lab import frequency as frequency_db
+from aws_architecture_decomposition_lab import mermaid
+from aws_architecture_decomposition_lab.files import expand_paths
+from aws_architecture_decomposition_lab.frequency import DEFAULT_DB_PATH
+from aws_architecture_decomposition_lab.markov import (OUTPUT_FORMATS, STOPPED, MarkovChain, chain_cache_dir,
+                                                        load_cached_chain, write_walks)
+from aws_architecture_decomposition_lab.services import SERVICE_NAMES
+from aws_architecture_decomposition_lab.writer import FrequencyWriter
+
+# AWS service mappings, generated from aws_icons_mapping.json
+AWS_SERVICES = SERVICE_NAMES
 
-def init_db() -> sqlite3.Connection:
-    """Initialize SQLite database for storing service frequencies."""
-    conn = sqlite3.connect('aws_service_frequency.db')
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS service_frequency
-                 (service TEXT PRIMARY KEY, frequency INTEGER)''')
-    conn.commit()
-    return conn
+def init_db(path: str = DEFAULT_DB_PATH) -> sqlite3.Connection:
+    """Initialize SQLite database (WAL mode) for storing service frequencies."""
+    return frequency_db.connect(path)
 
 def parse_mermaid(mermaid_diagram: str) -> List[str]:
     """
     Parse a Mermaid diagram and extract AWS service names.
 
+    Each distinct ``prefix:service`` node contributes its prefix once; edge
+    labels, styling directives and repeated references are not counted.
+
     Args:
         mermaid_diagram (str): The Mermaid diagram as a string.
 
     Returns:
         List[str]: A list of AWS service names found in the diagram.
     """
-    service_pattern = r'(\w+):'
-    return re.findall(service_pattern, mermaid_diagram)
+    return mermaid.parse(mermaid_diagram).services()
+
+def database_path(conn: sqlite3.Connection) -> str:
+    """The file behind a connection's main database."""
+    return conn.execute('PRAGMA database_list').fetchone()[2]
 
 def update_frequency_db(conn: sqlite3.Connection, services: List[str]):
     """
     Update the frequency count of AWS services in the database.
 
+    The counts go through a FrequencyWriter on the connection's database file
+    and are committed, with the frequency version bumped, before returning.
+
     Args:
         conn (sqlite3.Connection): Database connection.
         services (List[str]): List of AWS service names.
     """
-    c = conn.cursor()
-    for service in services:
-        if service in AWS_SERVICES:
-            c.execute('''INSERT INTO service_frequency (service, frequency)
-                         VALUES (?, 1)
-                         ON CONFLICT(service) DO UPDATE SET
-                         frequency = frequency + 1''', (service,))
-    conn.commit()
+    with FrequencyWriter(database_path(conn)) as writer:
+        writer.add(services=frequency_db.count_services(services, AWS_SERVICES))
+
+def update_arc_frequency_db(conn: sqlite3.Connection, arcs: List[Tuple[str, str]]):
+    """
+    Update the source/sink arc counts in the frequencies table through a FrequencyWriter.
+
+    Args:
+        conn (sqlite3.Connection): Database connection.
+        arcs (List[Tuple[str, str]]): (source, sink) service pairs, one per edge.
+    """
+    with FrequencyWriter(database_path(conn)) as writer:
+        writer.add(arcs=frequency_db.count_arcs(arcs, AWS_SERVICES))
+
+def update_cooccurrence_db(conn: sqlite3.Connection, services: List[str]):
+    """
+    Count the pairs of services that appear together in one diagram, through a FrequencyWriter.
+
+    Args:
+        conn (sqlite3.Connection): Database connection.
+        services (List[str]): AWS service names of a single diagram.
+    """
+    with FrequencyWriter(database_path(conn)) as writer:
+        writer.add(pairs=frequency_db.count_cooccurrence(services, AWS_SERVICES))
 
 def process_itertools(services: List[str]) -> Dict[str, int]:
     """
@@ -81,7 +96,7 @@ def process_itertools(services: List[str]) -> Dict[str, int]:
     Returns:
         Dict[str, int]: Frequency count of services.
     """
-    return dict(Counter(filter(lambda s: s in AWS_SERVICES, services)))
+    return counting.count_itertools(services, AWS_SERVICES)
 
 def process_map_reduce(services: List[str]) -> Dict[str, int]:
     """
@@ -93,9 +108,7 @@ def process_map_reduce(services: List[str]) -> Dict[str, int]:
     Returns:
         Dict[str, int]: Frequency count of services.
     """
-    mapped = map(lambda s: (s, 1) if s in AWS_SERVICES else None, services)
-    filtered = filter(None, mapped)
-    return dict(reduce(lambda x, y: {**x, y[0]: x.get(y[0], 0) + y[1]}, filtered, {}))
+    return counting.count_map_reduce(services, AWS_SERVICES)
 
 def process_pure_python(services: List[str]) -> Dict[str, int]:
     """
@@ -107,11 +120,26 @@ def process_pure_python(services: List[str]) -> Dict[str, int]:
     Returns:
         Dict[str, int]: Frequency count of services.
     """
-    frequency = {}
-    for service in services:
-        if service in AWS_SERVICES:
-            frequency[service] = frequency.get(service, 0) + 1
-    return frequency
+    return counting.count_pure_python(services, AWS_SERVICES)
+
+def process_numpy(services: List[str]) -> Dict[str, int]:
+    """
+    Process services using NumPy unique counts.
+
+    Args:
+        services (List[str]): List of AWS service names.
+
+    Returns:
+        Dict[str, int]: Frequency count of services.
+    """
+    return counting.count_numpy(services, AWS_SERVICES)
+
+METHODS = {
+    'itertools': process_itertools,
+    'map_reduce': process_map_reduce,
+    'pure_python': process_pure_python,
+    'numpy': process_numpy,
+}
 
 def get_historical_weights(conn: sqlite3.Connection) -> Dict[str, int]:
     """
@@ -123,52 +151,104 @@ def get_historical_weights(conn: sqlite3.Connection) -> Dict[str, int]:
     Returns:
         Dict[str, int]: Historical weights of services.
     """
-    c = conn.cursor()
-    c.execute("SELECT service, frequency FROM service_frequency")
-    return dict(c.fetchall())
+    return frequency_db.load_service_counts(conn)
 
-def create_markov_chain(weights: Dict[str, int]) -> Dict[str, List[Tuple[str, float]]]:
+def get_historical_arcs(conn: sqlite3.Connection) -> Dict[Tuple[str, str], int]:
     """
-    Create a Markov chain from historical weights.
+    Get historical source/sink arc counts from the database.
+
+    Args:
+        conn (sqlite3.Connection): Database connection.
+
+    Returns:
+        Dict[Tuple[str, str], int]: Arc counts keyed by (source, sink).
+    """
+    return frequency_db.load_arc_counts(conn)
+
+def create_markov_chain(weights: Dict[str, int], arcs: Optional[Dict[Tuple[str, str], int]] = None) -> MarkovChain:
+    """
+    Create a first-order Markov chain from historical weights and arcs.
+
+    Transitions are the observed arc counts normalised per source service and
+    stored sparsely; services with no outgoing arcs restart from the
+    distribution of historical weights. Without arcs every draw is independent
+    and proportional to the weights.
 
     Args:
         weights (Dict[str, int]): Historical weights of services.
+        arcs (Optional[Dict[Tuple[str, str], int]]): Historical (source, sink) arc counts.
+
+    Returns:
+        MarkovChain: Markov chain with O(1) per-step sampling.
+    """
+    return MarkovChain.from_arcs(arcs or {}, weights)
+
+def load_markov_chain(conn: sqlite3.Connection, db_path: str = DEFAULT_DB_PATH) -> MarkovChain:
+    """
+    Load the compiled Markov chain for the current frequencies.
+
+    The chain is cached next to the database and memory-mapped, so repeated
+    simulations skip the table scans and the rebuild until the frequencies
+    change.
+
+    Args:
+        conn (sqlite3.Connection): Database connection.
+        db_path (str): Database file the cache directory is named after.
 
     Returns:
-        Dict[str, List[Tuple[str, float]]]: Markov chain representation.
+        MarkovChain: Markov chain with O(1) per-step sampling.
+
+    Raises:
+        click.UsageError: If the database has no services or arcs to learn from.
     """
-    total = sum(weights.values())
-    chain = {}
-    for service, count in weights.items():
-        transitions = [(next_service, next_count / total) for next_service, next_count in weights.items()]
-        chain[service] = transitions
-    return chain
+    try:
+        return load_cached_chain(conn, chain_cache_dir(db_path))[0]
+    except ValueError:
+        raise click.UsageError("no arcs in DB; run ingest first")
 
-def generate_architecture(chain: Dict[str, List[Tuple[str, float]]], start_service: str, length: int) -> List[str]:
+def generate_architecture(chain: MarkovChain, start_service: str, length: int,
+                          rng: Optional[np.random.Generator] = None) -> List[str]:
     """
     Generate a new architecture using the Markov chain.
 
     Args:
-        chain (Dict[str, List[Tuple[str, float]]]): Markov chain.
+        chain (MarkovChain): Markov chain.
         start_service (str): Starting service.
         length (int): Desired length of the architecture.
+        rng (Optional[np.random.Generator]): Random generator.
 
     Returns:
         List[str]: Generated architecture.
     """
-    architecture = [start_service]
-    for _ in range(length - 1):
-        transitions = chain[architecture[-1]]
-        next_service = random.choices([t[0] for t in transitions], weights=[t[1] for t in transitions])[0]
-        architecture.append(next_service)
-    return architecture
+    return chain.walk(start_service, length, rng)
+
+class DefaultGroup(click.Group):
+    """A group that runs its ``analyze`` command when no subcommand is named."""
+
+    def parse_args(self, ctx, args):
+        if args and args[0] not in self.commands and args[0] not in ('--help', '-h'):
+            args.insert(0, 'analyze')
+        return super().parse_args(ctx, args)
+
+@click.group(cls=DefaultGroup)
+def cli():
+    """
+    AWS Architecture Frequency Simulator.
+
+    Running the script with a diagram file and no subcommand is the same as
+    analyze.
+    """
 
-@click.command()
+@cli.command('analyze')
 @click.argument('input_file', type=click.File('r'))
-@click.option('--method', type=click.Choice(['itertools', 'map_reduce', 'pure_python']), default='pure_python', help='Processing method')
+@click.option('--method', type=click.Choice(list(METHODS)), default='pure_python', help='Processing method')
 @click.option('--simulate', is_flag=True, help='Simulate new architecture')
 @click.option('--length', default=5, help='Length of simulated architecture')
-def main(input_file: click.File, method: str, simulate: bool, length: int):
+@click.option('--count', default=1, type=click.IntRange(min=1), help='Number of architectures to simulate')
+@click.option('--seed', type=int, default=None, help='Random seed for reproducible simulations')
+@click.option('--db', default=DEFAULT_DB_PATH, help='Frequency database file')
+def main(input_file: click.File, method: str, simulate: bool, length: int, count: int, seed: Optional[int],
+         db: str):
     """
     Analyze AWS architecture diagram, update service frequency, and optionally simulate new architecture.
 
@@ -177,31 +257,120 @@ def main(input_file: click.File, method: str, simulate: bool, length: int):
         method (str): Processing method to use.
         simulate (bool): Flag to simulate new architecture.
         length (int): Length of simulated architecture.
+        count (int): Number of architectures to simulate.
+        seed (Optional[int]): Random seed.
+        db (str): Frequency database file.
     """
-    conn = init_db()
-    mermaid_diagram = input_file.read()
-    services = parse_mermaid(mermaid_diagram)
+    diagram = mermaid.parse(input_file.read())
+    services = diagram.services()
 
-    if method == 'itertools':
-        frequency = process_itertools(services)
-    elif method == 'map_reduce':
-        frequency = process_map_reduce(services)
-    else:
-        frequency = process_pure_python(services)
+    frequency = METHODS[method](services)
 
-    update_frequency_db(conn, services)
+    # Services, arcs and co-occurring pairs are committed in one transaction.
+    with FrequencyWriter(db) as writer:
+        writer.add_diagram(services, diagram.arcs())
     click.echo("Updated frequency in database:")
     click.echo(json.dumps(frequency, indent=2))
 
     if simulate:
-        weights = get_historical_weights(conn)
-        chain = create_markov_chain(weights)
-        start_service = random.choice(list(weights.keys()))
-        new_architecture = generate_architecture(chain, start_service, length)
-        click.echo("\nSimulated Architecture:")
-        click.echo(" -> ".join(new_architecture))
+        conn = init_db(db)
+        try:
+            chain = load_markov_chain(conn, db)
+        finally:
+            conn.close()
+        rng = np.random.default_rng(seed)
+        if count == 1:
+            start_service = chain.states[chain.sample_initial(rng)]
+            new_architecture = generate_architecture(chain, start_service, length, rng)
+            click.echo("\nSimulated Architecture:")
+            click.echo(" -> ".join(new_architecture))
+        else:
+            click.echo(f"\nSimulated Architectures ({count}):")
+            for walk in chain.simulate(count, length, rng):
+                click.echo(" -> ".join(chain.states[row] for row in walk if row != STOPPED))
+
+@cli.command()
+@click.argument('inputs', nargs=-1, required=True)
+@click.option('--db', default=DEFAULT_DB_PATH, help='Frequency database file')
+@click.option('--batch-size', default=1000, type=click.IntRange(min=1), help='Files aggregated per transaction')
+@click.option('--jobs', '-j', default=1, type=click.IntRange(min=0),
+              help='Parser processes; above 1 (or 0 = all cores) runs the parallel map-reduce ingest')
+def ingest(inputs: Tuple[str, ...], db: str, batch_size: int, jobs: int):
+    """
+    Bulk-ingest Mermaid diagrams from files, directories or globs.
+
+    Files are recorded by content hash, so re-ingesting the same corpus does
+    not double-count. With --jobs, worker processes parse shards of files
+    into partial counts that are merged and written in one transaction.
 
+    Args:
+        inputs (Tuple[str, ...]): Files, directories or glob patterns.
+        db (str): Frequency database file.
+        batch_size (int): Files aggregated per transaction (sequential ingest).
+        jobs (int): Parser processes.
+    """
+    conn = init_db(db)
+    paths = expand_paths(inputs)
+    start = time.perf_counter()
+    if jobs == 1:
+        stats = frequency_db.ingest_paths(conn, paths, batch_size)
+    else:
+        stats = frequency_db.ingest_paths_parallel(conn, paths, jobs)
+    elapsed = time.perf_counter() - start
     conn.close()
+    click.echo(f"Ingested {stats.files} file(s) ({stats.skipped} already ingested), "
+               f"{stats.services} service occurrence(s) and {stats.arcs} arc(s) counted "
+               f"in {elapsed:.2f} s.")
+
+@cli.command('simulate')
+@click.option('--db', default=DEFAULT_DB_PATH, help='Frequency database file')
+@click.option('--count', default=1, type=click.IntRange(min=1), help='Number of architectures to simulate')
+@click.option('--length', default=5, type=click.IntRange(min=1), help='Length of each simulated architecture')
+@click.option('--seed', type=int, default=None, help='Random seed for reproducible simulations')
+@click.option('--start', default=None, help='Fixed starting service (drawn from historical weights if omitted)')
+@click.option('--output', '-o', default='-', help='Output file (default: stdout)')
+@click.option('--format', 'fmt', type=click.Choice(OUTPUT_FORMATS), default='csv', help='Output format')
+@click.option('--chunk-size', default=100_000, type=click.IntRange(min=1), help='Walks generated per chunk')
+def simulate_bulk(db: str, count: int, length: int, seed: Optional[int], start: Optional[str], output: str,
+                  fmt: str, chunk_size: int):
+    """
+    Simulate many architectures at once from the historical frequencies.
+
+    All walks in a chunk advance in lockstep with one vectorized draw per
+    step, and chunks are streamed to the output so memory stays bounded.
+    The npy format stores service indices; their names are written to
+    <output>.states.json.
+
+    Args:
+        db (str): Frequency database file.
+        count (int): Number of architectures to simulate.
+        length (int): Length of each simulated architecture.
+        seed (Optional[int]): Random seed.
+        start (Optional[str]): Fixed starting service.
+        output (str): Output file, or '-' for stdout.
+        fmt (str): Output format: csv, jsonl or npy.
+        chunk_size (int): Walks generated per chunk.
+    """
+    if fmt == 'npy' and output == '-':
+        raise click.UsageError('--format npy needs an --output file')
+    conn = init_db(db)
+    try:
+        chain = load_markov_chain(conn, db)
+    finally:
+        conn.close()
+    if start is not None and start not in chain.index:
+        raise click.BadParameter(f"no historical data for {start!r}", param_hint='--start')
+
+    begin = time.perf_counter()
+    chunks = chain.iter_simulations(count, length, np.random.default_rng(seed), chunk_size, start)
+    if fmt == 'npy':
+        with open(f"{output}.states.json", 'w') as f:
+            json.dump(chain.states, f)
+    with click.open_file(output, 'wb' if fmt == 'npy' else 'w') as out:
+        written = write_walks(chain, chunks, out, fmt, count, length)
+    elapsed = time.perf_counter() - begin
+    click.echo(f"Simulated {written:,} architecture(s) of length {length} in {elapsed:.2f} s "
+               f"({written / elapsed:,.0f} walks/s).", err=True)
 
 if __name__ == "__main__":
-    main()
+    cli()
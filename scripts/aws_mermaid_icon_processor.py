@@ -1,8 +1,11 @@
-import json
-import re
-from typing import Dict
+import glob
+import os
+
 import click
 
+from aws_architecture_decomposition_lab.files import atomic_open
+from aws_architecture_decomposition_lab.icons import add_icons_to_mermaid, iter_icons, load_icons_mapping, run_batch
+
 
 def example() -> None:
     """
@@ -38,51 +41,45 @@ def example() -> None:
     # Print the result
     print(output_diagram)
 
-def load_icons_mapping(file_path: str) -> Dict[str, str]:
-    """Load the AWS icons mapping from a JSON file."""
-    with open(file_path, 'r') as f:
-        return json.load(f)
-
-def add_icons_to_mermaid(mermaid_diagram: str, icons_mapping: Dict[str, str]) -> str:
-    """Add AWS service icons to a Mermaid diagram."""
-    lines = mermaid_diagram.split('\n')
-    modified_lines = []
+@click.command()
+@click.argument('input_path', default='-')
+@click.argument('output_path', default='-')
+@click.option('--icons', default='aws_icons_mapping.json', help='AWS icons mapping file', type=click.Path(exists=True))
+@click.option('--jobs', '-j', default=0, type=click.IntRange(min=0),
+              help='Worker processes for directory/glob input (0 uses every core).')
+@click.option('--all-nodes', is_flag=True, help='Decorate every node definition in place, not just a leading one per line')
+def main(input_path, output_path, icons, jobs, all_nodes):
+    """
+    Process a Mermaid diagram file and add AWS service icons.
 
-    for line in lines:
-        match = re.match(r'^\s*(\w+(?:[:_]\w+)?)\s*\[(.*?)\]', line)
-        if match:
-            full_node_name = match.group(1)
-            node_label = match.group(2)
-            
-            node_parts = re.split(r'[:_]', full_node_name)
-            service_name = node_parts[0].lower()
-            
-            if service_name in icons_mapping:
-                icon_url = icons_mapping[service_name]
-                modified_line = f"{full_node_name}[<img src='{icon_url}' width='48' height='48' /><br>{node_label}]"
-                modified_lines.append(modified_line)
-            else:
-                modified_lines.append(line)
-        else:
-            modified_lines.append(line)
+    Lines are streamed from INPUT_PATH to OUTPUT_PATH, so either may be '-'
+    (the default) to read stdin or write stdout inside a shell pipeline.
 
-    return '\n'.join(modified_lines)
+    If INPUT_PATH is a directory or a glob pattern, every matching .mmd file is
+    decorated into the OUTPUT_PATH directory, loading the mapping once.
 
-@click.command()
-@click.argument('input_file', type=click.File('r'))
-@click.argument('output_file', type=click.File('w'))
-@click.option('--icons', default='aws_icons_mapping.json', help='AWS icons mapping file', type=click.Path(exists=True))
-def main(input_file, output_file, icons):
-    """Process a Mermaid diagram file and add AWS service icons."""
-    click.echo(f"Processing {input_file.name} with icons from {icons}")
-    
-    input_diagram = input_file.read()
+    By default a line starting with a known service node is rewritten as that
+    node with its icon, as the original processor did; --all-nodes decorates
+    every node definition in place and keeps the rest of the line.
+    """
     icons_mapping = load_icons_mapping(icons)
-    
-    output_diagram = add_icons_to_mermaid(input_diagram, icons_mapping)
-    
-    output_file.write(output_diagram)
-    click.echo(f"Processed diagram written to {output_file.name}")
+
+    if os.path.isdir(input_path) or glob.has_magic(input_path):
+        if output_path == '-':
+            raise click.UsageError('OUTPUT_PATH must be a directory when INPUT_PATH is a directory or glob.')
+        try:
+            run_batch([input_path], output_path, icons_mapping, jobs, echo=click.echo, all_nodes=all_nodes)
+        except ValueError as error:
+            raise click.UsageError(str(error))
+        return
+
+    # A file output is written to a temporary file and renamed over the target
+    # once complete, so OUTPUT_PATH may be INPUT_PATH (in-place decoration).
+    output = click.open_file('-', 'w') if output_path == '-' else atomic_open(output_path, 'w')
+    with click.open_file(input_path, 'r') as input_file, output as output_file:
+        click.echo(f"Processing {input_file.name} with icons from {icons}", err=True)
+        output_file.writelines(iter_icons(input_file, icons_mapping, all_nodes))
+    click.echo(f"Processed diagram written to {'<stdout>' if output_path == '-' else output_path}", err=True)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,53 @@
+from collections import Counter
+from itertools import combinations
+
+from aws_architecture_decomposition_lab import analytics, frequency, mermaid
+from aws_architecture_decomposition_lab.corpus import write_corpus
+from aws_architecture_decomposition_lab.files import expand_paths
+from aws_architecture_decomposition_lab.services import SERVICE_NAMES
+
+
+def ingest_corpus(tmp_path, batch_size=5):
+    write_corpus(str(tmp_path / 'corpus'), 25, seed=11, shard_size=0)
+    paths = expand_paths([str(tmp_path / 'corpus')])
+    conn = frequency.connect(str(tmp_path / 'freq.db'))
+    frequency.ingest_paths(conn, paths, batch_size=batch_size)
+    return conn, paths
+
+
+def test_degrees_match_frequencies(tmp_path):
+    conn, _ = ingest_corpus(tmp_path)
+    out_degree, in_degree, out_weight, in_weight = Counter(), Counter(), Counter(), Counter()
+    for source, sink, count in conn.execute('SELECT source_service, sink_service, count FROM frequencies'):
+        out_degree[source] += 1
+        in_degree[sink] += 1
+        out_weight[source] += count
+        in_weight[sink] += count
+    for service in set(out_degree) | set(in_degree):
+        assert analytics.degree(conn, service) == analytics.Degree(
+            service, out_degree[service], in_degree[service], out_weight[service], in_weight[service])
+    assert analytics.degree(conn, 'nonexistent') == analytics.Degree('nonexistent', 0, 0, 0, 0)
+
+
+def test_cooccurrence_matches_brute_force(tmp_path):
+    conn, paths = ingest_corpus(tmp_path)
+    expected = Counter()
+    for path in paths:
+        with open(path) as f:
+            present = {s for s in mermaid.parse(f.read()).services() if s in SERVICE_NAMES}
+        for a, b in combinations(sorted(present), 2):
+            expected[a, b] += 1
+            expected[b, a] += 1
+    service = max(SERVICE_NAMES, key=lambda s: sum(n for (a, _), n in expected.items() if a == s))
+    rows = analytics.cooccurring(conn, service, n=1000)
+    assert {row.other: row.count for row in rows} == {b: n for (a, b), n in expected.items() if a == service}
+    assert [row.count for row in rows] == sorted((row.count for row in rows), reverse=True)
+    assert all(0 < row.jaccard <= 1 for row in rows)
+
+
+def test_top_arcs_ordered(tmp_path):
+    conn, _ = ingest_corpus(tmp_path)
+    arcs = analytics.top_arcs(conn, 5)
+    assert len(arcs) == 5
+    assert [arc.count for arc in arcs] == sorted((arc.count for arc in arcs), reverse=True)
+    assert arcs[0].count == conn.execute('SELECT MAX(count) FROM frequencies').fetchone()[0]
@@ -0,0 +1,69 @@
+import json
+
+from click.testing import CliRunner
+
+from scripts import audit_and_fix_mermaid_diagrams as audit_and_fix
+
+BROKEN = 'graph TD\n    lambda:handler[Handler] --> s3:s3_bucket[Bucket]\n'
+CLEAN = 'graph TD\n    lambda:lambda_fn[Fn]\n'
+
+
+def run(tmp_path, *args):
+    result = CliRunner().invoke(audit_and_fix.audit_and_fix_mermaid_diagrams,
+                                [str(tmp_path / 'in'), '--output-dir', str(tmp_path / 'out'), *args])
+    assert result.exit_code == 0, result.output
+    return result.output
+
+
+def corpus(tmp_path):
+    (tmp_path / 'in').mkdir()
+    (tmp_path / 'in' / 'a.mmd').write_text(BROKEN)
+    (tmp_path / 'in' / 'b.mmd').write_text(CLEAN)
+
+
+def test_unchanged_inputs_are_skipped(tmp_path):
+    corpus(tmp_path)
+    assert '2 diagram(s) processed, 0 unchanged' in run(tmp_path)
+    fixed = (tmp_path / 'out' / 'a.mmd').read_text()
+    assert 'lambda:lambda1[Handler]' in fixed and 's3:s3_bucket[Bucket]' in fixed
+    manifest = json.loads((tmp_path / 'out' / audit_and_fix.MANIFEST_FILE).read_text())
+    assert set(manifest['files']) == {'a.mmd', 'b.mmd'}
+
+    mtime = (tmp_path / 'out' / 'a.mmd').stat().st_mtime_ns
+    assert '0 diagram(s) processed, 2 unchanged' in run(tmp_path)
+    assert (tmp_path / 'out' / 'a.mmd').stat().st_mtime_ns == mtime
+
+
+def test_changed_input_or_rules_invalidate(tmp_path, monkeypatch):
+    corpus(tmp_path)
+    run(tmp_path)
+    (tmp_path / 'in' / 'b.mmd').write_text(CLEAN + '    sqs:queue[Queue]\n')
+    output = run(tmp_path)
+    assert '1 diagram(s) processed, 1 unchanged' in output
+    assert 'sqs:sqs1[Queue]' in (tmp_path / 'out' / 'b.mmd').read_text()
+
+    monkeypatch.setattr(audit_and_fix, 'RULES_REVISION', audit_and_fix.RULES_REVISION + 1)
+    # New rules re-fix everything, but identical outputs are not rewritten.
+    output = run(tmp_path)
+    assert '2 diagram(s) processed, 0 unchanged' in output
+    assert output.count('Fixed diagram unchanged') == 2
+
+
+def test_edited_or_missing_output_is_rewritten(tmp_path):
+    corpus(tmp_path)
+    run(tmp_path)
+    expected = (tmp_path / 'out' / 'a.mmd').read_text()
+    (tmp_path / 'out' / 'a.mmd').write_text(expected[:10])
+    (tmp_path / 'out' / 'b.mmd').unlink()
+    output = run(tmp_path)
+    assert '2 diagram(s) processed, 0 unchanged' in output
+    assert (tmp_path / 'out' / 'a.mmd').read_text() == expected
+    assert (tmp_path / 'out' / 'b.mmd').read_text() == CLEAN
+
+
+def test_force_ignores_the_manifest(tmp_path):
+    corpus(tmp_path)
+    run(tmp_path)
+    output = run(tmp_path, '--force')
+    assert '2 diagram(s) processed, 0 unchanged' in output
+    assert output.count('Fixed diagram unchanged') == 2
@@ -0,0 +1,36 @@
+import pytest
+from click.testing import CliRunner
+
+from scripts.audit_mermaid_diagrams import audit_mermaid_diagrams
+
+CLEAN = 'graph TD\n    lambda:lambda_fn[Fn] --> s3:s3_bucket[Bucket]\n'
+FAILING = 'graph TD\n    lambda:handler[Fn] --> dynamo:orders[Orders DynamoDB table]\n'
+
+
+def audit(directory, *args):
+    return CliRunner().invoke(audit_mermaid_diagrams, [str(directory), *args])
+
+
+@pytest.mark.parametrize('jobs', ['2', '0'])
+def test_parallel_report_matches_serial(tmp_path, jobs):
+    for index in range(12):
+        (tmp_path / f"{index:02d}.mmd").write_text(FAILING if index % 3 == 0 else CLEAN)
+    serial = audit(tmp_path)
+    parallel = audit(tmp_path, '--jobs', jobs)
+    assert serial.exit_code == parallel.exit_code == 1
+    assert parallel.output == serial.output
+    lines = serial.output.splitlines()
+    assert lines[-1] == 'Audited 12 file(s): 4 warning(s) and 8 failure(s).'
+    assert "Suggested fix: dynamodb:orders[Orders DynamoDB table]" in lines
+    # Reports stay in file order.
+    files = [line.split()[-1] for line in lines if line.startswith('All nodes in')]
+    assert files == sorted(files)
+
+
+def test_parallel_clean_run_exits_zero(tmp_path):
+    for index in range(4):
+        (tmp_path / f"{index}.mmd").write_text(CLEAN)
+    serial, parallel = audit(tmp_path), audit(tmp_path, '-j', '2')
+    assert serial.exit_code == parallel.exit_code == 0
+    assert parallel.output == serial.output
+    assert parallel.output.endswith('Audited 4 file(s): 0 warning(s) and 0 failure(s).\n')
@@ -0,0 +1,49 @@
+from click.testing import CliRunner
+
+from aws_architecture_decomposition_lab import mermaid
+from aws_architecture_decomposition_lab.corpus import CorpusConfig, corpus, generate_diagram, write_corpus
+from aws_architecture_decomposition_lab.lint import lint_lines
+from aws_architecture_decomposition_lab.markov import MarkovChain
+from aws_architecture_decomposition_lab.services import VALID_PREFIXES
+
+
+def test_deterministic_under_seed():
+    assert generate_diagram(7, 3) == generate_diagram(7, 3)
+    assert generate_diagram(7, 3) != generate_diagram(8, 3)
+    assert generate_diagram(7, 3) != generate_diagram(7, 4)
+
+
+def test_diagrams_lint_clean_and_connected():
+    config = CorpusConfig(nodes=20, fan_out=3, subgraphs=3)
+    for index in range(50):
+        source = generate_diagram(0, index, config)
+        assert lint_lines(source.splitlines(), f"synthetic-{index}") == []
+        diagram = mermaid.parse(source)
+        assert len(diagram.nodes) == 20
+        assert len(diagram.edges) >= 19
+
+
+def test_invalid_share():
+    clean = [mermaid.parse(generate_diagram(0, i, CorpusConfig(invalid_share=0))) for i in range(20)]
+    assert all(node.prefix in VALID_PREFIXES for d in clean for node in d.nodes.values())
+    broken = mermaid.parse(generate_diagram(0, 0, CorpusConfig(invalid_share=1)))
+    assert not any(node.prefix in VALID_PREFIXES for node in broken.nodes.values())
+
+
+def test_learned_chain_drives_services():
+    chain = MarkovChain.from_arcs({('apigateway', 'lambda'): 5, ('lambda', 'dynamodb'): 5}, {'apigateway': 1})
+    diagram = mermaid.parse(generate_diagram(1, 0, CorpusConfig(invalid_share=0), chain))
+    assert set(diagram.services()) <= {'apigateway', 'lambda', 'dynamodb'}
+
+
+def test_write_corpus_is_idempotent(tmp_path):
+    first = write_corpus(str(tmp_path), 30, seed=3, shard_size=10)
+    assert first.files == first.changed == 30
+    assert len(list(tmp_path.glob('*/*.mmd'))) == 30
+    assert write_corpus(str(tmp_path), 30, seed=3, shard_size=10).changed == 0
+
+
+def test_learned_weights_need_an_ingested_db(tmp_path):
+    result = CliRunner().invoke(corpus, [str(tmp_path / 'out'), '-n', '2', '--weights', 'learned',
+                                         '--db', str(tmp_path / 'empty.db')])
+    assert result.exit_code == 2 and 'run ingest first' in result.output
@@ -0,0 +1,53 @@
+import os
+import random
+from functools import lru_cache
+
+import numpy as np
+import pytest
+
+from aws_architecture_decomposition_lab.counting import ENGINES, _accumulate, count_map_reduce
+from aws_architecture_decomposition_lab.services import SERVICE_NAMES
+
+# Sizes 10**2 .. 10**7; COUNTING_MAX_SIZE caps the default run.
+MAX_SIZE = int(os.environ.get('COUNTING_MAX_SIZE', 10**5))
+SIZES = [10**k for k in range(2, 8) if 10**k <= MAX_SIZE]
+
+
+@lru_cache(maxsize=None)
+def synthetic_services(size, unknown_share=0.1, seed=0):
+    """A service list over the known vocabulary with a share of unknown names."""
+    rng = random.Random(seed)
+    names = sorted(SERVICE_NAMES) + [f"unknown{i}" for i in range(int(len(SERVICE_NAMES) * unknown_share) + 1)]
+    return rng.choices(names, k=size)
+
+
+@pytest.mark.parametrize('size', SIZES)
+def test_engines_agree(size):
+    services = synthetic_services(size)
+    expected = ENGINES['pure_python'](services)
+    assert sum(expected.values()) < size
+    assert set(expected) <= set(SERVICE_NAMES)
+    for name, engine in ENGINES.items():
+        assert engine(services) == expected, name
+
+
+def test_numpy_accepts_arrays():
+    services = synthetic_services(1000)
+    assert ENGINES['numpy'](np.array(services)) == ENGINES['itertools'](services)
+
+
+@pytest.mark.parametrize('engine', sorted(ENGINES))
+def test_empty_and_unknown(engine):
+    assert ENGINES[engine]([]) == {}
+    assert ENGINES[engine](['nope', 'also-nope']) == {}
+
+
+def test_map_reduce_folds_into_one_accumulator():
+    # Each step must update and return the same dict; copying it per element
+    # made the fold quadratic.
+    acc = {}
+    assert _accumulate(acc, ('lambda', 2)) is acc
+    assert _accumulate(acc, ('lambda', 3)) is acc
+    assert acc == {'lambda': 5}
+    services = synthetic_services(10**4)
+    assert count_map_reduce(services) == ENGINES['pure_python'](services)
@@ -0,0 +1,39 @@
+"""
+Scaling curves for the counting engines (requires pytest-benchmark).
+
+These are marked ``bench`` and deselected by a plain ``pytest`` run:
+
+    COUNTING_MAX_SIZE=10000000 pytest -m bench tests/test_counting_benchmark.py
+
+Each engine is its own benchmark group, so the report lists its time per
+input size; ``extra_info['ns_per_item']`` normalises the curve.
+"""
+
+import numpy as np
+import pytest
+
+from aws_architecture_decomposition_lab.counting import ENGINES
+from tests.test_counting import SIZES, synthetic_services
+
+pytest.importorskip('pytest_benchmark')
+
+pytestmark = pytest.mark.bench
+
+
+@pytest.mark.parametrize('size', SIZES)
+@pytest.mark.parametrize('engine', sorted(ENGINES))
+def test_engine_scaling(benchmark, engine, size):
+    services = synthetic_services(size)
+    benchmark.group = engine
+    result = benchmark(ENGINES[engine], services)
+    if benchmark.stats:
+        benchmark.extra_info['ns_per_item'] = benchmark.stats.stats.mean / size * 1e9
+    assert result == ENGINES['pure_python'](services)
+
+
+@pytest.mark.parametrize('size', SIZES)
+def test_numpy_array_input_scaling(benchmark, size):
+    services = synthetic_services(size)
+    array = np.array(services)
+    benchmark.group = 'numpy (array input)'
+    assert benchmark(ENGINES['numpy'], array) == ENGINES['pure_python'](services)
@@ -0,0 +1,100 @@
+import shutil
+from collections import Counter
+
+from aws_architecture_decomposition_lab import frequency
+from aws_architecture_decomposition_lab.corpus import CorpusConfig, write_corpus
+from aws_architecture_decomposition_lab.files import expand_paths
+
+
+def snapshot(conn):
+    return (sorted(conn.execute('SELECT service, frequency FROM service_frequency')),
+            sorted(conn.execute('SELECT source_service, sink_service, count FROM frequencies')),
+            sorted(conn.execute('SELECT sha256, path FROM ingested_files')),
+            sorted(conn.execute('SELECT * FROM service_degree')),
+            sorted(conn.execute('SELECT * FROM service_cooccurrence')))
+
+
+def make_corpus(tmp_path):
+    corpus = tmp_path / 'corpus'
+    write_corpus(str(corpus), 60, seed=5, config=CorpusConfig(invalid_share=0.2), shard_size=20)
+    # A duplicate of an earlier file must only be counted once.
+    shutil.copy(corpus / '0000' / 'synthetic-0000001.mmd', corpus / '0002' / 'zz-duplicate.mmd')
+    return expand_paths([str(corpus)])
+
+
+def test_parallel_ingest_matches_sequential(tmp_path):
+    paths = make_corpus(tmp_path)
+    sequential = frequency.connect(str(tmp_path / 'sequential.db'))
+    parallel = frequency.connect(str(tmp_path / 'parallel.db'))
+
+    expected = frequency.ingest_paths(sequential, paths, batch_size=7)
+    stats = frequency.ingest_paths_parallel(parallel, paths, jobs=2, shard_size=8)
+    assert stats == expected
+    assert stats.files == 60 and stats.skipped == 1
+    assert snapshot(parallel) == snapshot(sequential)
+
+    # Re-ingesting skips everything on both paths.
+    assert frequency.ingest_paths_parallel(parallel, paths, jobs=2).files == 0
+    assert snapshot(parallel) == snapshot(sequential)
+
+
+def test_tree_merge():
+    partials = [Counter({'s3': i, 'lambda': 1}) for i in range(1, 6)]
+    assert frequency.tree_merge(partials) == Counter({'s3': 15, 'lambda': 5})
+    assert frequency.tree_merge([]) == Counter()
+
+
+def test_concurrent_ingest_counts_each_file_once(tmp_path, monkeypatch):
+    paths = make_corpus(tmp_path)
+    db = str(tmp_path / 'shared.db')
+    first, second = frequency.connect(db), frequency.connect(db)
+    reference = frequency.connect(str(tmp_path / 'reference.db'))
+    frequency.ingest_paths(reference, paths)
+
+    # Both ingests start from the same (empty) view of ingested_files; the
+    # second one commits after the first and must not count anything twice.
+    monkeypatch.setattr(frequency, 'ingested_hashes', lambda conn: set())
+    assert frequency.ingest_paths(first, paths[:40], batch_size=16).files == 40
+    stats = frequency.ingest_paths(second, paths, batch_size=16)
+    assert (stats.files, stats.skipped) == (20, 41)
+    parallel = frequency.ingest_paths_parallel(first, paths, jobs=2, shard_size=8)
+    assert (parallel.files, parallel.skipped, parallel.services) == (0, 61, 0)
+    assert snapshot(first) == snapshot(reference)
+
+
+def arcs(conn):
+    return dict(((source, sink), count) for source, sink, count in
+                conn.execute('SELECT source_service, sink_service, count FROM frequencies'))
+
+
+def test_arc_direction_and_edge_forms(tmp_path):
+    path = tmp_path / 'arrows.mmd'
+    path.write_text('graph TD\n'
+                    '    apigateway:api[API] -->|invoke| lambda:fn[Fn] --> s3:b[Bucket]\n'
+                    '    sqs:q[Queue] <-- lambda:fn\n'
+                    '    sns:t[Topic] <--> lambda:fn\n'
+                    '    lambda:fn -- reads --> dynamodb:t[Table]\n'
+                    '    lambda:fn --> plain[Not a service]\n')
+    conn = frequency.connect(str(tmp_path / 'freq.db'))
+    frequency.ingest_paths(conn, [str(path)])
+    assert arcs(conn) == {('apigateway', 'lambda'): 1, ('lambda', 's3'): 1, ('lambda', 'sqs'): 1,
+                          ('sns', 'lambda'): 1, ('lambda', 'sns'): 1, ('lambda', 'dynamodb'): 1}
+
+
+def test_arc_counts_accumulate_across_ingests(tmp_path):
+    conn = frequency.connect(str(tmp_path / 'freq.db'))
+    for index, extra in enumerate(['', '    lambda:fn --> s3:b\n', '    s3:b <-- lambda:fn\n']):
+        path = tmp_path / f"{index}.mmd"
+        path.write_text(f"graph TD\n    lambda:fn[Fn] --> s3:b[Bucket]\n{extra}")
+        version = frequency.frequency_version(conn)
+        assert frequency.ingest_paths(conn, [str(path)]).files == 1
+        assert frequency.frequency_version(conn) != version
+    assert arcs(conn) == {('lambda', 's3'): 5}
+
+    with conn:
+        frequency.upsert_arc_counts(conn, Counter({('lambda', 's3'): 2, ('s3', 'lambda'): 1}))
+    assert arcs(conn) == {('lambda', 's3'): 7, ('s3', 'lambda'): 1}
+    # The top-N arc query walks the count index instead of sorting the table.
+    plan = ' '.join(row[-1] for row in conn.execute(
+        'EXPLAIN QUERY PLAN SELECT source_service, sink_service, count FROM frequencies ORDER BY count DESC LIMIT 10'))
+    assert 'idx_frequencies_count' in plan and 'TEMP B-TREE' not in plan
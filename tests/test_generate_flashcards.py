@@ -0,0 +1,348 @@
+import importlib.util
+import json
+import os
+import socket
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+SCRIPT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'aws-reference-diagrams')
+
+
+def _import_flashcards():
+    spec = importlib.util.spec_from_file_location('generate_flashcards',
+                                                  os.path.join(SCRIPT_DIR, 'generate_flashcards.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope='module')
+def flashcards():
+    return _import_flashcards()
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, pages, failures=None):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.pages = pages
+        # page -> number of 503 responses to send before succeeding
+        self.failures = dict(failures or {})
+        self.requests = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/items?page={{page_num}}"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        page = int(parse_qs(urlparse(self.path).query)['page'][0])
+        with self.server.lock:
+            self.server.requests.append(page)
+            failing = self.server.failures.get(page, 0)
+            if failing:
+                self.server.failures[page] = failing - 1
+        if failing:
+            self.send_response(503)
+            self.end_headers()
+            return
+        body = json.dumps({'items': self.server.pages.get(page, [])}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def stub_server():
+    servers = []
+
+    def start(pages, failures=None):
+        server = StubServer(pages, failures)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+class DiagramHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        body, etag = server.body, f'"{len(server.body)}-{server.version}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        start = 0
+        if self.headers.get('Range') and self.headers.get('If-Range') == etag:
+            start = int(self.headers['Range'].split('=')[1].rstrip('-'))
+        if start >= len(body):
+            self.send_response(416)
+            self.send_header('Content-Range', f"bytes */{len(body)}")
+            self.end_headers()
+            return
+        self.send_response(206 if start else 200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body) - start))
+        if start:
+            self.send_header('Content-Range', f"bytes {start}-{len(body) - 1}/{len(body)}")
+        self.end_headers()
+        if server.truncate:
+            # Simulate a dropped connection halfway through the body.
+            server.truncate = False
+            self.wfile.write(body[start:len(body) // 2])
+            self.wfile.flush()
+            self.connection.shutdown(socket.SHUT_RDWR)
+            return
+        self.wfile.write(body[start:])
+
+
+@pytest.fixture
+def diagram_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), DiagramHandler)
+    server.daemon_threads = True
+    server.body, server.version, server.truncate, server.requests = os.urandom(200_000), 1, False, []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/diagram.pdf"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_download_revalidates_and_resumes(flashcards, diagram_server, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    server, url = diagram_server, diagram_server.url
+    path = flashcards.download_diagram(url, 'arch')
+    assert open(path, 'rb').read() == server.body
+    # Without refresh nothing is requested; a refresh of an unchanged diagram is a 304.
+    flashcards.download_diagram(url, 'arch')
+    assert len(server.requests) == 1
+    flashcards.download_diagram(url, 'arch', refresh=True)
+    assert server.requests[-1]['If-None-Match'] == '"200000-1"'
+    assert open(path, 'rb').read() == server.body
+
+    # A changed diagram is downloaded again; the first attempt is cut off and then resumed.
+    server.version, server.body, server.truncate = 2, os.urandom(150_000), True
+    assert flashcards.download_diagram(url, 'arch', refresh=True) == path
+    received = os.path.getsize(path + '.part')
+    assert 0 < received <= 75_000
+    flashcards.download_diagram(url, 'arch', refresh=True)
+    assert server.requests[-1]['Range'] == f"bytes={received}-"
+    assert open(path, 'rb').read() == server.body
+    assert not os.path.exists(path + '.part')
+
+
+def test_unresumable_partial_is_downloaded_again(flashcards, diagram_server, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    server, url = diagram_server, diagram_server.url
+    path = flashcards.download_diagram(url, 'arch')
+    # A partial that is already complete (say the rename was interrupted) gets a 416.
+    os.replace(path, path + '.part')
+    os.replace(path + '.http.json', path + '.part.http.json')
+    assert flashcards.download_diagram(url, 'arch') == path
+    assert server.requests[-2]['Range'] == 'bytes=200000-'
+    assert 'Range' not in server.requests[-1]
+    assert open(path, 'rb').read() == server.body
+    assert not os.path.exists(path + '.part') and not os.path.exists(path + '.part.http.json')
+
+
+def test_diagram_pipeline_renders_stale_images_only(flashcards, diagram_server, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    rendered = []
+
+    def rasterize(pdf_path, image_path):
+        rendered.append(image_path)
+        with open(pdf_path, 'rb') as src, open(image_path, 'wb') as dst:
+            dst.write(src.read()[:16])
+        return True
+
+    url = diagram_server.url
+    diagrams = [(url, 'a'), (url, 'b'), (url, 'a')]
+    links = list(flashcards.process_diagrams(diagrams, workers=2, jobs=1, rasterize=rasterize))
+    assert links == ['[[file:diagrams/a.png]]', '[[file:diagrams/b.png]]', '[[file:diagrams/a.png]]']
+    assert sorted(rendered) == ['diagrams/a.png', 'diagrams/b.png']
+
+    # Touching a PDF without changing it does not re-render its image.
+    later = os.path.getmtime('diagrams/a.png') + 10
+    os.utime('diagrams/a.pdf', (later, later))
+    list(flashcards.process_diagrams(diagrams, workers=2, jobs=1, rasterize=rasterize))
+    assert len(rendered) == 2
+
+    # A refreshed, changed PDF does.
+    diagram_server.version, diagram_server.body = 2, os.urandom(1000)
+    list(flashcards.process_diagrams(diagrams[:1], refresh=True, jobs=1, rasterize=rasterize))
+    assert rendered[2:] == ['diagrams/a.png']
+    assert open('diagrams/a.png', 'rb').read() == diagram_server.body[:16]
+
+
+def copy_head(pdf_path, image_path):
+    """Rasterizer stub that child processes can import by name."""
+    with open(pdf_path, 'rb') as src, open(image_path, 'wb') as dst:
+        dst.write(src.read()[:16])
+    return True
+
+
+def test_diagram_pipeline_rasterizes_on_a_process_pool(flashcards, diagram_server, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # Workers unpickle the pipeline's functions by module name, as they would
+    # for the script run as __main__.
+    monkeypatch.setitem(sys.modules, flashcards.__name__, flashcards)
+    url = diagram_server.url
+    diagrams = [(url, name) for name in 'abcd'] + [(url, 'a')]
+    links = list(flashcards.process_diagrams(diagrams, workers=2, jobs=2, rasterize=copy_head))
+    assert links == [f"[[file:diagrams/{name}.png]]" for name in 'abcda']
+    for name in 'abcd':
+        assert open(f"diagrams/{name}.png", 'rb').read() == diagram_server.body[:16]
+        assert open(f"diagrams/{name}.png.sha256").read() == flashcards.file_sha256(f"diagrams/{name}.pdf")
+
+
+def test_cards_render_as_their_diagrams_arrive(flashcards):
+    events = []
+
+    class Deck:
+        def write(self, text):
+            if text.startswith('**'):
+                events.append('card')
+
+    def links():
+        for name in ('a', 'b'):
+            events.append(f"link {name}")
+            yield f"[[file:diagrams/{name}.png]]"
+
+    items = [{'docTitle': name, 'tags': ':drill:', 'id': name, 'name': name, 'dateCreated': '',
+              'primaryURL': f"https://example.com/{name}.pdf", 'description': ''} for name in 'ab']
+    flashcards.write_cards(Deck(), flashcards.card_entries(items, links()), {})
+    assert events == ['link a', 'card', 'link b', 'card']
+
+
+def test_fetch_pages_stops_at_first_empty_page(flashcards, stub_server):
+    pages = {page: [{'item': {'id': f"p{page}-{i}"}} for i in range(3)] for page in range(1, 6)}
+    server = stub_server(pages, failures={2: 2})
+    fetched = flashcards.fetch_pages(40, workers=3, url=server.url, backoff=0.01)
+    assert [page for page, _ in fetched] == [1, 2, 3, 4, 5]
+    assert fetched[1][1]['items'] == pages[2]
+    # Page 2 was retried after its 503s; nothing far past the end was requested.
+    assert server.requests.count(2) == 3
+    assert max(server.requests) <= 6 + 3
+
+
+def test_fetch_json_data_gives_up(flashcards, stub_server):
+    server = stub_server({1: [{}]}, failures={1: 5})
+    assert flashcards.fetch_json_data(1, url=server.url, retries=2, backoff=0.01) is None
+    assert server.requests == [1, 1, 1]
+    assert flashcards.fetch_pages(40, workers=2, url=server.url, retries=0) == []
+
+
+def _write_page(items, page=1):
+    data = {'items': [{'item': {'id': item_id, 'name': f"arch-{item_id}", 'dateCreated': '2024-01-01',
+                                'additionalFields': {'docTitle': title, 'description': '<p>About</p>',
+                                                     'primaryURL': f"https://example.com/{item_id}.pdf"}},
+                       'tags': [{'id': 'GLOBAL#tech-category#analytics'}]} for item_id, title in items]}
+    with open(f"reference-architecture-diagrams-p{page}.json", 'w') as f:
+        json.dump(data, f)
+
+
+def test_incremental_deck_build(flashcards, tmp_path, monkeypatch):
+    from click.testing import CliRunner
+
+    monkeypatch.chdir(tmp_path)
+    runner = CliRunner()
+    _write_page([('a', 'Alpha'), ('b', 'Beta'), ('c', 'Gamma')])
+    result = runner.invoke(flashcards.generate_flashcards, [])
+    assert 'Rendered 3 new or changed card(s), reused 0' in result.output
+    deck = open(flashcards.output_file).read()
+    assert deck.index('Alpha') < deck.index('Beta') < deck.index('Gamma')
+
+    result = runner.invoke(flashcards.generate_flashcards, [])
+    assert 'Rendered 0 new or changed card(s), reused 3' in result.output
+    assert 'unchanged in' in result.output
+
+    _write_page([('a', 'Alpha'), ('b', 'Beta v2'), ('c', 'Gamma'), ('d', 'Delta')])
+    result = runner.invoke(flashcards.generate_flashcards, [])
+    assert 'Rendered 2 new or changed card(s), reused 2' in result.output
+    deck = open(flashcards.output_file).read()
+    assert 'Beta v2' in deck and deck.index('Alpha') < deck.index('Beta v2') < deck.index('Gamma') < deck.index('Delta')
+    assert not os.path.exists(flashcards.output_file + '.tmp')
+
+    result = runner.invoke(flashcards.generate_flashcards, ['--rebuild'])
+    assert 'Rendered 4 new or changed card(s), reused 0' in result.output
+    assert open(flashcards.output_file).read() == deck
+
+
+def test_templates_load_lazily(tmp_path, monkeypatch):
+    from click.testing import CliRunner
+
+    monkeypatch.chdir(tmp_path)
+    module = _import_flashcards()
+    # Importing from another directory compiles nothing.
+    assert module.load_template.cache_info().currsize == 0
+    _write_page([('a', 'Alpha')])
+    result = CliRunner().invoke(module.generate_flashcards, [])
+    assert result.exit_code == 0
+    loaded = {name for name in (module.remote_template_file, module.local_template_file,
+                                module.ai_enhanced_template_file) if name in _cached_names(module)}
+    assert loaded == {module.remote_template_file}
+
+    # Without a provider to fill the ai_generated_* fields, --ai-generate keeps the standard template.
+    result = CliRunner().invoke(module.generate_flashcards, ['--ai-generate', '--ai-provider', 'claude'])
+    assert 'No claude integration is available yet' in result.output
+    assert 'reused 1' in result.output
+    assert module.ai_enhanced_template_file not in _cached_names(module)
+
+
+def test_ai_fields_select_the_enhanced_template(flashcards, tmp_path, monkeypatch):
+    from click.testing import CliRunner
+
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('diagrams')
+    open('diagrams/arch-a.png', 'wb').close()
+    _write_page([('a', 'Alpha'), ('b', 'Beta')])
+    load_items = flashcards.load_items
+
+    def with_summary(directory):
+        for item in load_items(directory):
+            if item['id'] == 'a':
+                item.update(ai_generated_summary='A summary', ai_generated_core_technologies='- S3',
+                            ai_generated_mermaid_diagram='graph TD')
+            yield item
+
+    monkeypatch.setattr(flashcards, 'load_items', with_summary)
+    monkeypatch.setattr(flashcards, 'process_diagrams', lambda diagrams, **kwargs: iter(
+        flashcards.diagram_link(name) for _, name in diagrams))
+    # Without --ai-generate the fields are ignored.
+    result = CliRunner().invoke(flashcards.generate_flashcards, ['--local-pdf'])
+    assert result.exit_code == 0, result.output
+    assert 'A summary' not in open(flashcards.output_file).read()
+
+    result = CliRunner().invoke(flashcards.generate_flashcards, ['--local-pdf', '--ai-generate'])
+    assert result.exit_code == 0, result.output
+    assert 'Rendered 1 new or changed card(s), reused 1' in result.output
+    deck = open(flashcards.output_file).read()
+    alpha, beta = deck.split('** Beta')
+    assert 'A summary' in alpha and 'Original description: About' in alpha
+    assert '[[file:diagrams/arch-a.png]]' in alpha and '[[[[' not in alpha
+    assert 'Original description' not in beta
+
+
+def _cached_names(module):
+    environment = module.template_environment()
+    return {name for (_, name) in environment.cache.keys()} if environment.cache else set()
@@ -0,0 +1,65 @@
+import os
+
+import numpy as np
+
+from aws_architecture_decomposition_lab.corpus import write_corpus
+from aws_architecture_decomposition_lab.files import expand_paths
+from aws_architecture_decomposition_lab.graph import GraphStore
+
+DIAGRAMS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'diagrams')
+
+CHAIN = '''graph TD
+    apigateway:api[API] --> lambda:fn[Handler]
+    lambda:fn --> sqs:queue[Jobs]
+    sqs:queue --> lambda:worker[Worker]
+    lambda:worker --> dynamodb:table[Orders]
+    lambda:worker <--> s3:bucket[Archive]
+'''
+
+
+def _store(tmp_path, text):
+    path = tmp_path / 'chain.mmd'
+    path.write_text(text)
+    return GraphStore.build([str(path)])
+
+
+def test_csr_and_service_queries(tmp_path):
+    store = _store(tmp_path, CHAIN)
+    assert len(store.nodes) == 6
+    # The bidirectional arrow contributes both directions.
+    assert len(store.indices) == 6
+    assert np.array_equal(np.diff(store.rindptr), np.bincount(store.indices, minlength=6))
+    assert store.shortest_path('apigateway', 'dynamodb') == ['apigateway', 'lambda', 'dynamodb']
+    assert not store.reachable('dynamodb', 'apigateway')
+    assert store.service_degrees()['lambda'] == (3, 3)
+    betweenness = store.betweenness()
+    assert max(betweenness, key=betweenness.get) == 'lambda'
+    assert betweenness['apigateway'] == 0.0
+
+
+def test_cycles(tmp_path):
+    cycles = _store(tmp_path, CHAIN).cycles()
+    assert [[ref.node for ref in cycle] for cycle in cycles] == [['lambda:worker', 's3:bucket']]
+
+
+def test_orphans_in_reference_diagram():
+    store = GraphStore.build([os.path.join(DIAGRAMS, 'netflix_like.mmd')])
+    orphans = [ref.node for ref in store.orphans()]
+    assert 'AnalyticsService' in orphans
+    # Entry points of the main flow have no inbound edges but are not orphans.
+    sources = [ref.node for ref in store.sources()]
+    assert 'User' in sources and 'User' not in orphans
+
+
+def test_save_load_round_trip(tmp_path):
+    write_corpus(str(tmp_path / 'corpus'), 30, seed=4, shard_size=0)
+    store = GraphStore.build(expand_paths([str(tmp_path / 'corpus')]))
+    store.save(str(tmp_path / 'store'))
+    store.save(str(tmp_path / 'store'))
+    loaded = GraphStore.load(str(tmp_path / 'store'))
+    assert isinstance(loaded.indices, np.memmap)
+    assert loaded.files == store.files and loaded.services == store.services
+    assert np.array_equal(loaded.service_weights, store.service_weights)
+    # Generated diagrams are connected and acyclic.
+    assert loaded.orphans() == [] and loaded.cycles() == []
+    assert loaded.betweenness() == store.betweenness()
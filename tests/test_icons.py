@@ -0,0 +1,114 @@
+import glob
+import os
+import re
+
+import pytest
+from click.testing import CliRunner
+
+from aws_architecture_decomposition_lab.icons import (add_icons_to_mermaid, decorate_file, iter_icons,
+                                                      load_icons_mapping, run_batch)
+from scripts.aws_mermaid_icon_processor import main
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ICONS = os.path.join(ROOT, 'aws_icons_mapping.json')
+CORPUS = sorted(glob.glob(os.path.join(ROOT, '**', '*.mmd'), recursive=True))
+
+DIAGRAM = '''graph TD
+    apigateway:api[API] --> lambda:fn[Handler]
+    lambda:fn --> s3:bucket[Archive]
+'''
+
+
+def test_decorate_in_place(tmp_path):
+    path = tmp_path / 'arch.mmd'
+    path.write_text(DIAGRAM)
+    result = CliRunner().invoke(main, [str(path), str(path), '--icons', ICONS, '--all-nodes'])
+    assert result.exit_code == 0, result.output
+    decorated = path.read_text()
+    assert decorated.count("<img src=") == 3
+    assert decorated.splitlines()[0] == 'graph TD'
+    assert [p.name for p in tmp_path.iterdir()] == ['arch.mmd']
+
+
+def _corpus(root):
+    for name in ('a', 'b'):
+        (root / f"{name}.mmd").write_text(DIAGRAM)
+    return {path.name: path.read_text() for path in root.iterdir()}
+
+
+def test_batch_refuses_output_dir_over_inputs(tmp_path):
+    originals = _corpus(tmp_path)
+    for output_dir in (tmp_path, tmp_path / '..' / tmp_path.name):
+        with pytest.raises(ValueError, match='contains the input'):
+            run_batch([str(tmp_path)], str(output_dir), load_icons_mapping(ICONS), jobs=1, echo=lambda line: None)
+    assert {path.name: path.read_text() for path in tmp_path.iterdir()} == originals
+    result = CliRunner().invoke(main, [str(tmp_path), str(tmp_path), '--icons', ICONS])
+    assert result.exit_code == 2 and 'contains the input' in result.output
+
+
+def test_batch_refuses_basename_collisions(tmp_path):
+    for directory in ('one', 'two'):
+        (tmp_path / directory).mkdir()
+        _corpus(tmp_path / directory)
+    with pytest.raises(ValueError, match='would both be written'):
+        run_batch([str(tmp_path / 'one'), str(tmp_path / 'two')], str(tmp_path / 'out'), {}, jobs=1)
+    assert not (tmp_path / 'out').exists()
+
+
+def test_batch_decorates_into_separate_dir(tmp_path):
+    (tmp_path / 'in').mkdir()
+    _corpus(tmp_path / 'in')
+    results = run_batch([str(tmp_path / 'in')], str(tmp_path / 'out'), load_icons_mapping(ICONS), jobs=1,
+                        echo=lambda line: None, all_nodes=True)
+    assert [os.path.basename(result.output_path) for result in results] == ['a.mmd', 'b.mmd']
+    assert (tmp_path / 'out' / 'a.mmd').read_text().count('<img src=') == 3
+
+
+def baseline_add_icons_to_mermaid(mermaid_diagram, icons_mapping):
+    """The original processor's transform, verbatim."""
+    lines = mermaid_diagram.split('\n')
+    modified_lines = []
+
+    for line in lines:
+        match = re.match(r'^\s*(\w+(?:[:_]\w+)?)\s*\[(.*?)\]', line)
+        if match:
+            full_node_name = match.group(1)
+            node_label = match.group(2)
+
+            node_parts = re.split(r'[:_]', full_node_name)
+            service_name = node_parts[0].lower()
+
+            if service_name in icons_mapping:
+                icon_url = icons_mapping[service_name]
+                modified_line = f"{full_node_name}[<img src='{icon_url}' width='48' height='48' /><br>{node_label}]"
+                modified_lines.append(modified_line)
+            else:
+                modified_lines.append(line)
+        else:
+            modified_lines.append(line)
+
+    return '\n'.join(modified_lines)
+
+
+@pytest.mark.parametrize('path', CORPUS, ids=lambda path: os.path.relpath(path, ROOT))
+def test_default_output_matches_the_original_processor(path, tmp_path):
+    mapping = load_icons_mapping(ICONS)
+    with open(path) as f:
+        text = f.read()
+    expected = baseline_add_icons_to_mermaid(text, mapping)
+    assert add_icons_to_mermaid(text, mapping) == expected
+    with open(path) as f:
+        assert ''.join(iter_icons(f, mapping)) == expected
+    decorate_file(path, str(tmp_path / 'out.mmd'), mapping)
+    assert (tmp_path / 'out.mmd').read_text() == expected
+
+
+def test_all_nodes_keeps_indentation_and_edges():
+    mapping = load_icons_mapping(ICONS)
+    line = "    apigateway:api[API] --> S3[Amazon S3]\n"
+    icon = f"<img src='{mapping['apigateway']}' width='48' height='48' /><br>"
+    # The original rewrite drops the indentation and everything after the first node.
+    assert add_icons_to_mermaid(line, mapping) == f"apigateway:api[{icon}API]\n"
+    decorated = add_icons_to_mermaid(line, mapping, all_nodes=True)
+    assert decorated.startswith('    apigateway:api[') and decorated.count('<img src=') == 2
+    assert ' --> ' in decorated and decorated.endswith('\n')
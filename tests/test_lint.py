@@ -0,0 +1,74 @@
+import pytest
+from click.testing import CliRunner
+
+from aws_architecture_decomposition_lab.lint import Diagnostic, lint, lint_lines
+
+
+def diagnose(source):
+    return [(d.line, d.col, d.message) for d in lint_lines(source.splitlines(), 'test.mmd')]
+
+
+@pytest.mark.parametrize('statement', [
+    'apigateway:api[API] --> lambda:fn[(Handler)]',
+    'user([User]) -->|request| cloudfront:cdn((CDN))',
+    'A[L]:::cls',
+    'K --> L:::cls',
+    'A:::hot & B --> C[Sink]:::cold',
+    'A -. label .-> B',
+    'A -. label .- B',
+    'A -.-> B',
+    'A ~~~ B',
+    'A -- text --> B',
+    'A == text ==> B',
+    'A <--> B',
+    'A --o B --x C',
+    'classDef aws fill:#FF9900',
+    'class A,B aws',
+    'style A fill:#f9f',
+    '%% a comment',
+])
+def test_accepted_statements(statement):
+    assert diagnose(f"graph TD\n    {statement}\n") == []
+
+
+def test_accepted_subgraphs():
+    assert diagnose('flowchart LR\n    subgraph vpc [VPC]\n        subgraph "Private subnet"\n'
+                    '            ec2:app[App]\n        end\n    end\n') == []
+
+
+@pytest.mark.parametrize('source, expected', [
+    ('', (1, 1, 'empty diagram')),
+    ('%% only a comment\n', (1, 1, 'empty diagram')),
+    ('A --> B\n', (1, 1, "expected 'graph' or 'flowchart' header")),
+    ('graph TD\ngraph LR\n', (2, 1, 'duplicate diagram header (first on line 1)')),
+    ('graph sideways\n', (1, 1, "invalid diagram header 'graph sideways'")),
+    ('graph TD\n    subgraph\n    end\n', (2, 5, 'subgraph requires an id or title')),
+    ('graph TD\n<<<<<<< HEAD\n', (2, 1, 'merge conflict marker')),
+    ('graph TD\n    --> B\n', (2, 5, 'expected a node id')),
+    ('graph TD\n    A --> \n', (2, 10, 'expected a node after link')),
+    ('graph TD\n    A[open --> B\n', (2, 6, "unterminated node shape starting with '['")),
+    ('graph TD\n    A -->|label B\n', (2, 10, 'unterminated edge label')),
+    ('graph TD\n    A B\n', (2, 7, "unexpected text 'B'")),
+    ('graph TD\n    end\n', (2, 5, "'end' without a matching subgraph")),
+    ('graph TD\n    subgraph vpc [VPC]\n', (2, 1, "subgraph 'vpc' is never closed")),
+])
+def test_diagnostics(source, expected):
+    assert diagnose(source) == [expected]
+
+
+def test_diagnostics_are_ordered_and_formatted():
+    diagnostics = lint_lines(['graph TD\n', '    end\n', '    A B\n'], 'x.mmd')
+    assert [(d.line, d.col) for d in diagnostics] == [(2, 5), (3, 7)]
+    assert str(diagnostics[1]) == "x.mmd:3:7: error: unexpected text 'B'"
+    assert isinstance(diagnostics[0], Diagnostic)
+
+
+def test_lint_command_exit_status(tmp_path):
+    (tmp_path / 'good.mmd').write_text('graph TD\n    A --> B\n')
+    result = CliRunner().invoke(lint, [str(tmp_path / 'good.mmd')])
+    assert result.exit_code == 0 and 'Linted 1 file(s)' in result.output
+
+    (tmp_path / 'bad.mmd').write_text('graph TD\n    A -->\n')
+    result = CliRunner().invoke(lint, [str(tmp_path)])
+    assert result.exit_code == 1
+    assert f"{tmp_path / 'bad.mmd'}:2:10: error: expected a node after link" in result.output
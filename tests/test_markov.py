@@ -0,0 +1,148 @@
+import os
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from aws_architecture_decomposition_lab import frequency
+from aws_architecture_decomposition_lab.markov import (CACHE_FORMAT, STOPPED, MarkovChain, build_alias_table,
+                                                        chain_cache_dir, load_cached_chain)
+
+ARCS = {('apigateway', 'lambda'): 6, ('apigateway', 's3'): 3, ('apigateway', 'sqs'): 1,
+        ('lambda', 'dynamodb'): 1, ('lambda', 's3'): 3,
+        ('sqs', 'sqs'): 5}
+WEIGHTS = {'apigateway': 5, 'lambda': 3, 'sqs': 1, 's3': 1}
+
+
+def test_alias_table_reproduces_weights():
+    weights = np.array([1.0, 7.0, 0.0, 2.0, 10.0])
+    prob, alias = build_alias_table(weights)
+    # Slot i keeps itself with prob[i] and hands the rest to alias[i].
+    implied = prob / len(weights)
+    np.add.at(implied, alias, (1 - prob) / len(weights))
+    assert np.allclose(implied, weights / weights.sum())
+
+
+def test_step_frequencies_match_arc_weights():
+    chain = MarkovChain.from_arcs(ARCS, WEIGHTS)
+    rng = np.random.default_rng(11)
+    for source in ('apigateway', 'lambda'):
+        rows = np.full(200_000, chain.index[source])
+        observed = np.bincount(chain.step_many(rows, rng), minlength=len(chain)) / len(rows)
+        total = sum(count for (s, _), count in ARCS.items() if s == source)
+        for (s, sink), count in ARCS.items():
+            if s == source:
+                assert observed[chain.index[sink]] == pytest.approx(count / total, abs=0.01)
+        assert chain.transitions(source) == pytest.approx(
+            {sink: count / total for (s, sink), count in ARCS.items() if s == source})
+    # The scalar sampler agrees with the vectorized one.
+    draws = [chain.step(chain.index['lambda'], rng) for _ in range(20_000)]
+    assert np.mean(np.array(draws) == chain.index['s3']) == pytest.approx(0.75, abs=0.02)
+
+
+def test_initial_distribution_follows_service_weights():
+    chain = MarkovChain.from_arcs(ARCS, WEIGHTS)
+    rng = np.random.default_rng(3)
+    observed = np.bincount(chain.sample_initial_many(100_000, rng), minlength=len(chain)) / 100_000
+    expected = np.array([WEIGHTS.get(state, 0) for state in chain.states]) / sum(WEIGHTS.values())
+    assert np.allclose(observed, expected, atol=0.01)
+    assert observed[chain.index['dynamodb']] == 0
+
+
+def test_absorbing_state_never_leaves():
+    chain = MarkovChain.from_arcs(ARCS, WEIGHTS)
+    walks = chain.simulate(1000, 6, np.random.default_rng(5), start='sqs')
+    assert (walks == chain.index['sqs']).all()
+    assert chain.walk('sqs', 4, np.random.default_rng(5)) == ['sqs'] * 4
+
+
+def test_dead_end_restart_and_stop():
+    assert MarkovChain.from_arcs(ARCS, WEIGHTS).dead_ends == ['dynamodb', 's3']
+
+    restart = MarkovChain.from_arcs(ARCS, WEIGHTS, dead_end='restart')
+    walks = restart.simulate(5000, 4, np.random.default_rng(1), start='s3')
+    assert (walks != STOPPED).all()
+    # A restart draws from the initial distribution, never from s3's (empty) row.
+    assert np.mean(walks[:, 1] == restart.index['apigateway']) == pytest.approx(0.5, abs=0.03)
+
+    stop = MarkovChain.from_arcs(ARCS, WEIGHTS, dead_end='stop')
+    walks = stop.simulate(5000, 4, np.random.default_rng(1), start='lambda')
+    assert (walks[:, 1] != STOPPED).all() and (walks[:, 2:] == STOPPED).all()
+    assert stop.walk('lambda', 4, np.random.default_rng(1)) in (['lambda', 's3'], ['lambda', 'dynamodb'])
+    assert stop.step(stop.index['s3'], np.random.default_rng(1)) == STOPPED
+
+
+def test_simulate_is_seeded_and_chunked():
+    chain = MarkovChain.from_arcs(ARCS, WEIGHTS)
+    walks = chain.simulate(1000, 5, np.random.default_rng(7))
+    assert walks.shape == (1000, 5) and walks.dtype == np.int16
+    assert np.array_equal(walks, chain.simulate(1000, 5, np.random.default_rng(7)))
+    chunks = list(chain.iter_simulations(1000, 5, np.random.default_rng(7), chunk_size=300))
+    assert [len(chunk) for chunk in chunks] == [300, 300, 300, 100]
+
+
+def test_invalid_inputs():
+    for arcs in ([], {}):
+        with pytest.raises(ValueError, match='without services or arcs'):
+            MarkovChain.from_arcs(arcs)
+    with pytest.raises(ValueError, match='without services or arcs'):
+        MarkovChain.from_arcs({('a', 'b'): 0}, {'a': 0})
+    with pytest.raises(ValueError, match='dead_end'):
+        MarkovChain.from_arcs(ARCS, dead_end='loop')
+
+
+def _ingest(conn, arcs):
+    with conn:
+        frequency.upsert_service_counts(conn, Counter(source for source, _ in arcs))
+        frequency.upsert_arc_counts(conn, Counter(arcs))
+
+
+def test_cached_chain_hits_and_invalidates(tmp_path):
+    db = str(tmp_path / 'freq.db')
+    conn, cache_dir = frequency.connect(db), chain_cache_dir(db)
+    _ingest(conn, [('apigateway', 'lambda'), ('lambda', 's3')])
+
+    built, hit = load_cached_chain(conn, cache_dir)
+    assert not hit
+    cached, hit = load_cached_chain(conn, cache_dir)
+    assert hit and isinstance(cached.indices, np.memmap)
+    assert cached.states == built.states and np.array_equal(cached.alias_prob, built.alias_prob)
+    [entry] = os.listdir(cache_dir)
+
+    # New counts bump the version: the chain is rebuilt and the old entry pruned.
+    _ingest(conn, [('lambda', 'dynamodb')])
+    rebuilt, hit = load_cached_chain(conn, cache_dir)
+    assert not hit and 'dynamodb' in rebuilt.transitions('lambda')
+    [newer] = os.listdir(cache_dir)
+    assert newer != entry
+
+    # A recreated database (new db_id) never matches the old entries.
+    with conn:
+        conn.execute("UPDATE metadata SET value = 'feedface' WHERE key = 'db_id'")
+    assert load_cached_chain(conn, cache_dir)[1] is False
+    assert load_cached_chain(conn, cache_dir)[1] is True
+
+
+def test_cache_keeps_newer_entries_and_survives_removal(tmp_path, monkeypatch):
+    db = str(tmp_path / 'freq.db')
+    conn, cache_dir = frequency.connect(db), chain_cache_dir(db)
+    _ingest(conn, [('apigateway', 'lambda')])
+    version = frequency.frequency_version(conn)
+    db_id, number = version.rsplit('-', 1)
+
+    # An entry for a newer version, published by a process that saw more counts.
+    newer = os.path.join(cache_dir, f"v{CACHE_FORMAT}-{db_id}-{int(number) + 1}")
+    older = os.path.join(cache_dir, f"v{CACHE_FORMAT}-{db_id}-{int(number) - 1}")
+    for entry in (newer, older):
+        MarkovChain.from_arcs({('s3', 'sqs'): 1}).save(entry)
+    chain, hit = load_cached_chain(conn, cache_dir)
+    assert not hit
+    assert os.path.isdir(newer) and not os.path.exists(older)
+
+    # An entry removed while it is being loaded is rebuilt rather than failing.
+    def vanished(*args, **kwargs):
+        raise FileNotFoundError('pruned mid-load')
+
+    monkeypatch.setattr(MarkovChain, 'load', vanished)
+    rebuilt, hit = load_cached_chain(conn, cache_dir)
+    assert not hit and rebuilt.states == chain.states
@@ -0,0 +1,115 @@
+import pytest
+
+from aws_architecture_decomposition_lab import mermaid
+from aws_architecture_decomposition_lab.mermaid import format_node, parse, parse_statement
+
+SHAPES = [
+    ('A[Label]', 'rect'),
+    ('A(Label)', 'round'),
+    ('A([Label])', 'stadium'),
+    ('A[[Label]]', 'subroutine'),
+    ('A[(Label)]', 'cylinder'),
+    ('A((Label))', 'circle'),
+    ('A>Label]', 'asymmetric'),
+    ('A{Label}', 'rhombus'),
+    ('A{{Label}}', 'hexagon'),
+]
+
+
+@pytest.mark.parametrize('source, shape', SHAPES)
+def test_node_shapes(source, shape):
+    statement = parse_statement(f"    {source}")
+    assert statement.error is None
+    [node] = statement.nodes
+    assert (node.id, node.label, node.shape) == ('A', 'Label', shape)
+    assert (node.col, node.end) == (4, 4 + len(source))
+
+
+def test_prefixed_ids_and_quoted_labels():
+    [node] = parse_statement('s3:bucket["Raw [landing] zone"]').nodes
+    assert (node.prefix, node.service, node.label) == ('s3', 'bucket', 'Raw [landing] zone')
+    bare = parse_statement('Client').nodes[0]
+    assert (bare.prefix, bare.service, bare.shape) == ('', 'Client', '')
+
+
+def test_chained_edges_and_groups():
+    statement = parse_statement('A --> B & C --> D')
+    assert statement.error is None
+    assert [(e.source, e.target) for e in statement.edges] == [('A', 'B'), ('A', 'C'), ('B', 'D'), ('C', 'D')]
+    arrows = parse_statement('A <--> B -.-> C ==> D --- E').edges
+    assert [e.arrow for e in arrows] == ['<-->', '-.->', '==>', '---']
+
+
+def test_edge_labels():
+    piped, texted = parse_statement('A -->|writes| B').edges[0], parse_statement('A -- reads --> B').edges[0]
+    assert (piped.label, piped.arrow) == ('writes', '-->')
+    # The text form keeps both halves of the link as its arrow.
+    assert texted.label == 'reads' and texted.arrow.endswith('>') and not texted.arrow.startswith('<')
+    assert parse_statement('A == loud ==> B').edges[0].label == 'loud'
+    assert parse_statement('A -->|open B').error[1] == 'unterminated edge label'
+    dotted = parse_statement('A -. maybe .-> B').edges[0]
+    assert (dotted.label, dotted.arrow) == ('maybe', '-.->')
+
+
+def test_class_shorthand_and_invisible_links():
+    statement = parse_statement('lambda:fn[Fn]:::hot & s3:b:::cold ~~~ sqs:q')
+    assert statement.error is None
+    assert [node.id for node in statement.nodes] == ['lambda:fn', 's3:b', 'sqs:q']
+    assert statement.nodes[0].label == 'Fn'
+    # Layout-only links are edges of the diagram but not service arcs.
+    diagram = parse('graph TD\n    lambda:fn ~~~ s3:b\n    lambda:fn -.-> sqs:q\n')
+    assert [e.arrow for e in diagram.edges] == ['~~~', '-.->']
+    assert diagram.arcs() == [('lambda', 'sqs')]
+
+
+def test_subgraphs_and_comments():
+    diagram = parse('''graph LR
+    %% a comment with A --> B that is not an edge
+    subgraph Outer[Outer tier]
+        A[One] --> B[Two]
+        subgraph "Inner"
+            C[Three]
+        end
+    end
+    B --> C
+    classDef red fill:#f00
+''')
+    assert diagram.errors == []
+    assert diagram.direction == 'LR'
+    outer, inner = diagram.subgraphs
+    assert (outer.id, outer.title, outer.parent, outer.nodes) == ('Outer', 'Outer tier', None, ['A', 'B'])
+    assert (inner.id, inner.parent, inner.nodes) == ('Inner', 'Outer', ['C'])
+    assert [(e.source, e.target) for e in diagram.edges] == [('A', 'B'), ('B', 'C')]
+    assert parse_statement('  %% A --> B').kind == 'comment'
+
+
+def test_structural_errors():
+    diagram = parse('graph TD\n    subgraph S\n    A --> B\n    end\n    end\n    subgraph T\n    C[open\n')
+    messages = [message for _, _, message in diagram.errors]
+    assert "'end' without a matching subgraph" in messages
+    assert "subgraph 'T' is never closed" in messages
+    assert "unterminated node shape starting with '['" in messages
+
+
+def test_definition_wins_over_reference():
+    diagram = parse('graph TD\n    A --> B\n    B[Backend] --> C\n')
+    assert diagram.nodes['B'].label == 'Backend' and diagram.nodes['B'].shape == 'rect'
+    assert list(diagram.nodes) == ['A', 'B', 'C']
+    assert len(diagram.refs) == 4
+
+
+def test_arcs_follow_arrow_direction():
+    diagram = parse('graph TD\n    s3:a --> lambda:b\n    sqs:c <-- lambda:b\n    sns:d <--> lambda:b\n    X --> s3:a\n')
+    assert diagram.arcs() == [('s3', 'lambda'), ('lambda', 'sqs'), ('sns', 'lambda'), ('lambda', 'sns')]
+
+
+@pytest.mark.parametrize('label', ['Plain label', 'Has [brackets]', 'Pipe | inside', 'f(x)'])
+@pytest.mark.parametrize('shape', [shape for _, shape in SHAPES])
+def test_format_node_round_trips(label, shape):
+    [node] = parse_statement(format_node('lambda:fn', label, shape)).nodes
+    assert (node.id, node.label, node.shape) == ('lambda:fn', label, shape)
+
+
+def test_format_node_defaults_to_rect():
+    assert format_node('A', 'Label', '') == 'A[Label]'
+    assert mermaid.parse(format_node('A', 'x') + '\n').nodes['A'].shape == 'rect'
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from aws_architecture_decomposition_lab.services import (ICONS_MAPPING_PATH, SERVICE_NAMES, VALID_PREFIXES,
+                                                         ServiceMatcher, build_aliases, default_matcher,
+                                                         load_service_names)
+
+
+def test_vocabulary_comes_from_the_icons_mapping():
+    with open(ICONS_MAPPING_PATH) as f:
+        mapping = json.load(f)
+    assert len(SERVICE_NAMES) == len(mapping) == 72
+    assert set(SERVICE_NAMES) == set(mapping) == VALID_PREFIXES
+    assert isinstance(VALID_PREFIXES, frozenset)
+    assert SERVICE_NAMES['apigateway'] == 'Amazon API Gateway'
+    assert SERVICE_NAMES['s3'] == 'Amazon Simple Storage Service'
+
+
+def test_display_name_falls_back_to_the_prefix(tmp_path):
+    path = tmp_path / 'icons.json'
+    path.write_text(json.dumps({'custom': 'https://example.com/custom.png',
+                                'lambda': 'https://example.com/Arch_AWS-Lambda_48.png'}))
+    assert load_service_names(str(path)) == {'custom': 'custom', 'lambda': 'AWS Lambda'}
+
+
+def test_aliases():
+    aliases = build_aliases(SERVICE_NAMES)
+    # Prefix, product name with and without separators, and the hand-written extras.
+    for alias in ('apigateway', 'api gateway', 'api-gateway', 'step functions', 'stepfunctions',
+                  'simple storage service', 'load balancer', 'alb'):
+        assert alias in aliases
+    assert aliases['api gateway'] == 'apigateway'
+    assert aliases['load balancer'] == aliases['alb'] == 'elb'
+    assert aliases['state machine'] == 'step_functions'
+    # Extras for services outside the vocabulary are dropped.
+    assert 'kafka' not in build_aliases({'s3': 'Amazon Simple Storage Service'})
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('ELB in front of elasticache', ['elasticache', 'elb']),
+    ('Orders API Gateway', ['apigateway']),
+    ('Application Load Balancer to ECS', ['elb', 'ecs']),
+    ('AWS STEP FUNCTIONS state machine', ['step_functions']),
+    ('Simple Storage Service Glacier archive', ['glacier']),
+    ('Glue DataBrew recipes and a Glue crawler', ['databrew', 'glue']),
+    ('s3x buckets and lambdas', []),
+])
+def test_rank(text, expected):
+    assert default_matcher().rank(text) == expected
+
+
+def test_find_all_reports_whole_word_mentions():
+    matcher = ServiceMatcher({'elb': 'elb', 'elasticache': 'elasticache', 'load balancer': 'elb'})
+    assert matcher.find_all('Load  balancer, ELB/elasticache') == [(16, 19, 'elb'), (20, 31, 'elasticache')]
+    assert matcher.find_all('Load balancer') == [(0, 13, 'elb')]
+    assert matcher.find_all('elbow') == []
+
+
+def test_best():
+    matcher = default_matcher()
+    assert matcher.best('Writes to dynamo via a lambda') == 'dynamodb'
+    assert matcher.best('Nothing to see here') is None
+    assert matcher.best('') is None
+    assert default_matcher() is matcher
@@ -0,0 +1,57 @@
+import shutil
+
+import numpy as np
+
+from aws_architecture_decomposition_lab import mermaid
+from aws_architecture_decomposition_lab.corpus import write_corpus
+from aws_architecture_decomposition_lab.files import expand_paths
+from aws_architecture_decomposition_lab.similarity import MinHasher, SimilarityIndex, shingles
+
+DIAGRAM = '''graph TD
+    apigateway:api[API] --> lambda:fn[Handler]
+    lambda:fn --> dynamodb:table[Orders]
+    lambda:fn --> s3:bucket[Archive]
+    lambda:fn --> sqs:queue[Jobs]
+'''
+
+
+def test_shingles_cover_services_and_arcs():
+    result = shingles(mermaid.parse(DIAGRAM))
+    assert {'s:apigateway', 's:lambda', 'a:s:apigateway>s:lambda', 'a:s:lambda>s:dynamodb'} <= result
+    # Unprefixed nodes fall back to a matched service or their label.
+    free_form = shingles(mermaid.parse('graph TD\n    A[Amazon S3 bucket] --> B[Billing Service]\n'))
+    assert free_form == {'s:s3', 'n:billing service', 'a:s:s3>n:billing service'}
+
+
+def test_minhash_estimates_jaccard():
+    hasher = MinHasher(num_perm=512)
+    a = {f"x{i}" for i in range(100)}
+    b = {f"x{i}" for i in range(50, 150)}
+    estimate = (hasher.signature(a) == hasher.signature(b)).mean()
+    assert abs(estimate - 1 / 3) < 0.08
+    assert np.array_equal(hasher.signature(a), MinHasher(num_perm=512).signature(a))
+
+
+def test_index_is_persistent_and_incremental(tmp_path):
+    write_corpus(str(tmp_path / 'corpus'), 40, seed=2, shard_size=0)
+    paths = expand_paths([str(tmp_path / 'corpus')])
+    db = str(tmp_path / 'similar.db')
+    with SimilarityIndex(db) as index:
+        assert index.add_paths(paths[:30]).added == 30
+    with SimilarityIndex(db) as index:
+        stats = index.add_paths(paths)
+        assert (stats.added, stats.unchanged) == (10, 30)
+        assert len(index) == 40
+
+        # An edited copy of an indexed diagram is its closest match.
+        near = tmp_path / 'near.mmd'
+        lines = open(paths[5]).read().splitlines()
+        near.write_text('\n'.join(lines[:-1]) + '\n')
+        matches = index.query_file(str(near), top=3)
+        assert matches[0].path == paths[5] and matches[0].similarity > 0.7
+
+        # Changing a file re-signs it instead of adding a second entry.
+        shutil.copy(paths[6], paths[5])
+        stats = index.add_paths(paths)
+        assert (stats.updated, stats.unchanged, len(index)) == (1, 39, 40)
+        assert {m.path for m in index.query_file(paths[6], top=2)} == {paths[5], paths[6]}
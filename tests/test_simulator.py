@@ -0,0 +1,124 @@
+import csv
+import io
+import json
+from collections import Counter
+
+import numpy as np
+import pytest
+from click.testing import CliRunner
+
+from aws_architecture_decomposition_lab import frequency
+from aws_architecture_decomposition_lab.markov import STOPPED, MarkovChain, write_walks
+from aws_architecture_decomposition_lab.writer import FrequencyWriter
+from scripts.aws_architecture_frequency_simulator import (cli, update_arc_frequency_db, update_cooccurrence_db,
+                                                          update_frequency_db)
+
+
+def test_simulate_on_empty_db_is_a_usage_error(tmp_path):
+    result = CliRunner().invoke(cli, ['simulate', '--db', str(tmp_path / 'empty.db'), '--count', '3'])
+    assert result.exit_code == 2
+    assert 'no arcs in DB; run ingest first' in result.output
+
+
+def test_analyze_commits_one_diagram_in_one_transaction(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    commits = []
+    commit = FrequencyWriter._commit
+    monkeypatch.setattr(FrequencyWriter, '_commit',
+                        lambda self, conn, *counts: commits.append(counts) or commit(self, conn, *counts))
+    (tmp_path / 'diagram.mmd').write_text('graph TD\n    apigateway:api[API] --> lambda:fn[Fn]\n    lambda:fn --> s3:b[Bucket]\n')
+    db = str(tmp_path / 'custom.db')
+    result = CliRunner().invoke(cli, ['analyze', 'diagram.mmd', '--simulate', '--seed', '1', '--db', db])
+    assert result.exit_code == 0, result.output
+    assert 'Simulated Architecture:' in result.output
+    assert not (tmp_path / frequency.DEFAULT_DB_PATH).exists()
+
+    conn = frequency.connect(db)
+    assert frequency.load_service_counts(conn) == {'apigateway': 1, 'lambda': 1, 's3': 1}
+    assert frequency.load_arc_counts(conn) == {('apigateway', 'lambda'): 1, ('lambda', 's3'): 1}
+    assert conn.execute('SELECT COUNT(*) FROM service_cooccurrence').fetchone()[0] == 6
+    assert len(commits) == 1
+    conn.close()
+
+
+def test_update_helpers_write_through_the_writer(tmp_path):
+    conn = frequency.connect(str(tmp_path / 'freq.db'))
+    version = frequency.frequency_version(conn)
+    update_frequency_db(conn, ['lambda', 's3', 'lambda', 'not-a-service'])
+    assert frequency.frequency_version(conn) != version
+    update_arc_frequency_db(conn, [('lambda', 's3'), ('lambda', 'nope')])
+    update_cooccurrence_db(conn, ['lambda', 's3'])
+    assert frequency.load_service_counts(conn) == {'lambda': 2, 's3': 1}
+    assert frequency.load_arc_counts(conn) == {('lambda', 's3'): 1}
+    assert conn.execute('SELECT COUNT(*) FROM service_cooccurrence').fetchone()[0] == 3
+    conn.close()
+
+
+@pytest.fixture
+def arcs_db(tmp_path):
+    db = str(tmp_path / 'freq.db')
+    conn = frequency.connect(db)
+    with conn:
+        frequency.upsert_service_counts(conn, Counter({'apigateway': 3, 'lambda': 5, 's3': 2, 'sqs': 1}))
+        frequency.upsert_arc_counts(conn, Counter({('apigateway', 'lambda'): 3, ('lambda', 's3'): 2,
+                                                   ('lambda', 'sqs'): 1, ('s3', 'lambda'): 1}))
+    conn.close()
+    return db
+
+
+def simulate(db, tmp_path, *args, name='walks'):
+    output = str(tmp_path / name)
+    result = CliRunner().invoke(cli, ['simulate', '--db', db, '--output', output, *args])
+    assert result.exit_code == 0, result.output
+    return output
+
+
+def test_simulate_npy_shape_and_dtype(arcs_db, tmp_path):
+    output = simulate(arcs_db, tmp_path, '--count', '250', '--length', '6', '--chunk-size', '100',
+                      '--format', 'npy', '--seed', '7')
+    walks = np.load(output)
+    assert walks.shape == (250, 6) and walks.dtype == np.int16
+    with open(f"{output}.states.json") as f:
+        states = json.load(f)
+    assert sorted(states) == ['apigateway', 'lambda', 's3', 'sqs']
+    assert walks.min() >= STOPPED and walks.max() < len(states)
+    assert (walks[:, 0] != STOPPED).all()
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'jsonl'])
+def test_simulate_text_formats_honour_start(arcs_db, tmp_path, fmt):
+    output = simulate(arcs_db, tmp_path, '--count', '40', '--length', '4', '--start', 'lambda',
+                      '--format', fmt, '--seed', '1')
+    with open(output) as f:
+        walks = list(csv.reader(f)) if fmt == 'csv' else [json.loads(line) for line in f]
+    assert len(walks) == 40
+    assert all(walk[0] == 'lambda' and 1 <= len(walk) <= 4 for walk in walks)
+    # lambda's only successors are s3 and sqs.
+    assert {walk[1] for walk in walks if len(walk) > 1} <= {'s3', 'sqs'}
+
+
+def test_simulate_seed_is_reproducible(arcs_db, tmp_path):
+    args = ['--count', '200', '--length', '5', '--chunk-size', '64']
+    first = simulate(arcs_db, tmp_path, *args, '--seed', '3', name='a.csv')
+    again = simulate(arcs_db, tmp_path, *args, '--seed', '3', name='b.csv')
+    other = simulate(arcs_db, tmp_path, *args, '--seed', '4', name='c.csv')
+    with open(first) as a, open(again) as b, open(other) as c:
+        first, again, other = a.read(), b.read(), c.read()
+    assert first == again and first != other
+
+
+def test_simulate_rejects_bad_arguments(arcs_db):
+    runner = CliRunner()
+    result = runner.invoke(cli, ['simulate', '--db', arcs_db, '--start', 'glacier'])
+    assert result.exit_code == 2 and "no historical data for 'glacier'" in result.output
+    result = runner.invoke(cli, ['simulate', '--db', arcs_db, '--format', 'npy'])
+    assert result.exit_code == 2 and '--format npy needs an --output file' in result.output
+
+
+def test_write_walks_validates_its_arguments():
+    chain = MarkovChain.from_arcs({('lambda', 's3'): 1})
+    chunks = chain.iter_simulations(3, 2, np.random.default_rng(0))
+    with pytest.raises(ValueError, match='fmt must be one of'):
+        write_walks(chain, chunks, io.StringIO(), 'xml')
+    with pytest.raises(ValueError, match='expected 5 walks, wrote 3'):
+        write_walks(chain, chunks, io.BytesIO(), 'npy', count=5, length=2)
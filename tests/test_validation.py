@@ -0,0 +1,34 @@
+from click.testing import CliRunner
+
+from aws_architecture_decomposition_lab import mermaid
+from aws_architecture_decomposition_lab.validation import validate_diagram, validate_nodes
+from scripts.audit_and_fix_mermaid_diagrams import audit_and_fix_mermaid_diagrams
+from scripts.audit_mermaid_diagrams import audit_mermaid_diagrams
+
+DIAGRAM = 'graph TD\n    plain[Client] --> lambda:lambda_fn[Fn]\n    lambda:lambda_fn --> notaservice:thing[Thing]\n'
+
+
+def test_validate_nodes_checks_the_prefix_against_the_vocabulary():
+    diagram = mermaid.parse(DIAGRAM)
+    assert validate_nodes([diagram.nodes['lambda:lambda_fn']]) == []
+    [error] = validate_nodes([diagram.nodes['notaservice:thing']])
+    assert error.startswith('line 3: prefix: ') and "unknown service prefix 'notaservice'" in error
+    # Unprefixed nodes are not validated, and each node is validated once.
+    assert validate_diagram(diagram) == [error]
+
+
+def test_both_audits_validate_the_same_nodes(tmp_path):
+    (tmp_path / 'in').mkdir()
+    (tmp_path / 'in' / 'arch.mmd').write_text(DIAGRAM)
+    runner = CliRunner()
+    audit = runner.invoke(audit_mermaid_diagrams, [str(tmp_path / 'in'), '--strict'])
+    fix = runner.invoke(audit_and_fix_mermaid_diagrams,
+                        [str(tmp_path / 'in'), '--output-dir', str(tmp_path / 'out'), '--strict'])
+    assert fix.exit_code == 0, fix.output
+
+    def errors(output):
+        return [line for line in output.splitlines() if line.startswith('Validation error')]
+
+    assert errors(audit.output) == errors(fix.output)
+    assert len(errors(audit.output)) == 1 and 'notaservice' in errors(audit.output)[0]
+    assert not errors(runner.invoke(audit_mermaid_diagrams, [str(tmp_path / 'in')]).output)
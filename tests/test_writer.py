@@ -0,0 +1,123 @@
+import multiprocessing
+import random
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+import pytest
+
+from aws_architecture_decomposition_lab import frequency
+from aws_architecture_decomposition_lab.services import SERVICE_NAMES
+from aws_architecture_decomposition_lab.writer import FrequencyWriter
+
+SERVICES = sorted(SERVICE_NAMES)
+
+
+def produce(writer, seed, rounds, expected_services, expected_arcs, expected_pairs, lock):
+    rng = random.Random(seed)
+    services, arcs, pairs = Counter(), Counter(), Counter()
+    for _ in range(rounds):
+        batch = rng.choices(SERVICES, k=5)
+        edges = list(zip(batch, batch[1:]))
+        writer.add_diagram(batch, edges)
+        services.update(batch)
+        arcs.update(edges)
+        pairs.update(frequency.count_cooccurrence(batch))
+    with lock:
+        expected_services.update(services)
+        expected_arcs.update(arcs)
+        expected_pairs.update(pairs)
+
+
+def run_threads(path, seed, threads=8, rounds=300):
+    expected_services, expected_arcs, expected_pairs = Counter(), Counter(), Counter()
+    lock = threading.Lock()
+    with FrequencyWriter(path, max_pending=500, flush_interval=0.01) as writer:
+        workers = [threading.Thread(target=produce,
+                                    args=(writer, seed * 100 + i, rounds, expected_services, expected_arcs,
+                                          expected_pairs, lock))
+                   for i in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    assert writer.written == (sum(expected_services.values()) + sum(expected_arcs.values())
+                              + sum(expected_pairs.values()))
+    return expected_services, expected_arcs
+
+
+def _process_main(path, seed, results):
+    services, arcs = run_threads(path, seed)
+    results.put((dict(services), {f"{a}|{b}": n for (a, b), n in arcs.items()}))
+
+
+def totals(path):
+    conn = sqlite3.connect(path)
+    services = Counter(dict(conn.execute('SELECT service, frequency FROM service_frequency')))
+    arcs = Counter({(a, b): n for a, b, n in conn.execute('SELECT source_service, sink_service, count FROM frequencies')})
+    conn.close()
+    return services, arcs
+
+
+def test_concurrent_threads_lose_nothing(tmp_path):
+    path = str(tmp_path / 'freq.db')
+    services, arcs = run_threads(path, seed=1)
+    assert totals(path) == (services, arcs)
+
+
+def test_concurrent_processes_lose_nothing(tmp_path):
+    path = str(tmp_path / 'freq.db')
+    frequency.connect(path).close()
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    processes = [ctx.Process(target=_process_main, args=(path, seed, results)) for seed in range(3)]
+    for process in processes:
+        process.start()
+    expected_services, expected_arcs = Counter(), Counter()
+    for _ in processes:
+        services, arcs = results.get(timeout=120)
+        expected_services.update(services)
+        expected_arcs.update({tuple(key.split('|')): n for key, n in arcs.items()})
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+    assert totals(path) == (expected_services, expected_arcs)
+
+
+def test_flush_and_close(tmp_path):
+    path = str(tmp_path / 'freq.db')
+    writer = FrequencyWriter(path, max_pending=10**9, flush_interval=3600)
+    writer.add({'s3': 2}, {('lambda', 's3'): 1})
+    writer.flush()
+    assert totals(path) == (Counter({'s3': 2}), Counter({('lambda', 's3'): 1}))
+    writer.add({'s3': 1})
+    writer.close()
+    assert totals(path)[0] == Counter({'s3': 3})
+    assert writer.flushes == 2
+    with pytest.raises(RuntimeError):
+        writer.add({'s3': 1})
+
+
+def pair_totals(path):
+    conn = sqlite3.connect(path)
+    pairs = Counter({(a, b): n for a, b, n in conn.execute(
+        'SELECT service_a, service_b, count FROM service_cooccurrence')})
+    conn.close()
+    return pairs
+
+
+def test_pairs_only_increments_are_flushed(tmp_path):
+    path = str(tmp_path / 'freq.db')
+    with FrequencyWriter(path, max_pending=2, flush_interval=3600) as writer:
+        writer.add(pairs={('lambda', 's3'): 1})
+        writer.flush()
+        assert pair_totals(path) == Counter({('lambda', 's3'): 1})
+        # Pairs alone also count towards max_pending.
+        writer.add(pairs={('lambda', 's3'): 2})
+        for _ in range(50):
+            if pair_totals(path)[('lambda', 's3')] == 3:
+                break
+            time.sleep(0.05)
+        assert pair_totals(path)[('lambda', 's3')] == 3
+    assert writer.flushes == 2 and writer.written == 3